@@ -149,58 +149,38 @@ export default function AdminDashboard({ activeTab, setActiveTab }) {
     }, [userData]);
 
     // ---- Fetch data ----
-    useEffect(() => {
-        axios.get("https://caferealitea.onrender.com/recent-sales")
-            .then((res) => setFetchSales(res.data))
-            .catch((err) => console.error("Error fetching recent sales:", err));
-    }, []);
-
-    useEffect(() => {
-        axios.get("https://caferealitea.onrender.com/orders/current-month")
-            .then((res) => setCurrentMonthData(res.data))
-            .catch((err) => console.error("Error fetching monthly data:", err));
-    }, []);
-
-    useEffect(() => {
-        axios.get("https://caferealitea.onrender.com/orders/year")
-            .then((res) => {
-                const sum = res.data
-                    .map((item) => parseFloat(item.total_sales || 0))
-                    .reduce((curr, add) => curr + add, 0);
-                setTotalSale(sum);
-            })
-            .catch((err) => console.error("Error fetching yearly data:", err));
-    }, []);
-
-    useEffect(() => {
-        axios.get("https://caferealitea.onrender.com/top_items")
-            .then((res) => setPopularItems(res.data))
-            .catch((err) => console.error("Error fetching popular items:", err));
-    }, []);
-
-    // Fetch initial pending orders count
-    useEffect(() => {
-        if (userData?.role === 'Admin' || userData?.role === 'System Administrator') {
-            axios.get("https://caferealitea.onrender.com/pending-orders", { withCredentials: true })
-                .then((res) => setPendingOrdersCount(res.data.length))
-                .catch((err) => console.error("Error fetching pending orders:", err));
-        }
-    }, [userData]);
-
+    // One snapshot request replaces the separate sales, totals, top items,
+    // pending orders and user calls.
     useEffect(() => {
         document.title = "Café Realitea - Dashboard";
         setLoading(true);
 
-        axios.get("https://caferealitea.onrender.com/user", { withCredentials: true })
+        axios.get("https://caferealitea.onrender.com/dashboard/snapshot", { withCredentials: true })
             .then((res) => {
-                if (!res.data.logged_in || res.data.role === "") {
+                const snapshot = res.data;
+                const session = snapshot.user || {};
+                if (!session.logged_in || session.role === "") {
                     navigate("/");
                     return;
                 }
-                setUserData(res.data.user || res.data);
+                setUserData(session.user || session);
+
+                setFetchSales(snapshot.recent_sales);
+                setCurrentMonthData(snapshot.current_month);
+                setTotalSale(
+                    snapshot.years
+                        .map((item) => parseFloat(item.total_sales || 0))
+                        .reduce((curr, add) => curr + add, 0)
+                );
+                setPopularItems(snapshot.top_items);
+
+                const role = session.role;
+                if (role === 'Admin' || role === 'System Administrator') {
+                    setPendingOrdersCount(snapshot.pending_orders_count);
+                }
             })
             .catch((err) => {
-                console.error("Authentication check failed:", err);
+                console.error("Error fetching dashboard snapshot:", err);
                 navigate("/");
             })
             .finally(() => setLoading(false));
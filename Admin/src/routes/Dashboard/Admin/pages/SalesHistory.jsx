@@ -9,8 +9,9 @@ import { Link } from "react-router-dom";
 export default function SalesHistory({ activeTab, setActiveTab }) {
     const navigate = useNavigate();
     const [dailySalesData, setDailySalesData] = useState([]);
-    const [filteredData, setFilteredData] = useState([]);
+    const [nextCursor, setNextCursor] = useState(null);
     const [loading, setLoading] = useState(true);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [paymentFilter, setPaymentFilter] = useState('all');
     const [availableYears, setAvailableYears] = useState([]);
     const [availableMonths, setAvailableMonths] = useState([]);
@@ -20,17 +21,40 @@ export default function SalesHistory({ activeTab, setActiveTab }) {
         month: 'all',
     });
 
-    useEffect(() => {
-        axios.get('https://caferealitea.onrender.com/daily-sales')
+    // Filtering and paging happen on the server; next_cursor fetches the following page
+    const fetchSales = (activeFilters, cursor = null) => {
+        const params = {
+            payment_method: activeFilters.payment,
+            order_type: activeFilters.orderType,
+        };
+        if (activeFilters.year !== 'all') params.year = activeFilters.year;
+        if (activeFilters.year !== 'all' && activeFilters.month !== 'all') params.month = activeFilters.month;
+        if (cursor) params.cursor = cursor;
+
+        cursor ? setLoadingMore(true) : setLoading(true);
+        axios.get('https://caferealitea.onrender.com/daily-sales', { params })
             .then((res) => {
-                setDailySalesData(res.data);
-                setFilteredData(res.data);
-                setLoading(false);
+                const orders = res.data.orders || [];
+                setDailySalesData(prev => cursor ? [...prev, ...orders] : orders);
+                setNextCursor(res.data.next_cursor || null);
             })
             .catch(error => {
                 console.error("Error fetching sales data:", error);
+            })
+            .finally(() => {
                 setLoading(false);
+                setLoadingMore(false);
             });
+    };
+
+    const currentFilters = () => ({
+        ...filters,
+        payment: paymentFilter,
+        orderType: orderTypeFilter,
+    });
+
+    useEffect(() => {
+        fetchSales({ year: 'all', month: 'all', payment: 'all', orderType: 'all' });
 
         axios.get('https://caferealitea.onrender.com/orders/year')
             .then((res) => {
@@ -63,14 +87,7 @@ export default function SalesHistory({ activeTab, setActiveTab }) {
     }, []);
 
     const applyFilters = () => {
-        let result = dailySalesData;
-        if (paymentFilter !== 'all') {
-            result = result.filter(item => item.payment_method === paymentFilter);
-        }
-        if (orderTypeFilter !== 'all') {
-            result = result.filter(item => item.order_type === orderTypeFilter);
-        }
-        setFilteredData(result);
+        fetchSales(currentFilters());
     };
 
     const handleFilterChange = (e) => {
@@ -89,7 +106,7 @@ export default function SalesHistory({ activeTab, setActiveTab }) {
             month: 'all',
             day: 'all'
         });
-        setFilteredData(dailySalesData);
+        fetchSales({ year: 'all', month: 'all', payment: 'all', orderType: 'all' });
     };
 
     const getMonthName = (monthNumber) => {
@@ -216,7 +233,7 @@ export default function SalesHistory({ activeTab, setActiveTab }) {
                 {/* Results Count */}
                 <div className="mb-4 flex justify-between items-center">
                     <p className="text-xs sm:text-sm md:text-base lg:text-base text-gray-600">
-                        Showing {filteredData.length} of {dailySalesData.length} records
+                        Showing {dailySalesData.length} records
                     </p>
                 </div>
 
@@ -225,7 +242,7 @@ export default function SalesHistory({ activeTab, setActiveTab }) {
                     <div className="flex justify-center items-center h-64">
                         <div className="animate-spin rounded-full h-12 w-12 border-t-2 border-b-2 border-amber-500"></div>
                     </div>
-                ) : filteredData.length === 0 ? (
+                ) : dailySalesData.length === 0 ? (
                     <div className="bg-white rounded-lg shadow-sm p-8 text-center">
                         <svg className="mx-auto h-12 w-12 text-gray-400" fill="none" viewBox="0 0 24 24" stroke="currentColor">
                             <path strokeLinecap="round" strokeLinejoin="round" strokeWidth={2} d="M9 17v-2m0 0V9m0 8h6m-6 0H7m12 0a9 9 0 11-18 0 9 9 0 0118 0z" />
@@ -240,7 +257,7 @@ export default function SalesHistory({ activeTab, setActiveTab }) {
                 ) : (
                     <div className="bg-white rounded-lg pl-6 shadow-sm overflow-hidden">
                         <div className="">
-                            {filteredData.map((sale) => (
+                            {dailySalesData.map((sale) => (
                                 <div key={sale.id} className="pr-6 py-6 pl-0 border- border-b-1 border-gray-200 hover:bg-amber-50 transition-all duration-200">
                                     <div className="flex justify-between items-center">
                                         <div className="flex-1">
@@ -263,6 +280,17 @@ export default function SalesHistory({ activeTab, setActiveTab }) {
                                 </div>
                             ))}
                         </div>
+                        {nextCursor && (
+                            <div className="flex justify-center py-4 pr-6">
+                                <button
+                                    onClick={() => fetchSales(currentFilters(), nextCursor)}
+                                    disabled={loadingMore}
+                                    className="px-3 py-1 text-xs sm:px-4 sm:py-2 sm:text-sm md:text-base bg-gray-200 text-gray-800 rounded-md hover:bg-gray-300 transition-colors"
+                                >
+                                    {loadingMore ? 'Loading...' : 'Load more'}
+                                </button>
+                            </div>
+                        )}
                     </div>
                 )}
             </div>
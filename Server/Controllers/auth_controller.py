@@ -1,16 +1,29 @@
 from flask import Blueprint, request, jsonify, session, Response
-from Models.database import get_db_conn
+from Models.database import get_db_conn, get_own_conn
+from Models import schema, idempotency, catalogue, versions, packaging, rollups
+from Models import top_items as top_items_model
+from Models.periods import filter_from_args
+from Models.response_cache import cached
+from Models.etags import etag
 import json
 from utils.hash_passwords import hash_password, check_password
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import pytz
 import secrets
+import base64
 from extensions import socketio, connected_users  # ← ONLY import, don't define here
 import psycopg2
+from psycopg2.extras import execute_values
 
 
 ALLOWED_ROLES = ['Staff', 'Admin', 'System Administrator']
 
+# data_versions resource for the user list (/users_account)
+USERS_RESOURCE = 'users'
+
+DAILY_SALES_PAGE_SIZE = 50
+DAILY_SALES_MAX_PAGE_SIZE = 200
+
 auth_bp = Blueprint('auth', __name__)
 
 
@@ -92,7 +105,9 @@ def register():
             'VALUES (%s, %s, %s, %s, %s, %s)',
             (first_name, last_name, username, email, hash_pass, role)
         )
+        version = versions.bump(cursor, USERS_RESOURCE)
         conn.commit()
+        versions.mark(USERS_RESOURCE, version)
         return jsonify({'message': 'Registered Successfully', 'redirect': '/members'}), 201
 
     except Exception as e:
@@ -118,9 +133,12 @@ def update_account():
 
     try:
         cursor.execute('UPDATE users_account SET first_name = %s, last_name = %s, email = %s, username = %s, phone_number = %s  WHERE id = %s', (fname, lname, email, username, phone, user['id']),)
+        updated = cursor.rowcount
+        version = versions.bump(cursor, USERS_RESOURCE)
         conn.commit()
+        versions.mark(USERS_RESOURCE, version)
 
-        if cursor.rowcount > 0:
+        if updated > 0:
             return jsonify({'message': 'Updated Successfully', 'redirect': '/dashboard'}), 201
         else:
             return jsonify({'message': 'No changes made'}), 200
@@ -265,41 +283,13 @@ def product_length():
 
 #view items in orders
 @auth_bp.route('/items', methods=['GET'])
+@etag(depends=(catalogue.RESOURCE,))
 def items():
-    conn = get_db_conn()
-    cursor = conn.cursor()
-
     try:
-        cursor.execute("""SELECT c.id as category_id,
-        c.name as category_name,
-        i.id as item_id,
-        i.name as item_name, 
-        i.price as price FROM categories c LEFT JOIN itemss i ON c.id = i.category_id ORDER BY c.id, i.id""")
-        rows = cursor.fetchall()
-        
-        categories = {}
-        for row in rows:
-            cat_id = row["category_id"]
-            if cat_id not in categories:
-                categories[cat_id] = {
-                    "category_id": cat_id,
-                    "category_name": row["category_name"],
-                    "items": []
-                }
-            if row["item_id"]:
-                categories[cat_id]["items"].append({
-                    "id": row["item_id"],
-                    "name": row["item_name"],
-                    "price": float(row["price"])
-                })
-
-        return jsonify(list(categories.values()))
-    
+        # served from the in-memory catalogue, rebuilt only when the menu changes
+        return Response(catalogue.items_json(), mimetype='application/json')
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @auth_bp.route('/orders/pending', methods=['POST'])
@@ -313,24 +303,29 @@ def create_pending_order():
         items = data.get('items', [])
         if not items:
             return jsonify({'error': 'No items in order'}), 400
+
+        # A retried request replays the original response instead of a
+        # duplicate, even if the menu has changed since the first attempt
+        idem_key = request.headers.get('Idempotency-Key')
+        if idem_key:
+            replay = idempotency.begin(cursor, 'POST /orders/pending', idem_key)
+            if replay:
+                return jsonify(replay[1]), replay[0]
+
+        # Prices must match the current menu (checked in memory); a 409 rolls
+        # back the key reservation above, so the client may retry with it
+        problems = catalogue.validate_items(items)
+        if problems:
+            return jsonify({'error': 'Items do not match the menu, please refresh', 'items': problems}), 409
         
-        # Calculate total from items
-        calculated_total = 0
-        for item in items:
-            quantity = item.get('quantity', 1)
-            price = item.get('price', 0)
-            calculated_total += quantity * price
-        
-        # Use provided total if valid, otherwise use calculated total
+        # The stored total is always the menu-priced sum of the lines; a
+        # client total that disagrees means its cart is stale
+        total_to_use = catalogue.order_total(items)
         provided_total = data.get('total')
-        if provided_total is None or not isinstance(provided_total, (int, float)):
-            total_to_use = calculated_total
-        else:
-            total_to_use = provided_total
-
-        # Ensure total is never None
-        if total_to_use is None:
-            total_to_use = 0.0
+        if provided_total is not None and (not isinstance(provided_total, (int, float))
+                                           or abs(provided_total - total_to_use) > 0.005):
+            return jsonify({'error': 'Order total does not match its items, please refresh',
+                            'total': total_to_use}), 409
 
         # Ensure items is properly converted to JSON string
         items_json = json.dumps(items)
@@ -353,9 +348,19 @@ def create_pending_order():
         result = cursor.fetchone()
         pending_order_id = result['id']
         created_at = result['created_at']
+
+        response = {
+            'message': 'Pending order created successfully', 
+            'pending_order_id': pending_order_id
+        }
+        if idem_key:
+            idempotency.finish(cursor, 'POST /orders/pending', idem_key, 201, response)
         
         conn.commit()
 
+        if idem_key:
+            idempotency.remember('POST /orders/pending', idem_key, 201, response)
+
         print(f"✅ Pending order #{pending_order_id} created successfully")
         
         # 🔔 Broadcast notification to ALL connected users (admins/staff)
@@ -370,10 +375,7 @@ def create_pending_order():
             "type": "pending_order"
         })
 
-        return jsonify({
-            'message': 'Pending order created successfully', 
-            'pending_order_id': pending_order_id
-        }), 201
+        return jsonify(response), 201
     
     except Exception as e:
         conn.rollback()
@@ -530,20 +532,29 @@ def create_order():
         items = data.get('items', [])
         if not items:
             return jsonify({'error': 'No items in order'}), 400
+
+        # A retried request replays the original response instead of a
+        # duplicate, even if the menu has changed since the first attempt
+        idem_key = request.headers.get('Idempotency-Key')
+        if idem_key:
+            replay = idempotency.begin(cursor, 'POST /orders', idem_key)
+            if replay:
+                return jsonify(replay[1]), replay[0]
+
+        # Prices must match the current menu (checked in memory); a 409 rolls
+        # back the key reservation above, so the client may retry with it
+        problems = catalogue.validate_items(items)
+        if problems:
+            return jsonify({'error': 'Items do not match the menu, please refresh', 'items': problems}), 409
         
-        # Calculate total from items if not provided or invalid
-        calculated_total = 0
-        for item in items:
-            quantity = item.get('quantity', 1)
-            price = item.get('price', 0)
-            calculated_total += quantity * price
-        
-        # Use provided total if valid, otherwise use calculated total
+        # The stored total is always the menu-priced sum of the lines; a
+        # client total that disagrees means its cart is stale
+        total_to_use = catalogue.order_total(items)
         provided_total = data.get('total')
-        if provided_total is None or not isinstance(provided_total, (int, float)):
-            total_to_use = calculated_total
-        else:
-            total_to_use = provided_total
+        if provided_total is not None and (not isinstance(provided_total, (int, float))
+                                           or abs(provided_total - total_to_use) > 0.005):
+            return jsonify({'error': 'Order total does not match its items, please refresh',
+                            'total': total_to_use}), 409
 
         # Calculate packaging cost
         packaging_cost = get_packaging_cost_for_items(items)
@@ -568,7 +579,7 @@ def create_order():
                 cursor.execute("""
                     INSERT INTO orders (customer_name, order_type, payment_method, total, order_time, packaging_cost, status, created_by)
                     VALUES (%s, %s, %s, %s, %s, %s, 'CONFIRMED', %s)
-                    RETURNING id
+                    RETURNING id, order_time
                 """, (
                     data.get('customer_name', 'Walk-in customer'),
                     data.get('order_type', 'Dine-in'),
@@ -583,7 +594,7 @@ def create_order():
                 cursor.execute("""
                     INSERT INTO orders (customer_name, order_type, payment_method, total, packaging_cost, status, created_by)
                     VALUES (%s, %s, %s, %s, %s, 'CONFIRMED', %s)
-                    RETURNING id
+                    RETURNING id, order_time
                 """, (
                     data.get('customer_name', 'Walk-in customer'),
                     data.get('order_type', 'Dine-in'),
@@ -598,7 +609,7 @@ def create_order():
                 cursor.execute("""
                     INSERT INTO orders (customer_name, order_type, payment_method, total, order_time, status, created_by)
                     VALUES (%s, %s, %s, %s, %s, 'CONFIRMED', %s)
-                    RETURNING id
+                    RETURNING id, order_time
                 """, (
                     data.get('customer_name', 'Walk-in customer'),
                     data.get('order_type', 'Dine-in'),
@@ -612,7 +623,7 @@ def create_order():
                 cursor.execute("""
                     INSERT INTO orders (customer_name, order_type, payment_method, total, status, created_by)
                     VALUES (%s, %s, %s, %s, 'CONFIRMED', %s)
-                    RETURNING id
+                    RETURNING id, order_time
                 """, (
                     data.get('customer_name', 'Walk-in customer'),
                     data.get('order_type', 'Dine-in'),
@@ -621,21 +632,28 @@ def create_order():
                     user_id
                 ))
 
-        order_id = cursor.fetchone()['id']
+        created = cursor.fetchone()
+        order_id = created['id']
         
         # Insert order items
-        for item in items:
-            cursor.execute("""
-                INSERT INTO order_items (order_id, item_id, quantity, price)
-                VALUES (%s, %s, %s, %s)
-            """, (
-                order_id,
-                item.get('id'),
-                item.get('quantity', 1),
-                item.get('price', 0)
-            ))
+        insert_order_items(cursor, order_id, created['order_time'], items)
+        rollups.record_orders(cursor, [order_id])
+        orders_version = versions.bump(cursor, rollups.RESOURCE)
+
+        response = {
+            'message': 'Created successfully', 
+            'order_id': order_id,
+            'packaging_cost': packaging_cost,
+            'order_time': order_time or 'default'  # Return the time for confirmation
+        }
+        if idem_key:
+            idempotency.finish(cursor, 'POST /orders', idem_key, 201, response)
         
         conn.commit()
+        versions.mark(rollups.RESOURCE, orders_version)
+
+        if idem_key:
+            idempotency.remember('POST /orders', idem_key, 201, response)
 
         user_id = session.get("user", {}).get("id")
         if user_id and user_id in connected_users:
@@ -645,12 +663,7 @@ def create_order():
                 "type": "personal"
             }, to=connected_users[user_id])
             
-        return jsonify({
-            'message': 'Created successfully', 
-            'order_id': order_id,
-            'packaging_cost': packaging_cost,
-            'order_time': order_time or 'default'  # Return the time for confirmation
-        }), 201
+        return jsonify(response), 201
     
     except Exception as e:
         conn.rollback()
@@ -660,22 +673,24 @@ def create_order():
         cursor.close()
         conn.close()
 
+def insert_order_items(cursor, order_id, order_time, items):
+    """
+    Write all lines of an order in one multi-row INSERT. Lines carry their
+    order's order_time, the key order_items is partitioned on.
+    """
+    if not items:
+        return
+    execute_values(cursor, """
+        INSERT INTO order_items (order_id, order_time, item_id, quantity, price)
+        VALUES %s
+    """, [
+        (order_id, order_time, item.get('id'), item.get('quantity', 1), item.get('price', 0))
+        for item in items
+    ], page_size=len(items))
+
 def check_packaging_cost_column_exists():
-    conn = get_db_conn()
-    cur = conn.cursor()
-    try:
-        cur.execute("""
-            SELECT column_name 
-            FROM information_schema.columns 
-            WHERE table_name='orders' AND column_name='packaging_cost'
-        """)
-        return cur.fetchone() is not None
-    except Exception as e:
-        print("Error checking column existence:", e)
-        return False
-    finally:
-        cur.close()
-        conn.close()
+    # answered from the startup schema snapshot, no catalog query per order
+    return schema.has_column('orders', 'packaging_cost')
 
 @auth_bp.route('/pending-orders/<int:pending_id>/confirm', methods=['POST'])
 def confirm_pending_order(pending_id):
@@ -685,73 +700,66 @@ def confirm_pending_order(pending_id):
     try:
         # Check if packaging_cost column exists
         packaging_column_exists = check_packaging_cost_column_exists()
-        
-        cursor.execute("SELECT * FROM pending_orders WHERE id = %s", (pending_id,))
-        pending_order = cursor.fetchone()
-        if not pending_order:
-            return jsonify({"error": "Pending order not found"}), 404
-
-        items_data = pending_order['items']
-        items = json.loads(items_data) if isinstance(items_data, str) else items_data
-        order_total = pending_order['total'] or sum(item.get('quantity', 1) * item.get('price', 0) for item in items)
-
-        # Calculate packaging cost
-        packaging_cost = get_packaging_cost_for_items(items)
-
-        # Insert into main orders with created_by and approved_by
-        if packaging_column_exists:
-            cursor.execute("""
-                INSERT INTO orders (customer_name, order_type, payment_method, total, packaging_cost, status, created_by, confirmed_by)
-                VALUES (%s, %s, %s, %s, %s, 'CONFIRMED', %s, %s)
-                RETURNING id
-            """, (
-                pending_order['customer_name'],
-                pending_order['order_type'],
-                pending_order['payment_method'],
-                float(order_total),
-                float(packaging_cost),
-                pending_order['user_id'],          # creator of pending order
-                session.get('user', {}).get('id') # staff confirming it
-            ))
-        else:
-            cursor.execute("""
-                INSERT INTO orders (customer_name, order_type, payment_method, total, status, created_by, confirmed_by)
-                VALUES (%s, %s, %s, %s, 'CONFIRMED', %s, %s)
-                RETURNING id
-            """, (
-                pending_order['customer_name'],
-                pending_order['order_type'],
-                pending_order['payment_method'],
-                float(order_total),
-                pending_order['user_id'],          # creator of pending order
-                session.get('user', {}).get('id') # staff confirming it
-            ))
-            
-        order_id = cursor.fetchone()['id']
 
-        # Insert order items
-        for item in items:
-            cursor.execute("""
-                INSERT INTO order_items (order_id, item_id, quantity, price)
-                VALUES (%s, %s, %s, %s)
-            """, (
-                order_id,
-                item.get('id'),
-                item.get('quantity', 1),
-                item.get('price', 0)
-            ))
-
-        # Update approved_by before deleting
-        user_id = session.get('user', {}).get('id')
-        cursor.execute("""
-            UPDATE pending_orders
-            SET confirmed_by = %s
-            WHERE id = %s
-        """, (user_id, pending_id))
+        # unit packaging costs come from the in-memory engine
+        pkg_item_ids, pkg_costs = packaging.cost_arrays()
+
+        # One statement: DELETE ... RETURNING locks and removes the pending row,
+        # its JSON lines are expanded with jsonb_to_recordset and copied into
+        # orders/order_items. A second confirm of the same id waits on the row
+        # lock, then finds nothing to move and gets a 404.
+        cursor.execute(f"""
+            WITH moved AS (
+                DELETE FROM pending_orders
+                WHERE id = %(pending_id)s
+                RETURNING customer_name, order_type, payment_method, total, items, user_id
+            ),
+            lines AS (
+                SELECT l.id AS item_id,
+                       COALESCE(l.quantity, 1) AS quantity,
+                       COALESCE(l.price, 0) AS price
+                FROM moved,
+                     jsonb_to_recordset(moved.items::jsonb) AS l(id INT, quantity INT, price NUMERIC)
+            ),
+            packaging AS (
+                SELECT COALESCE(SUM(lines.quantity * u.cost), 0) AS cost
+                FROM lines
+                JOIN unnest(%(pkg_item_ids)s::INT[], %(pkg_costs)s::NUMERIC[]) AS u(item_id, cost)
+                    ON u.item_id = lines.item_id
+            ),
+            new_order AS (
+                INSERT INTO orders (customer_name, order_type, payment_method, total,
+                                    {'packaging_cost, ' if packaging_column_exists else ''}status, created_by, confirmed_by)
+                SELECT m.customer_name, m.order_type, m.payment_method,
+                       COALESCE(NULLIF(m.total, 0), (SELECT SUM(quantity * price) FROM lines), 0),
+                       {'p.cost, ' if packaging_column_exists else ''}'CONFIRMED', m.user_id, %(confirmed_by)s
+                FROM moved m, packaging p
+                RETURNING id, order_time
+            ),
+            new_items AS (
+                INSERT INTO order_items (order_id, order_time, item_id, quantity, price)
+                SELECT n.id, n.order_time, l.item_id, l.quantity, l.price
+                FROM new_order n, lines l
+            )
+            SELECT n.id AS order_id, p.cost AS packaging_cost
+            FROM new_order n, packaging p
+        """, {
+            'pending_id': pending_id,
+            'pkg_item_ids': pkg_item_ids,
+            'pkg_costs': pkg_costs,
+            'confirmed_by': session.get('user', {}).get('id'),  # staff confirming it
+        })
+        row = cursor.fetchone()
+        if not row:
+            conn.rollback()
+            return jsonify({"error": "Pending order not found"}), 404
 
-        # Delete pending order
-        cursor.execute("DELETE FROM pending_orders WHERE id = %s", (pending_id,))
+        order_id = row['order_id']
+        packaging_cost = float(row['packaging_cost'])
+        rollups.record_orders(cursor, [order_id])
+        orders_version = versions.bump(cursor, rollups.RESOURCE)
         conn.commit()
+        versions.mark(rollups.RESOURCE, orders_version)
 
         socketio.emit('order_confirmed',  {
             "message": f"Pending order #{pending_id} confirmed by staff.",
@@ -806,18 +814,20 @@ def cancel_pending_order(pending_id):
 
 #all months
 @auth_bp.route('/orders/months', methods=['GET'])
+@etag(depends=(rollups.RESOURCE,))
+@cached(depends=(rollups.RESOURCE,))
 def months():
     conn = get_db_conn()
     cursor = conn.cursor()
 
     try:
+        # read from the daily rollup, not the whole orders history
         cursor.execute("""SELECT 
-                            EXTRACT (YEAR FROM order_time) AS YEAR, 
-                            EXTRACT (MONTH FROM order_time) AS MONTH,
-                            COUNT (*) AS total_orders, 
-                            SUM(total) AS total_sales 
-                        FROM orders
-                       WHERE status = 'CONFIRMED'
+                            EXTRACT (YEAR FROM day) AS YEAR, 
+                            EXTRACT (MONTH FROM day) AS MONTH,
+                            SUM(order_count)::BIGINT AS total_orders, 
+                            SUM(revenue) AS total_sales 
+                        FROM sales_daily_rollup
                         GROUP BY year, month
                         ORDER BY year, month """)
         rows = cursor.fetchall()
@@ -836,7 +846,7 @@ def months():
     
     except Exception as e:
         print(e)
-        return jsonify({"error message": e})
+        return jsonify({"error": str(e)}), 500
     
     finally:
         cursor.close()
@@ -844,6 +854,8 @@ def months():
 
 #all years
 @auth_bp.route('/orders/year', methods=['GET'])
+@etag(depends=(rollups.RESOURCE,))
+@cached(depends=(rollups.RESOURCE,))
 def years():
 
     conn = get_db_conn()
@@ -851,10 +863,10 @@ def years():
 
     try:
         cursor.execute("""SELECT 
-                            EXTRACT (YEAR FROM order_time) AS YEAR, 
-                            COUNT (*) AS total_orders, 
-                            SUM(total) AS total_sales 
-                        FROM orders
+                            EXTRACT (YEAR FROM day) AS YEAR, 
+                            SUM(order_count)::BIGINT AS total_orders, 
+                            SUM(revenue) AS total_sales 
+                        FROM sales_daily_rollup
                         GROUP BY year
                         ORDER BY year """)
         rows = cursor.fetchall()
@@ -872,7 +884,7 @@ def years():
     
     except Exception as e:
         print(e)
-        return jsonify({"error message": e})
+        return jsonify({"error": str(e)}), 500
     
     finally:
         cursor.close()
@@ -886,25 +898,22 @@ def monthly():
     try:
         cursor.execute("""
             SELECT 
-                EXTRACT(YEAR FROM order_time) AS year, 
-                EXTRACT(MONTH FROM order_time) AS month,
-                COUNT(*) AS total_orders, 
-                SUM(total) AS total_sales 
-            FROM orders
-            WHERE status = %s
-            AND EXTRACT(YEAR FROM order_time) = EXTRACT(YEAR FROM CURRENT_DATE)
-            AND EXTRACT(MONTH FROM order_time) = EXTRACT(MONTH FROM CURRENT_DATE)
-            GROUP BY year, month
-        """, ('CONFIRMED',))
+                EXTRACT(YEAR FROM CURRENT_DATE) AS year, 
+                EXTRACT(MONTH FROM CURRENT_DATE) AS month,
+                COALESCE(SUM(order_count), 0) AS total_orders, 
+                COALESCE(SUM(revenue), 0) AS total_sales 
+            FROM sales_daily_rollup
+            WHERE day >= date_trunc('month', CURRENT_DATE)
+            AND day < date_trunc('month', CURRENT_DATE) + INTERVAL '1 month'
+        """)
 
         rows = cursor.fetchone()
 
         cursor.execute("""
-                    SELECT *
+                    SELECT id, total
                     FROM orders
-                    WHERE EXTRACT(YEAR FROM order_time) = EXTRACT(YEAR FROM CURRENT_DATE)
-                    AND EXTRACT(MONTH FROM order_time) = EXTRACT(MONTH FROM CURRENT_DATE);
-
+                    WHERE order_time >= date_trunc('month', CURRENT_DATE)
+                    AND order_time < date_trunc('month', CURRENT_DATE) + INTERVAL '1 month';
                        """)
         orders = cursor.fetchall()
 
@@ -927,22 +936,78 @@ def monthly():
     
     except Exception as e:
         print(e)
-        return jsonify({"error message": e})
+        return jsonify({"error": str(e)}), 500
     
     finally:
         cursor.close()
         conn.close()
     
 
+def format_order_time(date, today=None):
+    """'Today • 09:15 AM', 'Yesterday • ...' or 'Mar 02, 2025 • ...' in Manila time"""
+    today = today or datetime.today().date()
+    manila = pytz.timezone('Asia/Manila')
+
+    if date.date() == today:
+        return "Today • " + date.astimezone(manila).strftime("%I:%M %p")
+    elif date.date() == today - timedelta(days=1): 
+        return "Yesterday • " + date.astimezone(manila).strftime("%I:%M %p")
+    else: 
+        return date.astimezone(manila).strftime("%b %d, %Y • %I:%M %p")
+
+def encode_sales_cursor(order_time, order_id):
+    raw = f"{order_time.isoformat()}|{order_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_sales_cursor(value):
+    raw = base64.urlsafe_b64decode(value.encode()).decode()
+    order_time, order_id = raw.rsplit('|', 1)
+    return datetime.fromisoformat(order_time), int(order_id)
+
 @auth_bp.route('/daily-sales', methods=['GET'])
 def daily():
+    # Filters: year/month or start/end (YYYY-MM-DD, end inclusive),
+    # payment_method, order_type; keyset paging on (order_time, id)
+    limit = request.args.get('limit', DAILY_SALES_PAGE_SIZE, type=int) or DAILY_SALES_PAGE_SIZE
+    limit = max(1, min(limit, DAILY_SALES_MAX_PAGE_SIZE))
+    conditions = ["status = %s"]
+    params = ['CONFIRMED']
+
+    try:
+        period_sql, period_params = filter_from_args('order_time', request.args)
+        conditions.append(period_sql)
+        params.extend(period_params)
+
+        for column in ('payment_method', 'order_type'):
+            value = request.args.get(column)
+            if value and value != 'all':
+                conditions.append(f"{column} = %s")
+                params.append(value)
+
+        cursor_arg = request.args.get('cursor')
+        if cursor_arg:
+            conditions.append("(order_time, id) < (%s, %s)")
+            params.extend(decode_sales_cursor(cursor_arg))
+    except (ValueError, TypeError):
+        return jsonify({"error": "Invalid filter or cursor"}), 400
+
     conn = get_db_conn()
     cursor = conn.cursor()
     
     try: 
-        cursor.execute('SELECT * FROM orders WHERE status = %s ORDER BY order_time DESC;', ('CONFIRMED',))
+        cursor.execute(f"""
+            SELECT id, order_type, payment_method, total, order_time
+            FROM orders
+            WHERE {' AND '.join(conditions)}
+            ORDER BY order_time DESC, id DESC
+            LIMIT %s
+        """, params + [limit + 1])
         rows = cursor.fetchall()
 
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_sales_cursor(rows[-1]['order_time'], rows[-1]['id'])
         
         today = datetime.today().date()
         result = []
@@ -950,13 +1015,7 @@ def daily():
         for row in rows:
 
             date = row['order_time'] if isinstance(row['order_time'], datetime) else datetime.strptime(str(row['order_time']), "%Y-%m-%d %H:%M:%S.%f")
-
-            if date.date() == today:
-                pht = "Today • " + date.astimezone(pytz.timezone('Asia/Manila')).strftime("%I:%M %p")
-            elif date.date() == today - timedelta(days=1): 
-                pht =  "Yesterday • " + date.astimezone(pytz.timezone('Asia/Manila')).strftime("%I:%M %p")
-            else: 
-                pht = date.astimezone(pytz.timezone('Asia/Manila')).strftime("%b %d, %Y • %I:%M %p")
+            pht = format_order_time(date, today)
 
             result.append({
                 "id": row['id'],
@@ -968,7 +1027,7 @@ def daily():
                 "date": date
             })
 
-        return jsonify(result)
+        return jsonify({"orders": result, "next_cursor": next_cursor})
     
     except Exception as e:
         return jsonify({"error": str(e)})
@@ -995,13 +1054,7 @@ def recentSale():
         for row in rows:
 
             date = row['order_time'] if isinstance(row['order_time'], datetime) else datetime.strptime(str(row['order_time']), "%Y-%m-%d %H:%M:%S.%f")
-
-            if date.date() == today:
-                pht = "Today • " + date.astimezone(pytz.timezone('Asia/Manila')).strftime("%I:%M %p")
-            elif date.date() == today - timedelta(days=1): 
-                pht =  "Yesterday • " + date.astimezone(pytz.timezone('Asia/Manila')).strftime("%I:%M %p")
-            else: 
-                pht = date.astimezone(pytz.timezone('Asia/Manila')).strftime("%b %d, %Y • %I:%M %p")
+            pht = format_order_time(date, today)
 
             result.append({
                 "id": row['id'],
@@ -1052,17 +1105,20 @@ def recentOrder():
 
 #fetch users
 @auth_bp.route('/users_account', methods=['GET'])
+@etag(depends=(USERS_RESOURCE,), private=True)
 def users():
     conn = get_db_conn()
     cursor = conn.cursor()
     id = session.get('user', {}).get('id')
 
     if not id:
+        cursor.close()
+        conn.close()
         return jsonify({"error": "Unauthorized"}), 401
 
 
     try:
-        cursor.execute('SELECT * FROM users_account')
+        cursor.execute('SELECT id, first_name, last_name, email, role FROM users_account')
         rows = cursor.fetchall()
 
         result = []
@@ -1078,55 +1134,38 @@ def users():
     
         return jsonify(result)
     except Exception as e:
-        return jsonify({'error': str(e)})
+        return jsonify({'error': str(e)}), 500
     
     finally:
         cursor.close()
         conn.close()
 
-#top items
+#top items over a window: ?window=today|7d|30d|all|custom&start=&end=&k=
 @auth_bp.route('/top_items', methods=['GET'])
+@etag(depends=(rollups.RESOURCE, catalogue.RESOURCE), vary=lambda: date.today())
+@cached(depends=(rollups.RESOURCE, catalogue.RESOURCE), vary=lambda: date.today())
 def top_items():
-    conn = get_db_conn()
-    cursor = conn.cursor()
+    window = request.args.get('window', 'all')
+    # without k every item is listed, as before the window support
+    k = None
+    if 'k' in request.args:
+        k = request.args.get('k', type=int)
+        if k is None or not 1 <= k <= top_items_model.MAX_K:
+            return jsonify({"error": f"k must be between 1 and {top_items_model.MAX_K}"}), 400
 
     try:
-        cursor.execute("""
-                         SELECT 
-    oi.item_id,
-    i.name AS product_name,
-    i.status AS product_status,
-    i.price AS product_price,
-    SUM(oi.quantity) AS total_quantity,
-    SUM(oi.quantity * oi.price) AS total_sales
-FROM order_items oi
-LEFT JOIN orders o ON oi.order_id = o.id
-LEFT JOIN itemss i ON oi.item_id = i.id
-GROUP BY 
-    oi.item_id, 
-    i.name,
-    i.status,
-    i.price
-ORDER BY total_quantity DESC;
-
-                        """)
-        items = cursor.fetchall()
+        start, end = top_items_model.window_range(window, request.args.get('start'), request.args.get('end'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-        result = []
+    conn = get_db_conn()
+    cursor = conn.cursor()
 
-        for item in items:
-            result.append({
-                "item_id": item['item_id'],
-                "product_name": item['product_name'],
-                "product_price": item['product_price'],
-                "product_status": item['product_status'],
-                "total_quantity": item['total_quantity'],
-                "total_sales": item['total_sales'],
-            })
-        return jsonify(result)
+    try:
+        return jsonify(top_items_model.top_k(cursor, k, start, end))
 
     except Exception as e:
-        return jsonify({"message": str(e)})
+        return jsonify({"error": str(e)}), 500
     
     finally:
         cursor.close()
@@ -1190,7 +1229,7 @@ def order_details(id):
                 approver.first_name AS approver_first_name,
                 approver.last_name AS approver_last_name
             FROM orders o
-            JOIN order_items oi ON o.id = oi.order_id
+            JOIN order_items oi ON o.id = oi.order_id AND oi.order_time = o.order_time
             JOIN itemss i ON oi.item_id = i.id
             LEFT JOIN users_account creator ON o.created_by = creator.id
             LEFT JOIN users_account approver ON o.confirmed_by = approver.id
@@ -1233,8 +1272,9 @@ def order_details(id):
         conn.close()
 
 def update_last_activity(user_id):
+    # runs inside socket events; commits on its own connection
     try:
-        conn = get_db_conn()
+        conn = get_own_conn()
         cursor = conn.cursor()
         cursor.execute("""
             UPDATE users_account
@@ -1260,11 +1300,16 @@ def update_product(id):
 
     try:
         cursor.execute('UPDATE itemss SET price = %s, status = %s WHERE id = %s', (price, status, id))
+        version = versions.bump(cursor, catalogue.RESOURCE)
         conn.commit()
+        versions.mark(catalogue.RESOURCE, version)
 
         return jsonify({'message': 'product price and status updated successfully'})
     except Exception as e:
         return jsonify({'error': str(e)})
+    finally:
+        cursor.close()
+        conn.close()
 
 
 
@@ -1308,11 +1353,15 @@ def change_role():
     cursor = conn.cursor()
 
     if role not in ALLOWED_ROLES:
+            cursor.close()
+            conn.close()
             return jsonify({"error": "Invalid Role"}), 400
 
     try:
         cursor.execute("UPDATE users_account SET role = %s WHERE id = %s", (role, id))
+        version = versions.bump(cursor, USERS_RESOURCE)
         conn.commit()
+        versions.mark(USERS_RESOURCE, version)
 
         return jsonify({"message": "Role updated successfully"})
     
@@ -1342,7 +1391,9 @@ def delete_user(id):
 
         # Then delete
         cursor.execute('DELETE FROM users_account WHERE id = %s', (id,))
+        version = versions.bump(cursor, USERS_RESOURCE)
         conn.commit()
+        versions.mark(USERS_RESOURCE, version)
     
         return jsonify({"message": "User Deleted Successfully"}), 200
     
@@ -1357,61 +1408,9 @@ def delete_user(id):
 def get_packaging_cost_for_items(items):
     """
     items: list of dicts, each with 'id' and 'quantity'
-    Returns: total packaging cost for this order
+    Returns: total packaging cost for this order (in memory, no query)
     """
-    if not items:
-        return 0.0
-
-    conn = get_db_conn()
-    cur = conn.cursor()
-
-    # Collect item IDs
-    item_ids = [item['id'] for item in items]
-    
-    # First, get the category for each menu item
-    cur.execute("""
-        SELECT id, category_id 
-        FROM itemss 
-        WHERE id = ANY(%s)
-    """, (item_ids,))
-    
-    menu_items = cur.fetchall()
-    item_category_map = {item['id']: item['category_id'] for item in menu_items}
-    
-    # Get all packaging costs
-    cur.execute("""
-        SELECT pc.category_id, pi.name as item_name, pc.cost
-        FROM packaging_costs pc
-        JOIN packaging_items pi ON pc.item_id = pi.id
-    """)
-    
-    packaging_costs = cur.fetchall()
-    
-    # Create a mapping of category_id to packaging costs by item type
-    packaging_cost_map = {}
-    for cost in packaging_costs:
-        category_id = cost['category_id']
-        item_name = cost['item_name']
-        if category_id not in packaging_cost_map:
-            packaging_cost_map[category_id] = {}
-        packaging_cost_map[category_id][item_name] = float(cost['cost'])
-
-    total_packaging = 0
-    
-    # Calculate packaging cost for each item
-    for item in items:
-        item_id = item['id']
-        category_id = item_category_map.get(item_id)
-        
-        if category_id and category_id in packaging_cost_map:
-            category_costs = packaging_cost_map[category_id]
-            # Sum all packaging costs for this category
-            item_packaging_cost = sum(category_costs.values())
-            total_packaging += item_packaging_cost * item.get('quantity', 1)
-
-    cur.close()
-    conn.close()
-    return total_packaging
+    return packaging.cost_for_items(items)
 
 
 @auth_bp.route('/orders/<int:id>', methods=['POST'])
@@ -1420,15 +1419,29 @@ def delete_order(id):
     cursor = conn.cursor()
 
     try:
-        # Delete related items first
-        cursor.execute('DELETE FROM order_items WHERE order_id = %s', (id,))
+        cursor.execute('SELECT order_time FROM orders WHERE id = %s', (id,))
+        found = cursor.fetchone()
+        if not found:
+            return jsonify({'message': 'No order found with that ID'}), 404
+
+        # Take the order out of the rollups while its rows still exist
+        removed_version = rollups.unrecord_orders(cursor, [id])
+
+        # order_time as well as the id, so only that month's partition is touched
+        cursor.execute('DELETE FROM order_items WHERE order_id = %s AND order_time = %s',
+                       (id, found['order_time']))
         
         # Now delete the order itself
-        cursor.execute('DELETE FROM orders WHERE id = %s', (id,))
+        cursor.execute('DELETE FROM orders WHERE id = %s AND order_time = %s', (id, found['order_time']))
+        deleted = cursor.rowcount
+        orders_version = versions.bump(cursor, rollups.RESOURCE) if deleted else None
         
         conn.commit()  # save changes
+        if orders_version:
+            versions.mark(rollups.REMOVED_RESOURCE, removed_version)
+            versions.mark(rollups.RESOURCE, orders_version)
 
-        if cursor.rowcount > 0:
+        if deleted > 0:
             return jsonify({'message': 'Order deleted successfully'})
         else:
             return jsonify({'message': 'No order found with that ID'}), 404
@@ -1449,56 +1462,31 @@ def get_product_by_id(id):
     cursor = conn.cursor()
 
     try:
+        # sales figures come from product_stats, kept current on order writes
         cursor.execute("""
-                SELECT 
-    i.id AS product_id,
-    i.image_url AS image_url,
-    i.status AS status,
-    i.name AS product_name,
-    i.category_id AS category,
-    i.price AS price,
-    c.name AS category_name,
-    
-    -- Total quantity sold
-    COALESCE(SUM(oi.quantity), 0) AS total_quantity,
-
-    -- Total sales
-    COALESCE(SUM(oi.quantity * oi.price), 0) AS total_sales,
-
-    -- Gross profit per unit
-    COALESCE(pgp.gross_profit, 0) AS gross_profit,
-
-    -- Total gross profit
-    COALESCE(SUM(oi.quantity * pgp.gross_profit), 0) AS total_gross_profit,
-
-    -- Profit margin
-    CASE 
-        WHEN i.price > 0 THEN (pgp.gross_profit / i.price) * 100
-        ELSE 0
-    END AS profit_margin_percentage,
-
-    -- Packaging cost for the category only
-    (SELECT SUM(pc.cost)
-     FROM packaging_costs pc
-     WHERE pc.category_id = i.category_id) AS packaging_cost
-
-FROM itemss i
-LEFT JOIN categories c ON i.category_id = c.id
-LEFT JOIN product_gross_profit pgp ON pgp.product_id = i.id
-LEFT JOIN order_items oi ON oi.item_id = i.id
-LEFT JOIN orders o ON oi.order_id = o.id
-
-WHERE i.id = %s
-GROUP BY 
-    i.id, 
-    i.name,
-    i.category_id,
-    i.price,
-    c.name,
-    pgp.gross_profit;
-
-
-                """, (id,))
+            SELECT
+                i.id AS product_id,
+                i.image_url AS image_url,
+                i.status AS status,
+                i.name AS product_name,
+                i.category_id AS category,
+                i.price AS price,
+                c.name AS category_name,
+                COALESCE(s.units_sold, 0) AS total_quantity,
+                COALESCE(s.revenue, 0) AS total_sales,
+                COALESCE(pgp.gross_profit, 0) AS gross_profit,
+                COALESCE(s.gross_profit, 0) AS total_gross_profit,
+                s.last_sold_at,
+                CASE
+                    WHEN i.price > 0 THEN (pgp.gross_profit / i.price) * 100
+                    ELSE 0
+                END AS profit_margin_percentage
+            FROM itemss i
+            LEFT JOIN categories c ON i.category_id = c.id
+            LEFT JOIN product_gross_profit pgp ON pgp.product_id = i.id
+            LEFT JOIN product_stats s ON s.product_id = i.id
+            WHERE i.id = %s
+        """, (id,))
         product = cursor.fetchone()
 
         if not product:
@@ -1517,7 +1505,8 @@ GROUP BY
             "gross_profit": product["gross_profit"],
             "total_gross_profit": product["total_gross_profit"],
             "profit_margin_percentage": product["profit_margin_percentage"],
-            "packaging_cost": product["packaging_cost"]
+            "packaging_cost": packaging.unit_costs().get(id, 0.0),
+            "last_sold_at": product["last_sold_at"]
         })
 
     except:
@@ -0,0 +1,270 @@
+from flask import Blueprint, request, jsonify, session
+from Models.database import get_db_conn, blocking_db
+from Models import schema, packaging, rollups, versions
+import csv
+import io
+import json
+import math
+from datetime import datetime
+
+bulk_bp = Blueprint('bulk_orders', __name__)
+
+MAX_BULK_ORDERS = 10000
+MAX_INT = 2 ** 31 - 1  # staging and order_items columns are INT
+
+
+def parse_ndjson(text):
+    """One order per line: {"client_ref", "customer_name", ..., "items": [...]}"""
+    orders, errors = [], []
+    for line_no, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            order = json.loads(line)
+        except json.JSONDecodeError as e:
+            errors.append({"line": line_no, "error": f"Invalid JSON: {e}"})
+            continue
+        if not isinstance(order, dict):
+            errors.append({"line": line_no, "error": "Order must be a JSON object"})
+            continue
+        order.setdefault('client_ref', str(line_no))
+        orders.append(order)
+    return orders, errors
+
+
+def parse_csv(text):
+    """
+    One order line per row; rows sharing a client_ref make up one order.
+    Columns: client_ref, customer_name, order_type, payment_method,
+    order_date, total, item_id, quantity, price
+    """
+    orders, errors = {}, []
+    reader = csv.DictReader(io.StringIO(text))
+    missing = [c for c in ('client_ref', 'item_id') if c not in (reader.fieldnames or [])]
+    if missing:
+        return [], [{"line": 1, "error": f"Missing CSV columns: {', '.join(missing)}"}]
+
+    for row in reader:
+        ref = row.get('client_ref') or str(reader.line_num)
+        order = orders.setdefault(ref, {
+            "client_ref": ref,
+            "customer_name": row.get('customer_name') or None,
+            "order_type": row.get('order_type') or None,
+            "payment_method": row.get('payment_method') or None,
+            "order_date": row.get('order_date') or None,
+            "total": row.get('total') or None,
+            "items": [],
+        })
+        order['items'].append({
+            "id": row.get('item_id'),
+            "quantity": row.get('quantity') or 1,
+            "price": row.get('price') or 0,
+        })
+    return list(orders.values()), errors
+
+
+def _whole_number(value):
+    """int() that refuses 2.5 instead of truncating it (CSV gives strings, JSON numbers)."""
+    number = float(value)
+    if not number.is_integer():
+        raise ValueError(value)
+    return int(number)
+
+
+def parse_order_date(value):
+    """
+    datetime-local from the POS ("YYYY-MM-DDTHH:MM[:SS]", a space also
+    works), or None. Parsed here so one bad date cannot fail the COPY
+    for the whole batch.
+    """
+    if value in (None, ''):
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"Invalid order_date: {value!r}")
+    try:
+        return datetime.fromisoformat(value.strip())
+    except ValueError:
+        raise ValueError(f"Invalid order_date: {value!r}, expected YYYY-MM-DDTHH:MM")
+
+
+def normalize_order(order):
+    """Returns (header, lines) ready for staging, or raises ValueError."""
+    items = order.get('items') or []
+    if not isinstance(items, list) or not items:
+        raise ValueError('No items in order')
+
+    lines = []
+    for item in items:
+        if not isinstance(item, dict):
+            raise ValueError(f"Invalid item: {item!r}")
+        try:
+            item_id = _whole_number(item.get('id'))
+            quantity = _whole_number(item.get('quantity', 1))
+            price = float(item.get('price', 0))
+        except (TypeError, ValueError, OverflowError):
+            raise ValueError(f"Invalid item: {item}")
+        if not 0 < item_id <= MAX_INT:
+            raise ValueError(f"Invalid item id: {item_id}")
+        if not 0 < quantity <= MAX_INT or price < 0 or not math.isfinite(price):
+            raise ValueError(f"Invalid quantity or price for item {item_id}")
+        lines.append((item_id, quantity, price))
+
+    total = order.get('total')
+    try:
+        total = float(total) if total not in (None, '') else None
+    except (TypeError, ValueError):
+        total = None
+    if total is not None and not math.isfinite(total):
+        total = None
+    if total is None:
+        total = sum(quantity * price for _, quantity, price in lines)
+
+    order_time = parse_order_date(order.get('order_date'))
+
+    header = (
+        str(order.get('customer_name') or 'Walk-in customer'),
+        str(order.get('order_type') or 'Dine-in'),
+        str(order.get('payment_method') or 'Cash'),
+        total,
+        order_time,
+        packaging.cost_for_items([{"id": item_id, "quantity": quantity} for item_id, quantity, _ in lines]),
+    )
+    return header, lines
+
+
+def copy_rows(cursor, table, columns, rows):
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)
+    buf.seek(0)
+    with blocking_db():
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buf)
+
+
+#bulk ingest of orders queued offline by the POS tablets
+@bulk_bp.route('/orders/bulk', methods=['POST'])
+def bulk_create_orders():
+    text = request.get_data(as_text=True)
+    fmt = request.args.get('format') or ('csv' if 'csv' in (request.content_type or '') else 'ndjson')
+
+    if fmt == 'csv':
+        orders, errors = parse_csv(text)
+    else:
+        orders, errors = parse_ndjson(text)
+
+    if len(orders) > MAX_BULK_ORDERS:
+        return jsonify({'error': f'At most {MAX_BULK_ORDERS} orders per batch'}), 413
+
+    # Validate in Python; refs are positions so client refs can be any string
+    refs = {}
+    staged_orders, staged_items = [], []
+    for order in orders:
+        client_ref = str(order.get('client_ref'))
+        try:
+            header, lines = normalize_order(order)
+        except ValueError as e:
+            errors.append({"client_ref": client_ref, "error": str(e)})
+            continue
+        ref = len(refs)
+        refs[ref] = client_ref
+        staged_orders.append((ref,) + header)
+        staged_items.extend((ref,) + line for line in lines)
+
+    if not staged_orders:
+        return jsonify({'inserted': [], 'errors': errors}), 400
+
+    conn = get_db_conn()
+    cursor = conn.cursor()
+    user_id = session.get("user", {}).get("id")
+
+    try:
+        cursor.execute("""
+            CREATE TEMP TABLE staging_orders (
+                ref INT PRIMARY KEY,
+                order_id INT,
+                customer_name TEXT,
+                order_type TEXT,
+                payment_method TEXT,
+                total NUMERIC,
+                order_time TIMESTAMP,
+                packaging_cost NUMERIC DEFAULT 0
+            ) ON COMMIT DROP;
+            CREATE TEMP TABLE staging_order_items (
+                ref INT,
+                item_id INT,
+                quantity INT,
+                price NUMERIC
+            ) ON COMMIT DROP;
+        """)
+
+        copy_rows(cursor, 'staging_orders',
+                  ['ref', 'customer_name', 'order_type', 'payment_method', 'total', 'order_time', 'packaging_cost'],
+                  staged_orders)
+        copy_rows(cursor, 'staging_order_items', ['ref', 'item_id', 'quantity', 'price'], staged_items)
+
+        # Orders referencing unknown menu items are rejected as a whole
+        cursor.execute("""
+            DELETE FROM staging_orders s
+            WHERE EXISTS (
+                SELECT 1 FROM staging_order_items si
+                LEFT JOIN itemss i ON i.id = si.item_id
+                WHERE si.ref = s.ref AND i.id IS NULL
+            )
+            RETURNING s.ref
+        """)
+        for row in cursor.fetchall():
+            errors.append({"client_ref": refs[row['ref']], "error": "Unknown item in order"})
+
+        # Packaging cost was priced in memory; reserve the order ids and fix
+        # the order times, which the lines need too
+        cursor.execute("""
+            UPDATE staging_orders
+            SET order_id = nextval(pg_get_serial_sequence('orders', 'id')),
+                order_time = COALESCE(order_time, CURRENT_TIMESTAMP)
+        """)
+
+        if schema.has_column('orders', 'packaging_cost'):
+            cursor.execute("""
+                INSERT INTO orders (id, customer_name, order_type, payment_method, total, order_time, packaging_cost, status, created_by)
+                SELECT order_id, customer_name, order_type, payment_method, total,
+                       order_time, packaging_cost, 'CONFIRMED', %s
+                FROM staging_orders
+                ORDER BY ref
+            """, (user_id,))
+        else:
+            cursor.execute("""
+                INSERT INTO orders (id, customer_name, order_type, payment_method, total, order_time, status, created_by)
+                SELECT order_id, customer_name, order_type, payment_method, total,
+                       order_time, 'CONFIRMED', %s
+                FROM staging_orders
+                ORDER BY ref
+            """, (user_id,))
+
+        cursor.execute("""
+            INSERT INTO order_items (order_id, order_time, item_id, quantity, price)
+            SELECT s.order_id, s.order_time, si.item_id, si.quantity, si.price
+            FROM staging_order_items si
+            JOIN staging_orders s ON s.ref = si.ref
+        """)
+
+        cursor.execute("SELECT ref, order_id, packaging_cost FROM staging_orders ORDER BY ref")
+        inserted = [{
+            "client_ref": refs[row['ref']],
+            "order_id": row['order_id'],
+            "packaging_cost": float(row['packaging_cost']),
+        } for row in cursor.fetchall()]
+
+        rollups.record_orders(cursor, [row['order_id'] for row in inserted])
+        orders_version = versions.bump(cursor, rollups.RESOURCE)
+        conn.commit()
+        versions.mark(rollups.RESOURCE, orders_version)
+
+        print(f"✅ Bulk ingest: {len(inserted)} orders inserted, {len(errors)} rejected")
+        return jsonify({'inserted': inserted, 'errors': errors}), 201 if inserted else 400
+
+    except Exception as e:
+        conn.rollback()
+        print("Bulk order ingest error:", e)
+        return jsonify({'error': 'Server error', 'details': str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
@@ -0,0 +1,171 @@
+from flask import Blueprint, request, jsonify, session
+from Models.database import get_db_conn
+from Models import rollups, top_items
+from Models.periods import filter_from_args
+from Models.response_cache import cached
+from Models.etags import etag
+from Controllers.auth_controller import format_order_time
+from config import Config
+from datetime import datetime
+import time
+
+dashboard_bp = Blueprint('dashboard', __name__)
+
+SECTIONS = ['recent_sales', 'current_month', 'years', 'top_items', 'pending_orders']
+
+# Every section is a scalar subquery of one SELECT, so the whole dashboard
+# is a single round trip. clock_timestamp() is read between sections to get
+# per-section server timings.
+# all-time best sellers; ORDER BY ... LIMIT lets Postgres use a top-N heapsort
+TOP_ITEMS_SQL = top_items.totals_query()[0] + f"""
+    ORDER BY total_quantity DESC, total_sales DESC
+    LIMIT {top_items.DEFAULT_K}
+"""
+
+SNAPSHOT_SQL = f"""
+    SELECT
+        clock_timestamp() AS t0,
+        (SELECT COALESCE(json_agg(r), '[]')
+         FROM (SELECT id, order_type, payment_method, total, order_time
+               FROM orders
+               WHERE status = 'CONFIRMED'
+               ORDER BY order_time DESC
+               LIMIT 4) r) AS recent_sales,
+        clock_timestamp() AS t1,
+        (SELECT row_to_json(m)
+         FROM (SELECT EXTRACT(YEAR FROM CURRENT_DATE) AS year,
+                      EXTRACT(MONTH FROM CURRENT_DATE) AS month,
+                      COALESCE(SUM(order_count), 0) AS total_orders,
+                      COALESCE(SUM(revenue), 0) AS total_sales,
+                      (SELECT COALESCE(json_agg(json_build_object('id', o.id, 'total', o.total)), '[]')
+                       FROM orders o
+                       WHERE o.order_time >= date_trunc('month', CURRENT_DATE)
+                       AND o.order_time < date_trunc('month', CURRENT_DATE) + INTERVAL '1 month') AS orders
+               FROM sales_daily_rollup
+               WHERE day >= date_trunc('month', CURRENT_DATE)
+               AND day < date_trunc('month', CURRENT_DATE) + INTERVAL '1 month') m) AS current_month,
+        clock_timestamp() AS t2,
+        (SELECT COALESCE(json_agg(y ORDER BY y.year), '[]')
+         FROM (SELECT EXTRACT(YEAR FROM day) AS year,
+                      SUM(order_count)::BIGINT AS total_orders,
+                      SUM(revenue) AS total_sales
+               FROM sales_daily_rollup
+               GROUP BY 1) y) AS years,
+        clock_timestamp() AS t3,
+        (SELECT COALESCE(json_agg(t), '[]') FROM ({TOP_ITEMS_SQL}) t) AS top_items,
+        clock_timestamp() AS t4,
+        (SELECT COALESCE(json_agg(p ORDER BY p.created_at DESC), '[]')
+         FROM (SELECT po.id, po.customer_name, po.order_type, po.total,
+                      po.created_at, u.username AS created_by_username
+               FROM pending_orders po
+               LEFT JOIN users_account u ON po.user_id = u.id) p) AS pending_orders,
+        clock_timestamp() AS t5
+"""
+
+
+#everything Admin.jsx needs on load, in one request and one query
+@dashboard_bp.route('/dashboard/snapshot', methods=['GET'])
+def dashboard_snapshot():
+    started = time.perf_counter()
+    conn = get_db_conn()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(SNAPSHOT_SQL)
+        row = cursor.fetchone()
+
+        today = datetime.today().date()
+        recent_sales = [{
+            "id": sale['id'],
+            "order_type": sale['order_type'],
+            "payment_method": sale['payment_method'],
+            "total": sale['total'],
+            "order_time": format_order_time(datetime.fromisoformat(sale['order_time']), today)
+        } for sale in row['recent_sales']]
+
+        month = row['current_month']
+        current_month = [{
+            "year": int(month['year']),
+            "month": int(month['month']),
+            "total_orders": int(month['total_orders']),
+            "total_sales": int(month['total_sales']),
+            "orders": month['orders']
+        }]
+
+        timings = {
+            name: round((row[f't{i + 1}'] - row[f't{i}']).total_seconds() * 1000, 2)
+            for i, name in enumerate(SECTIONS)
+        }
+        timings['total'] = round((time.perf_counter() - started) * 1000, 2)
+
+        user = session.get('user')
+        return jsonify({
+            "recent_sales": recent_sales,
+            "current_month": current_month,
+            "years": row['years'],
+            "top_items": row['top_items'],
+            "pending_orders": row['pending_orders'],
+            "pending_orders_count": len(row['pending_orders']),
+            "user": {
+                'user': user,
+                'logged_in': user is not None,
+                'role': user['role'] if user else None
+            },
+            "timings_ms": timings
+        })
+
+    except Exception as e:
+        print("Dashboard snapshot error:", e)
+        return jsonify({"error": str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+#orders and revenue by weekday x hour (shop-local), for staffing the counter
+@dashboard_bp.route('/sales/heatmap', methods=['GET'])
+@etag(depends=(rollups.RESOURCE,))
+@cached(depends=(rollups.RESOURCE,))
+def sales_heatmap():
+    try:
+        period_sql, params = filter_from_args('hour', request.args)
+    except ValueError:
+        return jsonify({"error": "Dates must be YYYY-MM-DD"}), 400
+
+    conn = get_db_conn()
+    cursor = conn.cursor()
+
+    try:
+        # at most 24 x 365 bucket rows a year, never the orders table
+        cursor.execute(f"""
+            SELECT EXTRACT(ISODOW FROM hour)::INT AS weekday,
+                   EXTRACT(HOUR FROM hour)::INT AS hour,
+                   SUM(order_count) AS order_count,
+                   SUM(revenue) AS revenue
+            FROM sales_hourly_rollup
+            WHERE {period_sql}
+            GROUP BY 1, 2
+        """, params)
+
+        order_counts = [[0] * 24 for _ in WEEKDAYS]
+        revenue = [[0.0] * 24 for _ in WEEKDAYS]
+        for row in cursor.fetchall():
+            order_counts[row['weekday'] - 1][row['hour']] = int(row['order_count'])
+            revenue[row['weekday'] - 1][row['hour']] = float(row['revenue'])
+
+        return jsonify({
+            "timezone": Config.REPORT_TIME_ZONE,
+            "weekdays": WEEKDAYS,
+            "hours": list(range(24)),
+            "order_count": order_counts,
+            "revenue": revenue
+        })
+
+    except Exception as e:
+        print("Sales heatmap error:", e)
+        return jsonify({"error": str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
@@ -0,0 +1,99 @@
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from Models.database import get_pool
+from Models import schema
+from Models.periods import filter_from_args
+import csv
+import io
+import json
+
+export_bp = Blueprint('sales_export', __name__)
+
+# rows pulled from the server-side cursor per round trip
+EXPORT_CHUNK_SIZE = 2000
+
+
+def export_rows(conditions, params):
+    """Yields chunks of confirmed orders from a named (server-side) cursor."""
+    columns = "id, order_time, customer_name, order_type, payment_method, total"
+    if schema.has_column('orders', 'packaging_cost'):
+        columns += ", packaging_cost"
+
+    conn = get_pool().getconn()
+    try:
+        cursor = conn.cursor(name='sales_export')
+        cursor.itersize = EXPORT_CHUNK_SIZE
+        cursor.execute(f"""
+            SELECT {columns}
+            FROM orders
+            WHERE {' AND '.join(conditions)}
+            ORDER BY order_time, id
+        """, params)
+        while True:
+            rows = cursor.fetchmany(EXPORT_CHUNK_SIZE)
+            if not rows:
+                break
+            yield rows
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def format_row(row):
+    return {
+        "id": row['id'],
+        "order_time": row['order_time'].isoformat() if row['order_time'] else None,
+        "customer_name": row['customer_name'],
+        "order_type": row['order_type'],
+        "payment_method": row['payment_method'],
+        "total": float(row['total']) if row['total'] is not None else None,
+        "packaging_cost": float(row['packaging_cost']) if row.get('packaging_cost') is not None else None,
+    }
+
+
+def ndjson_stream(chunks):
+    for rows in chunks:
+        yield ''.join(json.dumps(format_row(row)) + '\n' for row in rows)
+
+
+def csv_stream(chunks):
+    fields = ['id', 'order_time', 'customer_name', 'order_type', 'payment_method', 'total', 'packaging_cost']
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=fields)
+    writer.writeheader()
+    for rows in chunks:
+        for row in rows:
+            writer.writerow(format_row(row))
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+#stream full sales history for accounting, memory stays flat
+@export_bp.route('/sales/export', methods=['GET'])
+def export_sales():
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in ('ndjson', 'csv'):
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+
+    conditions = ["status = %s"]
+    params = ['CONFIRMED']
+    try:
+        period_sql, period_params = filter_from_args('order_time', request.args)
+        conditions.append(period_sql)
+        params.extend(period_params)
+    except (ValueError, TypeError):
+        return jsonify({'error': 'Invalid date filter'}), 400
+
+    chunks = export_rows(conditions, params)
+    if fmt == 'csv':
+        body, mimetype = csv_stream(chunks), 'text/csv'
+    else:
+        body, mimetype = ndjson_stream(chunks), 'application/x-ndjson'
+
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=sales_history.{fmt}'}
+    )
@@ -0,0 +1,102 @@
+"""
+Period aggregation over confirmed orders.
+
+    aggregate('month', start, end, metrics=('revenue', 'gross_profit'))
+
+returns one row per period, newest first, from a single date_trunc
+grouped query. Day and coarser periods read sales_daily_rollup; hours
+need the order times, so they read orders directly. With
+ANALYTICS_COLUMNAR=1 the same rows come from the NumPy snapshot instead.
+"""
+from Models.database import get_db_conn
+from Models.periods import range_filter
+from Models import rollups, columnar
+
+GRANULARITIES = ('hour', 'day', 'week', 'month', 'year')
+METRICS = ('order_count', 'revenue', 'packaging_cost', 'gross_profit')
+
+_ROLLUP_METRICS = {
+    'order_count': "SUM(order_count)",
+    'revenue': "SUM(revenue)",
+    'packaging_cost': "SUM(packaging_cost)",
+    'gross_profit': "SUM(gross_profit)",
+}
+
+
+def _orders_metrics():
+    return {
+        'order_count': "COUNT(*)",
+        'revenue': "SUM(o.total)",
+        'packaging_cost': f"SUM({rollups.packaging_cost_expr()})",
+        'gross_profit': "COALESCE(SUM(gp.gross_profit), 0)",
+    }
+
+
+def build_query(granularity, start=None, end=None, metrics=METRICS):
+    """(sql, params) for aggregate(); exposed for EXPLAIN and scripts."""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    unknown = [m for m in metrics if m not in METRICS]
+    if unknown or not metrics:
+        raise ValueError(f"metrics must be among {', '.join(METRICS)}")
+
+    if granularity == 'hour':
+        exprs = _orders_metrics()
+        columns = ", ".join(f"{exprs[m]} AS {m}" for m in metrics)
+        range_sql, params = range_filter('o.order_time', start, end)
+        # per-order gross profit, looked up only for the orders in range
+        gross_join = """
+            LEFT JOIN LATERAL (
+                SELECT SUM(oi.quantity * COALESCE(pgp.gross_profit, 0)) AS gross_profit
+                FROM order_items oi
+                LEFT JOIN product_gross_profit pgp ON pgp.product_id = oi.item_id
+                WHERE oi.order_id = o.id AND oi.order_time = o.order_time
+            ) gp ON TRUE
+        """ if 'gross_profit' in metrics else ""
+        sql = f"""
+            SELECT date_trunc('hour', o.order_time) AS period, {columns}
+            FROM orders o
+            {gross_join}
+            WHERE o.status = 'CONFIRMED' AND {range_sql}
+            GROUP BY 1
+            ORDER BY 1 DESC
+        """
+        return sql, params
+
+    columns = ", ".join(f"{_ROLLUP_METRICS[m]} AS {m}" for m in metrics)
+    range_sql, params = range_filter('day', start, end)
+    sql = f"""
+        SELECT date_trunc('{granularity}', day)::date AS period, {columns}
+        FROM sales_daily_rollup
+        WHERE {range_sql}
+        GROUP BY 1
+        ORDER BY 1 DESC
+    """
+    return sql, params
+
+
+def aggregate(granularity, start=None, end=None, metrics=METRICS):
+    """
+    Rows of {"period": date (datetime for hours), <metric>: number, ...}
+    for start <= time < end. Raises ValueError on an unknown granularity
+    or metric.
+    """
+    sql, params = build_query(granularity, start, end, metrics)
+
+    if columnar.available():
+        return columnar.snapshot().aggregate(granularity, start, end, metrics)
+
+    conn = get_db_conn()
+    cur = conn.cursor()
+
+    try:
+        cur.execute(sql, params)
+        rows = cur.fetchall()
+    finally:
+        cur.close()
+        conn.close()
+
+    return [{
+        "period": row['period'],
+        **{m: int(row[m]) if m == 'order_count' else float(row[m] or 0) for m in metrics},
+    } for row in rows]
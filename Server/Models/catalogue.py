@@ -0,0 +1,107 @@
+"""
+Process-wide menu/price catalogue built from categories and itemss.
+
+Kept until the 'catalogue' data version moves (update_product, or a NOTIFY
+from another worker), then rebuilt on next use. /items is served from the
+pre-serialized JSON and order prices are checked against it in memory.
+"""
+import json
+from Models.database import get_db_conn
+from Models import versions
+
+RESOURCE = 'catalogue'
+
+_built_version = None
+_items_json = None   # bytes of the /items response
+_prices = {}         # item_id -> price
+
+
+def _invalidate(version=None):
+    global _built_version
+    _built_version = None
+
+versions.subscribe(RESOURCE, _invalidate)
+
+
+def _build():
+    global _built_version, _items_json, _prices
+
+    version = versions.current(RESOURCE)
+    conn = get_db_conn()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("""SELECT c.id as category_id,
+        c.name as category_name,
+        i.id as item_id,
+        i.name as item_name, 
+        i.price as price FROM categories c LEFT JOIN itemss i ON c.id = i.category_id ORDER BY c.id, i.id""")
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+    categories = {}
+    prices = {}
+    for row in rows:
+        cat_id = row["category_id"]
+        if cat_id not in categories:
+            categories[cat_id] = {
+                "category_id": cat_id,
+                "category_name": row["category_name"],
+                "items": []
+            }
+        if row["item_id"]:
+            prices[row["item_id"]] = float(row["price"])
+            categories[cat_id]["items"].append({
+                "id": row["item_id"],
+                "name": row["item_name"],
+                "price": float(row["price"])
+            })
+
+    _items_json = json.dumps(list(categories.values())).encode('utf-8')
+    _prices = prices
+    _built_version = version
+
+
+def _ensure():
+    if _built_version is None or _built_version != versions.current(RESOURCE):
+        _build()
+
+
+def items_json():
+    _ensure()
+    return _items_json
+
+
+def version():
+    _ensure()
+    return _built_version
+
+
+def validate_items(items):
+    """Returns a list of problems with the client-supplied lines, empty if they match the menu."""
+    _ensure()
+    problems = []
+    for item in items:
+        try:
+            item_id = int(item.get('id'))
+            price = float(item.get('price') or 0)
+        except (TypeError, ValueError):
+            problems.append({"id": item.get('id'), "error": "Invalid item"})
+            continue
+        quantity = item.get('quantity', 1)
+        if item_id not in _prices:
+            problems.append({"id": item_id, "error": "Unknown item"})
+        elif abs(price - _prices[item_id]) > 0.005:
+            problems.append({"id": item_id, "error": "Price changed", "price": _prices[item_id]})
+        elif isinstance(quantity, bool) or not isinstance(quantity, int) or quantity < 1:
+            problems.append({"id": item_id, "error": "Invalid quantity"})
+    return problems
+
+
+def order_total(items):
+    """Menu-priced total of lines that passed validate_items()."""
+    _ensure()
+    total = sum(_prices[int(item['id'])] * item.get('quantity', 1) for item in items)
+    return round(total, 2)
@@ -0,0 +1,305 @@
+"""
+Optional in-process columnar copy of confirmed orders for ad-hoc analytics.
+
+Confirmed orders and their lines are held as NumPy column arrays: int32
+ids, int64 epoch seconds and float64 amounts. After the first full load,
+refresh() only fetches orders above the id watermark. A full reload
+happens only when the orders_removed counter that
+rollups.unrecord_orders() bumps has moved since the last load (an order
+was deleted). Checking it is one primary-key lookup. Group-by-period and per-product aggregates are
+computed with np.unique/np.bincount and never touch Postgres.
+
+Enabled with ANALYTICS_COLUMNAR=1 when numpy is installed; otherwise
+aggregation.aggregate() keeps using SQL.
+
+    cd Server && DB_URL=postgres://... python benchmarks/columnar_vs_sql.py
+"""
+from datetime import datetime, timezone
+from threading import Lock
+
+from psycopg2 import extensions
+from config import Config
+from Models.database import db_connection
+from Models import versions, rollups
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+FETCH_CHUNK = 100000
+EPOCH_MONDAY_OFFSET = 3  # 1970-01-01 was a Thursday
+
+GRANULARITIES = ('hour', 'day', 'week', 'month', 'year')
+METRICS = ('order_count', 'revenue', 'packaging_cost', 'gross_profit')
+
+
+def available():
+    return np is not None and Config.ANALYTICS_COLUMNAR
+
+
+class _Column:
+    """Append-only array with doubling capacity, so refreshes do not copy everything."""
+
+    def __init__(self, dtype):
+        self._data = np.empty(1024, dtype=dtype)
+        self.size = 0
+
+    def extend(self, values):
+        needed = self.size + len(values)
+        if needed > len(self._data):
+            grown = np.empty(max(needed, 2 * len(self._data)), dtype=self._data.dtype)
+            grown[:self.size] = self._data[:self.size]
+            self._data = grown
+        self._data[self.size:needed] = values
+        self.size = needed
+
+    @property
+    def values(self):
+        return self._data[:self.size]
+
+
+class ColumnarSnapshot:
+
+    # versions whose change makes the snapshot stale
+    DEPENDS = (rollups.RESOURCE, 'gross_profit', 'catalogue')
+
+    def __init__(self):
+        self._lock = Lock()
+        self._loaded_version = None
+        self._removed_version = None
+        self._reset()
+
+    def _reset(self):
+        self.watermark = 0
+        self.orders = {
+            'id': _Column(np.int32),
+            'time': _Column(np.int64),
+            'total': _Column(np.float64),
+            'packaging': _Column(np.float64),
+        }
+        self.lines = {
+            'order_id': _Column(np.int32),
+            'item_id': _Column(np.int32),
+            'time': _Column(np.int64),
+            'quantity': _Column(np.int32),
+            'price': _Column(np.float64),
+        }
+        self.item_price = np.zeros(1, dtype=np.float64)          # indexed by item id
+        self.item_gross_profit = np.zeros(1, dtype=np.float64)   # indexed by item id
+
+    # ---- loading ----
+
+    def _fetch(self, conn, name, sql, params):
+        """Tuples from a server-side cursor, FETCH_CHUNK rows at a time, as a float64 matrix."""
+        cur = conn.cursor(name=name, cursor_factory=extensions.cursor)
+        cur.itersize = FETCH_CHUNK
+        cur.execute(sql, params)
+        try:
+            while True:
+                rows = cur.fetchmany(FETCH_CHUNK)
+                if not rows:
+                    break
+                yield np.array(rows, dtype=np.float64)
+        finally:
+            cur.close()
+
+    def _read_lookups(self, conn):
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT i.id, i.price, COALESCE(pgp.gross_profit, 0) AS gross_profit
+            FROM itemss i
+            LEFT JOIN product_gross_profit pgp ON pgp.product_id = i.id
+        """)
+        rows = cur.fetchall()
+        cur.close()
+        size = max((row['id'] for row in rows), default=0) + 1
+        price, gross_profit = np.zeros(size), np.zeros(size)
+        for row in rows:
+            price[row['id']] = float(row['price'] or 0)
+            gross_profit[row['id']] = float(row['gross_profit'])
+        return price, gross_profit
+
+    def _read_removed_version(self, conn):
+        """How many times confirmed orders have been removed; a change forces a full reload."""
+        cur = conn.cursor()
+        cur.execute("SELECT version FROM data_versions WHERE resource = %s", (rollups.REMOVED_RESOURCE,))
+        row = cur.fetchone()
+        cur.close()
+        return row['version'] if row else 0
+
+    def refresh(self, conn=None):
+        """Bring the arrays up to date. Pass conn to load through a specific connection."""
+        with self._lock:
+            if conn is None:
+                with db_connection() as own:
+                    self._refresh(own)
+            else:
+                self._refresh(conn)
+
+    def _refresh(self, conn):
+        removed_version = self._read_removed_version(conn)
+        full = not self.watermark or removed_version != self._removed_version
+        watermark = 0 if full else self.watermark
+        fingerprint = versions.fingerprint(self.DEPENDS)
+
+        packaging = rollups.packaging_cost_expr()
+        order_chunks = list(self._fetch(conn, 'columnar_orders', f"""
+            SELECT o.id, EXTRACT(EPOCH FROM o.order_time)::BIGINT, o.total, {packaging}
+            FROM orders o
+            WHERE o.status = 'CONFIRMED' AND o.id > %s
+            ORDER BY o.id
+        """, (watermark,)))
+        # only lines of the orders just read: under READ COMMITTED an order
+        # committed in between would otherwise load its lines now and again
+        # with the order on the next refresh
+        last_id = int(order_chunks[-1][-1, 0]) if order_chunks else watermark
+        line_chunks = list(self._fetch(conn, 'columnar_lines', """
+            SELECT oi.order_id, oi.item_id, EXTRACT(EPOCH FROM o.order_time)::BIGINT, oi.quantity, oi.price
+            FROM orders o
+            JOIN order_items oi ON oi.order_id = o.id AND oi.order_time = o.order_time
+            WHERE o.status = 'CONFIRMED' AND o.id > %s AND o.id <= %s
+        """, (watermark, last_id)))
+        lookups = self._read_lookups(conn)
+
+        # no I/O from here on, so other green threads never see half an update
+        if full:
+            self._reset()
+        for chunk in order_chunks:
+            for i, column in enumerate(('id', 'time', 'total', 'packaging')):
+                self.orders[column].extend(chunk[:, i])
+        for chunk in line_chunks:
+            for i, column in enumerate(('order_id', 'item_id', 'time', 'quantity', 'price')):
+                self.lines[column].extend(chunk[:, i])
+        if self.orders['id'].size:
+            self.watermark = int(self.orders['id'].values[-1])
+        self.item_price, self.item_gross_profit = lookups
+        self._loaded_version = fingerprint
+        self._removed_version = removed_version
+
+    def ensure_fresh(self):
+        if self._loaded_version == versions.fingerprint(self.DEPENDS):
+            return
+        with self._lock:
+            if self._loaded_version != versions.fingerprint(self.DEPENDS):
+                with db_connection() as conn:
+                    self._refresh(conn)
+
+    # ---- queries ----
+
+    @staticmethod
+    def period_keys(times, granularity):
+        """Bucket epoch seconds; returns (keys, to_period) where to_period maps a key back."""
+        if granularity == 'hour':
+            return times // 3600, lambda k: datetime.fromtimestamp(int(k) * 3600, timezone.utc).replace(tzinfo=None)
+        days = times // 86400
+        if granularity == 'day':
+            return days, lambda k: np.datetime64(int(k), 'D').astype(object)
+        if granularity == 'week':
+            monday = (days + EPOCH_MONDAY_OFFSET) // 7 * 7 - EPOCH_MONDAY_OFFSET
+            return monday, lambda k: np.datetime64(int(k), 'D').astype(object)
+        if granularity == 'month':
+            return (days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64),
+                    lambda k: np.datetime64(int(k), 'M').astype('datetime64[D]').astype(object))
+        if granularity == 'year':
+            return (days.astype('datetime64[D]').astype('datetime64[Y]').astype(np.int64),
+                    lambda k: np.datetime64(int(k), 'Y').astype('datetime64[D]').astype(object))
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+
+    @staticmethod
+    def _epoch(value):
+        if value is None:
+            return None
+        if not isinstance(value, datetime):
+            value = datetime(value.year, value.month, value.day)
+        return int(value.replace(tzinfo=timezone.utc).timestamp())
+
+    def _range_mask(self, times, start, end):
+        mask = np.ones(len(times), dtype=bool)
+        if start is not None:
+            mask &= times >= self._epoch(start)
+        if end is not None:
+            mask &= times < self._epoch(end)
+        return mask
+
+    def aggregate(self, granularity, start=None, end=None, metrics=METRICS):
+        """Same rows as aggregation.aggregate(), newest period first."""
+        unknown = [m for m in metrics if m not in METRICS]
+        if unknown or not metrics:
+            raise ValueError(f"metrics must be among {', '.join(METRICS)}")
+
+        o_time = self.orders['time'].values
+        o_mask = self._range_mask(o_time, start, end)
+        o_keys, to_period = self.period_keys(o_time[o_mask], granularity)
+        periods, o_idx = np.unique(o_keys, return_inverse=True)
+
+        totals = {}
+        if 'order_count' in metrics:
+            totals['order_count'] = np.bincount(o_idx, minlength=len(periods))
+        if 'revenue' in metrics:
+            totals['revenue'] = np.bincount(o_idx, weights=self.orders['total'].values[o_mask], minlength=len(periods))
+        if 'packaging_cost' in metrics:
+            totals['packaging_cost'] = np.bincount(o_idx, weights=self.orders['packaging'].values[o_mask],
+                                                   minlength=len(periods))
+        if 'gross_profit' in metrics:
+            l_time = self.lines['time'].values
+            l_mask = self._range_mask(l_time, start, end)
+            item_ids = self.lines['item_id'].values[l_mask]
+            per_line = self.lines['quantity'].values[l_mask] * self._lookup(self.item_gross_profit, item_ids)
+            l_keys, _ = self.period_keys(l_time[l_mask], granularity)
+            totals['gross_profit'] = np.bincount(np.searchsorted(periods, l_keys), weights=per_line,
+                                                 minlength=len(periods))
+
+        return [{
+            "period": to_period(periods[i]),
+            **{m: int(totals[m][i]) if m == 'order_count' else float(totals[m][i]) for m in metrics},
+        } for i in range(len(periods) - 1, -1, -1)]
+
+    @staticmethod
+    def _lookup(table, ids):
+        out = np.zeros(len(ids), dtype=np.float64)
+        known = ids < len(table)
+        out[known] = table[ids[known]]
+        return out
+
+    def product_periods(self, product_id, granularity='month'):
+        """Units, revenue and gross profit for one product per period, newest first."""
+        mask = self.lines['item_id'].values == product_id
+        quantity = self.lines['quantity'].values[mask]
+        keys, to_period = self.period_keys(self.lines['time'].values[mask], granularity)
+        periods, idx = np.unique(keys, return_inverse=True)
+
+        price = self.item_price[product_id] if product_id < len(self.item_price) else 0.0
+        gross = self.item_gross_profit[product_id] if product_id < len(self.item_gross_profit) else 0.0
+        units = np.bincount(idx, weights=quantity, minlength=len(periods))
+
+        rows = []
+        for i in range(len(periods) - 1, -1, -1):
+            period = to_period(periods[i])
+            rows.append({
+                "period": period,
+                "units_sold": int(units[i]),
+                "revenue": float(units[i] * price),
+                "gross_profit": float(units[i] * gross),
+            })
+        return rows
+
+    def stats(self):
+        return {
+            "orders": self.orders['id'].size,
+            "lines": self.lines['order_id'].size,
+            "watermark": self.watermark,
+            "bytes": sum(c.values.nbytes for c in (*self.orders.values(), *self.lines.values())),
+        }
+
+
+_snapshot = None
+
+
+def snapshot():
+    """The process-wide snapshot, refreshed if an order or price changed since last use."""
+    global _snapshot
+    if _snapshot is None:
+        _snapshot = ColumnarSnapshot()
+    _snapshot.ensure_fresh()
+    return _snapshot
@@ -1,12 +1,315 @@
+import time
+from collections import deque
+from contextlib import contextmanager
+
 import psycopg2
+from psycopg2 import extensions
 from psycopg2.extras import RealDictCursor
+from flask import g, has_app_context
 from config import Config
 
-def get_db_conn():
+# Under eventlet the pool has to park green threads, not the OS thread that
+# runs the hub, so prefer eventlet's semaphore when it is available.
+try:
+    from eventlet.semaphore import BoundedSemaphore
+    from eventlet.hubs import trampoline
+except ImportError:
+    from threading import BoundedSemaphore
+    trampoline = None
+
+
+def eventlet_wait_callback(conn, timeout=-1):
+    """psycopg2 wait callback that yields to the eventlet hub while the server works."""
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            break
+        elif state == extensions.POLL_READ:
+            trampoline(conn.fileno(), read=True)
+        elif state == extensions.POLL_WRITE:
+            trampoline(conn.fileno(), write=True)
+        else:
+            raise psycopg2.OperationalError(f"Bad result from poll: {state!r}")
+
+def enable_green_db():
+    """Make every psycopg2 call cooperative. Needs eventlet.monkey_patch() first."""
+    if trampoline is None:
+        print("eventlet not installed, green DB mode disabled")
+        return False
+    extensions.set_wait_callback(eventlet_wait_callback)
+    return True
+
+def disable_green_db():
+    extensions.set_wait_callback(None)
+
+def green_db_enabled():
+    return extensions.get_wait_callback() is not None
+
+@contextmanager
+def blocking_db():
+    """
+    Temporarily drop the wait callback. psycopg2 refuses COPY in green mode,
+    so bulk loads run blocking; keep the work inside short.
+    """
+    callback = extensions.get_wait_callback()
+    extensions.set_wait_callback(None)
     try:
-        conn = psycopg2.connect(Config.DB_URL, cursor_factory=RealDictCursor)
+        yield
+    finally:
+        extensions.set_wait_callback(callback)
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out in time."""
+
+
+class PooledConnection:
+    """Wraps a pooled psycopg2 connection; close() hands it back to the pool."""
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+
+    def __getattr__(self, name):
+        if self._raw is None:
+            raise psycopg2.InterfaceError('connection already returned to pool')
+        return getattr(self._raw, name)
+
+    @property
+    def closed(self):
+        return 1 if self._raw is None else self._raw.closed
+
+    def close(self):
+        self.release()
+
+    def release(self):
+        if self._raw is not None:
+            raw, self._raw = self._raw, None
+            self._pool.release(raw)
+
+    def __del__(self):
+        # safety net for handlers that bail out without closing
+        if getattr(self, '_raw', None) is not None:
+            self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self._raw is not None and not self._raw.closed:
+                if exc_type is None:
+                    self._raw.commit()
+                else:
+                    self._raw.rollback()
+        finally:
+            self.close()
+        return False
+
+
+class RequestConnection(PooledConnection):
+    """
+    The connection shared by everything running in one Flask app context.
+    close() is a no-op so helpers can keep their usual get/close pattern;
+    close_request_conn() ends the transaction and releases it on teardown.
+    Helpers that commit on their own (e.g. update_last_activity) must use
+    get_own_conn() instead, or they would commit the caller's half-done work.
+    """
+
+    def close(self):
+        pass
+
+
+class ConnectionPool:
+    """
+    Bounded pool of psycopg2 connections.
+
+    - at most max_size connections are checked out or idle at any time
+    - idle connections older than idle_timeout are closed (down to min_size)
+    - a connection is checked before it is handed out again
+    """
+
+    def __init__(self, dsn, min_size=1, max_size=10, idle_timeout=300,
+                 checkout_timeout=10, ping_after=30):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.ping_after = ping_after
+
+        self._slots = BoundedSemaphore(max_size)
+        self._idle = deque()  # (raw connection, released_at)
+
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn, cursor_factory=RealDictCursor)
         print("Database Connected")
         return conn
+
+    def _discard(self, raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, raw, idle_for):
+        if raw.closed:
+            return False
+        if raw.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            return False
+        if idle_for < self.ping_after:
+            return True
+        try:
+            cur = raw.cursor()
+            cur.execute('SELECT 1')
+            cur.close()
+            raw.rollback()
+            return True
+        except Exception:
+            return False
+
+    def reap(self):
+        """Close idle connections past idle_timeout, keeping min_size."""
+        now = time.monotonic()
+        keep = deque()
+        while self._idle:
+            raw, released_at = self._idle.popleft()
+            expired = now - released_at > self.idle_timeout
+            if raw.closed or (expired and len(keep) + len(self._idle) >= self.min_size):
+                self._discard(raw)
+            else:
+                keep.append((raw, released_at))
+        self._idle.extend(keep)
+
+    def getconn(self, wrapper=PooledConnection):
+        if not self._slots.acquire(True, timeout=self.checkout_timeout):
+            raise PoolTimeout(f'no connection available after {self.checkout_timeout}s')
+
+        try:
+            self.reap()
+            while self._idle:
+                raw, released_at = self._idle.pop()  # most recently used first
+                if self._is_healthy(raw, time.monotonic() - released_at):
+                    return wrapper(self, raw)
+                self._discard(raw)
+            return wrapper(self, self._connect())
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, raw):
+        try:
+            if not raw.closed:
+                status = raw.get_transaction_status()
+                if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                    self._discard(raw)
+                    return
+                if status != extensions.TRANSACTION_STATUS_IDLE:
+                    # uncommitted work is dropped; request connections are
+                    # settled by close_request_conn() before they get here
+                    raw.rollback()
+                self._idle.append((raw, time.monotonic()))
+        except Exception:
+            self._discard(raw)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        conn = self.getconn()
+        with conn:
+            yield conn
+
+    def closeall(self):
+        while self._idle:
+            raw, _ = self._idle.pop()
+            self._discard(raw)
+
+    def stats(self):
+        return {
+            "max_size": self.max_size,
+            "idle": len(self._idle),
+        }
+
+
+_pool = None
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ConnectionPool(
+            Config.DB_URL,
+            min_size=Config.DB_POOL_MIN,
+            max_size=Config.DB_POOL_MAX,
+            idle_timeout=Config.DB_POOL_IDLE_TIMEOUT,
+            checkout_timeout=Config.DB_POOL_CHECKOUT_TIMEOUT,
+            ping_after=Config.DB_POOL_PING_AFTER,
+        )
+    return _pool
+
+def get_db_conn():
+    """
+    Inside a request (or any app context) every caller gets the same
+    connection, so one request is one connection and one transaction.
+    Outside an app context a plain pooled connection is returned.
+    """
+    try:
+        if not has_app_context():
+            return get_pool().getconn()
+
+        conn = g.get('_db_conn')
+        if conn is not None and conn.closed:
+            conn.release()  # server dropped it mid-request; take a fresh one
+            conn = None
+        if conn is None:
+            conn = get_pool().getconn(wrapper=RequestConnection)
+            g._db_conn = conn
+        return conn
+    except Exception as e:
+        print("Database Connection Failed:", e)
+        return None
+
+def get_own_conn():
+    """
+    A pooled connection that is never the request's shared one, for
+    helpers that commit or roll back their own transaction. close() it.
+    """
+    try:
+        return get_pool().getconn()
     except Exception as e:
         print("Database Connection Failed:", e)
         return None
+
+def mark_request_ok(response):
+    # only a 2xx/3xx answer commits what the handler left open; handlers
+    # that catch their own errors and return 4xx/5xx get a rollback
+    if response.status_code < 400:
+        g._db_commit = True
+    return response
+
+def close_request_conn(exc=None):
+    conn = g.pop('_db_conn', None)
+    commit = g.pop('_db_commit', False)
+    if conn is None:
+        return
+
+    try:
+        if not conn.closed:
+            if exc is None and commit:
+                conn.commit()
+            else:
+                conn.rollback()
+    except Exception as e:
+        print("Request transaction cleanup failed:", e)
+    finally:
+        conn.release()
+
+def init_app(app):
+    app.after_request(mark_request_ok)
+    app.teardown_appcontext(close_request_conn)
+
+@contextmanager
+def db_connection():
+    """with db_connection() as conn: ... commits on success, rolls back on error."""
+    with get_pool().connection() as conn:
+        yield conn
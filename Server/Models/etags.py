@@ -0,0 +1,47 @@
+"""
+Conditional GETs driven by the data_versions counters.
+
+The ETag of a response is derived from the endpoint, its query args and
+the versions of the resources it reads. When a client sends a matching
+If-None-Match, the view is not called at all: no query runs and no body
+is serialized, and the client gets a bare 304.
+"""
+from functools import wraps
+
+from flask import request, session, make_response, Response
+from Models.response_cache import cache_key, is_cacheable
+
+
+def compute_etag(depends, vary=None):
+    # same inputs as the response cache key: endpoint, args and versions
+    return cache_key(depends, vary)[:32]
+
+
+def etag(depends, private=False, vary=None):
+    """
+    Answer If-None-Match from version counters. private=True is for views
+    behind the session check: only logged-in clients get a 304, and the
+    response is marked as not shareable.
+    """
+    cache_control = 'private, no-cache' if private else 'no-cache'
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            tag = compute_etag(depends, vary)
+            allowed = not private or session.get('user') is not None
+
+            if allowed and request.if_none_match.contains_weak(tag):
+                response = Response(status=304)
+                response.set_etag(tag)
+                response.headers['Cache-Control'] = cache_control
+                return response
+
+            response = make_response(view(*args, **kwargs))
+            # an error body must not be revalidated into a 304 later
+            if is_cacheable(response):
+                response.set_etag(tag)
+                response.headers['Cache-Control'] = cache_control
+            return response
+        return wrapper
+    return decorator
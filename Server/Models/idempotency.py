@@ -0,0 +1,106 @@
+"""
+Idempotency-Key support for order creation.
+
+The key is reserved inside the order's own transaction, so a retry that
+races the original blocks on the row until the first attempt commits
+(and then replays its response) or rolls back (and then proceeds).
+Recent keys are also kept in a small in-process LRU to skip the lookup.
+"""
+import json
+import time
+from collections import OrderedDict
+from config import Config
+from Models.database import get_own_conn
+
+LRU_SIZE = 1024
+
+_recent = OrderedDict()  # (endpoint, key) -> (expires_at, status_code, body)
+
+
+def _ttl_seconds():
+    return Config.IDEMPOTENCY_TTL_HOURS * 3600
+
+
+def _lru_get(endpoint, key):
+    entry = _recent.get((endpoint, key))
+    if entry is None:
+        return None
+    if entry[0] < time.monotonic():
+        _recent.pop((endpoint, key), None)
+        return None
+    _recent.move_to_end((endpoint, key))
+    return entry[1], entry[2]
+
+
+def remember(endpoint, key, status_code, body):
+    """Cache a response after its transaction has committed."""
+    _recent[(endpoint, key)] = (time.monotonic() + _ttl_seconds(), status_code, body)
+    _recent.move_to_end((endpoint, key))
+    while len(_recent) > LRU_SIZE:
+        _recent.popitem(last=False)
+
+
+def begin(cursor, endpoint, key):
+    """
+    Reserve the key for this request.
+    Returns (status_code, body) to replay if the key was already used, else None.
+    """
+    cached = _lru_get(endpoint, key)
+    if cached:
+        return cached
+
+    # an expired row is taken over as if the key were new
+    cursor.execute("""
+        INSERT INTO idempotency_keys (endpoint, key)
+        VALUES (%s, %s)
+        ON CONFLICT (endpoint, key) DO UPDATE
+            SET status_code = NULL, response = NULL, created_at = NOW()
+            WHERE idempotency_keys.created_at < NOW() - make_interval(secs => %s)
+        RETURNING key
+    """, (endpoint, key, _ttl_seconds()))
+    if cursor.fetchone():
+        return None
+
+    cursor.execute("""
+        SELECT status_code, response
+        FROM idempotency_keys
+        WHERE endpoint = %s AND key = %s
+    """, (endpoint, key))
+    row = cursor.fetchone()
+    if not row or row['status_code'] is None:
+        return 409, {'error': 'A request with this Idempotency-Key is still in progress'}
+
+    remember(endpoint, key, row['status_code'], row['response'])
+    return row['status_code'], row['response']
+
+
+def finish(cursor, endpoint, key, status_code, body):
+    """Store the response alongside the order, in the same transaction."""
+    cursor.execute("""
+        UPDATE idempotency_keys
+        SET status_code = %s, response = %s
+        WHERE endpoint = %s AND key = %s
+    """, (status_code, json.dumps(body, default=str), endpoint, key))
+
+
+def purge_expired():
+    """Delete keys past their TTL. Expired keys are already ignored on lookup."""
+    conn = get_own_conn()
+    if conn is None:
+        return 0
+    cur = conn.cursor()
+
+    try:
+        cur.execute("""
+            DELETE FROM idempotency_keys
+            WHERE created_at < NOW() - make_interval(secs => %s)
+        """, (_ttl_seconds(),))
+        conn.commit()
+        return cur.rowcount
+    except Exception as e:
+        conn.rollback()
+        print("Error purging idempotency keys:", e)
+        return 0
+    finally:
+        cur.close()
+        conn.close()
@@ -0,0 +1,52 @@
+"""
+Periodic precompute work, registered with the scheduler at startup.
+"""
+from config import Config
+from Models import scheduler, idempotency, rollups, columnar, response_cache, partitioning
+
+# report endpoints worth having in the response cache before anyone asks
+WARM_PATHS = [
+    '/orders/year',
+    '/orders/months',
+    '/top_items',
+    '/summaries/daily',
+    '/summaries/monthly',
+    '/summaries/yearly',
+    '/product-analysis',
+    '/sales/heatmap',
+]
+
+
+def check_rollups():
+    """Recompute product_stats from scratch; rebuild the rollups if it drifted."""
+    if rollups.check_all():
+        return 'consistent'
+    return 'rebuilt' if rollups.rebuild_all() else False
+
+
+def warm_cache(app):
+    client = app.test_client()
+    warmed = sum(client.get(path).status_code == 200 for path in WARM_PATHS)
+    return f"{warmed}/{len(WARM_PATHS)} warmed"
+
+
+def refresh_columnar():
+    """Keep the snapshot warm so the next analytics request does not pay for the load."""
+    return columnar.snapshot().stats()
+
+
+def register_default_jobs(app):
+    scheduler.register('purge_idempotency_keys', '15 * * * *', idempotency.purge_expired, jitter=60)
+    scheduler.register('check_rollups', '30 3 * * *', check_rollups, jitter=300)
+    # next months' orders/order_items partitions; a no-op until they are partitioned
+    scheduler.register('ensure_partitions', '10 0 * * *', partitioning.ensure_all, jitter=300)
+
+    if Config.CACHE_ENABLED:
+        # a local LRU lives in each worker, so each worker warms its own
+        shared = isinstance(response_cache.get_backend(), response_cache.RedisBackend)
+        scheduler.register('warm_report_cache', '*/10 * * * *', lambda: warm_cache(app),
+                           jitter=30, leader_only=shared)
+
+    if columnar.available():
+        scheduler.register('refresh_columnar', '*/5 * * * *', refresh_columnar,
+                           jitter=30, leader_only=False)
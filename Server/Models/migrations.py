@@ -0,0 +1,165 @@
+"""
+Ordered schema changes. Applied once each, tracked in schema_migrations.
+
+    cd Server && python -m Models.migrations
+"""
+from Models.database import get_db_conn
+from Models import rollups
+
+# any constant works, it just has to be the same in every worker
+MIGRATION_LOCK_ID = 72010001
+
+# Each entry is SQL text or a callable taking the migration cursor
+MIGRATIONS = [
+    ('0001_idempotency_keys', """
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            endpoint TEXT NOT NULL,
+            key TEXT NOT NULL,
+            status_code INT,
+            response JSONB,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (endpoint, key)
+        );
+        CREATE INDEX IF NOT EXISTS idempotency_keys_created_at_idx
+            ON idempotency_keys (created_at);
+    """),
+    ('0002_data_versions', """
+        CREATE TABLE IF NOT EXISTS data_versions (
+            resource TEXT PRIMARY KEY,
+            version BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        );
+    """),
+    ('0003_sales_daily_rollup', """
+        CREATE TABLE IF NOT EXISTS sales_daily_rollup (
+            day DATE PRIMARY KEY,
+            order_count BIGINT NOT NULL DEFAULT 0,
+            revenue NUMERIC NOT NULL DEFAULT 0,
+            packaging_cost NUMERIC NOT NULL DEFAULT 0,
+            gross_profit NUMERIC NOT NULL DEFAULT 0
+        );
+    """),
+    # lines carry their order's time so order_items can be partitioned on it
+    # (python -m Models.partitioning convert). 0013 and 0015 sit ahead of the
+    # rollup backfills, which join order_items on order_time; applied
+    # migrations are tracked by name, so a database that ran them in their
+    # old place skips them.
+    ('0013_order_items_order_time', """
+        ALTER TABLE order_items ADD COLUMN IF NOT EXISTS order_time TIMESTAMP;
+        UPDATE order_items oi
+        SET order_time = o.order_time
+        FROM orders o
+        WHERE o.id = oi.order_id AND oi.order_time IS NULL;
+    """),
+    # lines are joined and deleted on (order_id, order_time), so a NULL time
+    # hides a line. Fill in lines written by workers older than 0013 and
+    # drop lines whose order no longer exists; every report joins through
+    # orders, so nothing could read them.
+    ('0015_order_items_order_time_not_null', """
+        UPDATE order_items oi
+        SET order_time = o.order_time
+        FROM orders o
+        WHERE o.id = oi.order_id AND oi.order_time IS NULL;
+        DELETE FROM order_items oi
+        WHERE oi.order_time IS NULL
+          AND NOT EXISTS (SELECT 1 FROM orders o WHERE o.id = oi.order_id);
+        ALTER TABLE order_items ALTER COLUMN order_time SET NOT NULL;
+    """),
+    ('0004_backfill_sales_daily_rollup', rollups.rebuild_daily),
+    ('0005_report_indexes', """
+        CREATE INDEX IF NOT EXISTS orders_status_order_time_idx
+            ON orders (status, order_time);
+        CREATE INDEX IF NOT EXISTS order_items_order_id_idx
+            ON order_items (order_id);
+        CREATE INDEX IF NOT EXISTS order_items_item_id_idx
+            ON order_items (item_id);
+    """),
+    ('0006_sales_hourly_rollup', """
+        CREATE TABLE IF NOT EXISTS sales_hourly_rollup (
+            hour TIMESTAMP PRIMARY KEY,  -- start of the hour, shop-local time
+            order_count BIGINT NOT NULL DEFAULT 0,
+            revenue NUMERIC NOT NULL DEFAULT 0
+        );
+    """),
+    ('0007_backfill_sales_hourly_rollup', rollups.rebuild_hourly),
+    ('0008_item_sales_daily', """
+        CREATE TABLE IF NOT EXISTS item_sales_daily (
+            day DATE NOT NULL,
+            item_id INT NOT NULL,
+            quantity BIGINT NOT NULL DEFAULT 0,
+            sales NUMERIC NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, item_id)
+        );
+    """),
+    ('0009_backfill_item_sales_daily', rollups.rebuild_item_sales),
+    ('0010_product_stats', """
+        CREATE TABLE IF NOT EXISTS product_stats (
+            product_id INT PRIMARY KEY,
+            units_sold BIGINT NOT NULL DEFAULT 0,
+            revenue NUMERIC NOT NULL DEFAULT 0,
+            gross_profit NUMERIC NOT NULL DEFAULT 0,
+            last_sold_at TIMESTAMP
+        );
+    """),
+    ('0011_backfill_product_stats', rollups.rebuild_product_stats),
+    ('0012_scheduled_jobs', """
+        CREATE TABLE IF NOT EXISTS scheduled_jobs (
+            name TEXT PRIMARY KEY,
+            last_slot TIMESTAMP,
+            last_started_at TIMESTAMP,
+            last_finished_at TIMESTAMP,
+            duration_ms NUMERIC,
+            status TEXT,
+            error TEXT,
+            result TEXT
+        );
+    """),
+    # gross profit edits read one product's days (rollups.refresh_gross_profit)
+    ('0014_item_sales_daily_item_index', """
+        CREATE INDEX IF NOT EXISTS item_sales_daily_item_id_idx
+            ON item_sales_daily (item_id, day);
+    """),
+]
+
+
+def run_migrations():
+    conn = get_db_conn()
+    if conn is None:
+        return False
+    cur = conn.cursor()
+
+    try:
+        # only one worker migrates, the others wait and then see nothing to do
+        cur.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK_ID,))
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                name TEXT PRIMARY KEY,
+                applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            )
+        """)
+        cur.execute("SELECT name FROM schema_migrations")
+        applied = {row['name'] for row in cur.fetchall()}
+
+        for name, sql in MIGRATIONS:
+            if name in applied:
+                continue
+            print(f"Applying migration {name}")
+            if callable(sql):
+                sql(cur)
+            else:
+                cur.execute(sql)
+            cur.execute("INSERT INTO schema_migrations (name) VALUES (%s)", (name,))
+
+        conn.commit()
+        return True
+    except Exception as e:
+        conn.rollback()
+        print("Migration failed:", e)
+        return False
+    finally:
+        cur.close()
+        conn.close()
+
+
+if __name__ == '__main__':
+    run_migrations()
@@ -0,0 +1,74 @@
+"""
+Packaging-cost engine shared by order creation, confirmation, bulk ingest
+and the finance summaries.
+
+A menu item's unit packaging cost is the sum of packaging_costs for its
+category. The item_id -> unit cost map is built with one query and kept
+until the 'packaging' (or 'catalogue') data version moves, so pricing an
+order is a dict lookup per line.
+"""
+from Models.database import get_db_conn
+from Models import versions
+
+RESOURCE = 'packaging'
+
+_unit_costs = None  # item_id -> unit packaging cost
+
+UNIT_COSTS_SQL = """
+    SELECT i.id, COALESCE(SUM(pc.cost), 0) AS unit_cost
+    FROM itemss i
+    LEFT JOIN packaging_costs pc ON pc.category_id = i.category_id
+    GROUP BY i.id
+"""
+
+
+def _invalidate(version=None):
+    global _unit_costs
+    _unit_costs = None
+
+versions.subscribe(RESOURCE, _invalidate)
+versions.subscribe('catalogue', _invalidate)
+
+
+def _build():
+    global _unit_costs
+
+    conn = get_db_conn()
+    cur = conn.cursor()
+
+    try:
+        cur.execute(UNIT_COSTS_SQL)
+        _unit_costs = {row['id']: float(row['unit_cost']) for row in cur.fetchall()}
+    finally:
+        cur.close()
+        conn.close()
+
+
+def unit_costs():
+    if _unit_costs is None:
+        _build()
+    return _unit_costs
+
+
+def cost_for_items(items):
+    """
+    items: list of dicts, each with 'id' and 'quantity'
+    Returns: total packaging cost for this order
+    """
+    if not items:
+        return 0.0
+
+    costs = unit_costs()
+    total = 0.0
+    for item in items:
+        try:
+            total += costs.get(int(item['id']), 0.0) * int(item.get('quantity', 1))
+        except (TypeError, ValueError, KeyError):
+            continue
+    return total
+
+
+def cost_arrays():
+    """(item_ids, unit_costs) for joining the map in SQL via unnest()."""
+    costs = unit_costs()
+    return list(costs.keys()), list(costs.values())
@@ -0,0 +1,385 @@
+"""
+Monthly range partitioning of orders and order_items on order_time.
+
+    cd Server && python -m Models.partitioning convert   # one-off, see below
+    cd Server && python -m Models.partitioning ensure    # create upcoming months
+    cd Server && python -m Models.partitioning status
+
+convert() runs as a single transaction and holds ACCESS EXCLUSIVE locks on
+both tables until it commits, so run it in a quiet window and take a
+backup first. It does the following:
+
+- builds partitioned copies of both tables, one partition per month from
+  the oldest order through PARTITION_MONTHS_AHEAD months ahead, plus a
+  DEFAULT partition for anything outside that range
+- copies the rows into the new tables
+- drops the old tables and gives the copies their names
+- recreates the indexes and foreign keys
+
+Postgres requires the partition key in every unique constraint. The
+primary keys therefore become (id, order_time), and order_items
+references orders on (order_id, order_time). Foreign keys from other
+tables into orders are dropped and listed in the output.
+
+Queries keep naming orders and order_items. A half-open range on
+order_time (Models/periods.py) lets the planner skip the months outside
+it. The ensure_partitions job creates each month's partitions before
+the month starts.
+"""
+import re
+import sys
+from datetime import date
+
+from config import Config
+from Models.database import get_own_conn
+
+# parents first: order_items references orders
+PARTITIONED = ('orders', 'order_items')
+PARTITION_KEY = 'order_time'
+
+
+def _add_months(month, n):
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _month_of(value):
+    return date(value.year, value.month, 1)
+
+
+def partition_name(table, month):
+    return f"{table}_p{month:%Y_%m}"
+
+
+def is_partitioned(cur, table):
+    cur.execute("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)) AS p",
+                (table,))
+    return cur.fetchone()['p']
+
+
+def partitions(cur, table):
+    """[{name, bound, rows}] of a partitioned table; rows is the planner's estimate."""
+    cur.execute("""
+        SELECT c.relname AS name, pg_get_expr(c.relpartbound, c.oid) AS bound,
+               GREATEST(c.reltuples, 0)::BIGINT AS rows
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s)
+        ORDER BY c.relname
+    """, (table,))
+    return cur.fetchall()
+
+
+def _exists(cur, relation):
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL AS present", (relation,))
+    return cur.fetchone()['present']
+
+
+def _create_partition(cur, parent, name, month):
+    cur.execute(f"""
+        CREATE TABLE {name} PARTITION OF {parent}
+        FOR VALUES FROM (%s) TO (%s)
+    """, (month, _add_months(month, 1)))
+
+
+# ---- future partitions ----
+
+def ensure_partitions(cur, months_ahead=None):
+    """
+    Create the partitions for this month through months_ahead months
+    from now. A month that already has rows in the DEFAULT partition is
+    skipped with a warning, since Postgres will not create that partition
+    until those rows are moved out. Returns (created, skipped) name lists.
+    """
+    months_ahead = Config.PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    this_month = _month_of(date.today())
+    created, skipped = [], []
+
+    # fail fast rather than queue every order write behind us
+    cur.execute("SET LOCAL lock_timeout = '5s'")
+    for table in PARTITIONED:
+        if not is_partitioned(cur, table):
+            continue
+        has_default = _exists(cur, f"{table}_default")
+        for n in range(months_ahead + 1):
+            month = _add_months(this_month, n)
+            name = partition_name(table, month)
+            if _exists(cur, name):
+                continue
+            if has_default:
+                cur.execute(f"""
+                    SELECT EXISTS (
+                        SELECT 1 FROM {table}_default
+                        WHERE {PARTITION_KEY} >= %s AND {PARTITION_KEY} < %s
+                    ) AS stray
+                """, (month, _add_months(month, 1)))
+            if has_default and cur.fetchone()['stray']:
+                print(f"{table}_default has rows for {month:%Y-%m}, not creating {name}")
+                skipped.append(name)
+                continue
+            _create_partition(cur, table, name, month)
+            created.append(name)
+    return created, skipped
+
+
+def ensure_all():
+    """Job/CLI entry point: a short summary, or False if it failed."""
+    conn = get_own_conn()
+    cur = conn.cursor()
+
+    try:
+        if not is_partitioned(cur, 'orders'):
+            return 'orders is not partitioned'
+        created, skipped = ensure_partitions(cur)
+        conn.commit()
+        summary = f"created {', '.join(created) or 'none'}"
+        if skipped:
+            summary += f"; skipped {', '.join(skipped)} (rows in the default partition)"
+        print(f"Partitions: {summary}")
+        return summary
+    except Exception as e:
+        conn.rollback()
+        print("Creating partitions failed:", e)
+        return False
+    finally:
+        cur.close()
+        conn.close()
+
+
+# ---- conversion ----
+
+def _preflight(cur):
+    """Raise ValueError if the tables cannot be converted as they are."""
+    cur.execute("SELECT current_setting('server_version_num')::INT AS version")
+    if cur.fetchone()['version'] < 120000:
+        raise ValueError("foreign keys to a partitioned table need PostgreSQL 12 or later")
+
+    if any(is_partitioned(cur, table) for table in PARTITIONED):
+        raise ValueError("orders/order_items are already partitioned")
+
+    cur.execute("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = 'order_items' AND column_name = %s
+    """, (PARTITION_KEY,))
+    if not cur.fetchone():
+        raise ValueError("order_items has no order_time yet; run the migrations first")
+
+    # lines written by a worker that predates migration 0013
+    cur.execute(f"""
+        UPDATE order_items oi
+        SET {PARTITION_KEY} = o.{PARTITION_KEY}
+        FROM orders o
+        WHERE o.id = oi.order_id AND oi.{PARTITION_KEY} IS NULL
+    """)
+
+    for table in PARTITIONED:
+        cur.execute(f"SELECT COUNT(*) AS n FROM {table} WHERE {PARTITION_KEY} IS NULL")
+        n = cur.fetchone()['n']
+        if n:
+            raise ValueError(f"{n} {table} rows have no order_time (order_items rows without an order?)")
+
+    cur.execute("""
+        SELECT DISTINCT v.relname
+        FROM pg_depend d
+        JOIN pg_rewrite r ON r.oid = d.objid
+        JOIN pg_class v ON v.oid = r.ev_class
+        WHERE d.refobjid IN (to_regclass('orders'), to_regclass('order_items'))
+          AND v.oid <> d.refobjid
+    """)
+    views = [row['relname'] for row in cur.fetchall()]
+    if views:
+        raise ValueError(f"views depend on the tables, drop and recreate them around the conversion: "
+                         f"{', '.join(views)}")
+
+    cur.execute("""
+        SELECT tgname FROM pg_trigger
+        WHERE tgrelid IN (to_regclass('orders'), to_regclass('order_items')) AND NOT tgisinternal
+    """)
+    triggers = [row['tgname'] for row in cur.fetchall()]
+    if triggers:
+        raise ValueError(f"triggers are not carried over, drop and recreate them around the conversion: "
+                         f"{', '.join(triggers)}")
+
+
+def _describe(cur, table):
+    """What has to be rebuilt on the partitioned copy: key, indexes, sequences, foreign keys."""
+    # generated columns are recomputed on insert, so they are not copied
+    cur.execute("""
+        SELECT attname FROM pg_attribute
+        WHERE attrelid = to_regclass(%s) AND attnum > 0 AND NOT attisdropped AND attgenerated = ''
+        ORDER BY attnum
+    """, (table,))
+    columns = [row['attname'] for row in cur.fetchall()]
+
+    cur.execute("""
+        SELECT a.attname
+        FROM pg_index i
+        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+        WHERE i.indrelid = to_regclass(%s) AND i.indisprimary
+        ORDER BY array_position(i.indkey::SMALLINT[], a.attnum)
+    """, (table,))
+    primary_key = [row['attname'] for row in cur.fetchall()]
+
+    cur.execute("""
+        SELECT c.relname AS name, pg_get_indexdef(i.indexrelid) AS definition, i.indisunique AS is_unique,
+               EXISTS (SELECT 1 FROM pg_attribute a
+                       WHERE a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+                         AND a.attname = %s) AS has_key
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = to_regclass(%s) AND NOT i.indisprimary
+    """, (PARTITION_KEY, table))
+    indexes = cur.fetchall()
+
+    cur.execute("""
+        SELECT a.attname, a.attidentity <> '' AS is_identity,
+               pg_get_serial_sequence(%s, a.attname) AS sequence
+        FROM pg_attribute a
+        WHERE a.attrelid = to_regclass(%s) AND a.attnum > 0 AND NOT a.attisdropped
+    """, (table, table))
+    sequences = [row for row in cur.fetchall() if row['sequence']]
+
+    # outgoing foreign keys (e.g. to itemss, users_account) are copied as-is
+    cur.execute("""
+        SELECT conname, pg_get_constraintdef(oid) AS definition
+        FROM pg_constraint
+        WHERE conrelid = to_regclass(%s) AND contype = 'f'
+          AND confrelid NOT IN (to_regclass('orders'), to_regclass('order_items'))
+    """, (table,))
+    foreign_keys = cur.fetchall()
+
+    return {"columns": columns, "primary_key": primary_key, "indexes": indexes,
+            "sequences": sequences, "foreign_keys": foreign_keys}
+
+
+def _index_sql(index, table):
+    """The old index definition pointed at the new table; unique only if it can stay unique."""
+    unique = 'UNIQUE ' if index['is_unique'] and index['has_key'] else ''
+    if index['is_unique'] and not unique:
+        print(f"{index['name']} is recreated without UNIQUE, it does not include {PARTITION_KEY}")
+    rest = re.sub(r'^CREATE (UNIQUE )?INDEX \S+ ON (ONLY )?\S+ ', '', index['definition'])
+    return f"CREATE {unique}INDEX {index['name']} ON {table} {rest}"
+
+
+def convert(cur, months_ahead=None):
+    """Swap orders/order_items for monthly-partitioned tables; the caller commits."""
+    months_ahead = Config.PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    cur.execute("LOCK TABLE orders, order_items IN ACCESS EXCLUSIVE MODE")
+    _preflight(cur)
+
+    cur.execute(f"SELECT MIN({PARTITION_KEY}) AS first FROM orders")
+    first = cur.fetchone()['first']
+    first_month = _month_of(first or date.today())
+    last_month = _add_months(_month_of(date.today()), months_ahead)
+    months = []
+    while first_month <= last_month:
+        months.append(first_month)
+        first_month = _add_months(first_month, 1)
+
+    cur.execute("""
+        SELECT conrelid::regclass::TEXT AS source, conname
+        FROM pg_constraint
+        WHERE contype = 'f' AND confrelid = to_regclass('orders')
+          AND conrelid <> to_regclass('order_items')
+    """)
+    dropped_references = [f"{row['source']}.{row['conname']}" for row in cur.fetchall()]
+
+    described = {}
+    for table in PARTITIONED:
+        described[table] = _describe(cur, table)
+        new = f"{table}_partitioned"
+        cur.execute(f"""
+            CREATE TABLE {new} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS
+                                INCLUDING GENERATED INCLUDING IDENTITY INCLUDING STORAGE
+                                INCLUDING COMMENTS)
+            PARTITION BY RANGE ({PARTITION_KEY})
+        """)
+        for month in months:
+            _create_partition(cur, new, partition_name(table, month), month)
+        cur.execute(f"CREATE TABLE {table}_default PARTITION OF {new} DEFAULT")
+        columns = ', '.join(described[table]['columns'])
+        cur.execute(f"INSERT INTO {new} ({columns}) OVERRIDING SYSTEM VALUE SELECT {columns} FROM {table}")
+
+        for column in described[table]['sequences']:
+            if column['is_identity']:
+                # the copy has its own identity sequence; carry on from the old one
+                cur.execute(f"""
+                    SELECT setval(pg_get_serial_sequence(%s, %s), last_value, is_called)
+                    FROM {column['sequence']}
+                """, (new, column['attname']))
+            else:
+                # serial: keep the sequence alive when the old table is dropped
+                cur.execute(f"ALTER SEQUENCE {column['sequence']} OWNED BY {new}.{column['attname']}")
+
+    # CASCADE only reaches the foreign keys listed in dropped_references
+    cur.execute("DROP TABLE order_items")
+    cur.execute("DROP TABLE orders CASCADE")
+
+    for table in PARTITIONED:
+        layout = described[table]
+        cur.execute(f"ALTER TABLE {table}_partitioned RENAME TO {table}")
+        if layout['primary_key']:
+            key = layout['primary_key'] + [c for c in [PARTITION_KEY] if c not in layout['primary_key']]
+            cur.execute(f"ALTER TABLE {table} ADD PRIMARY KEY ({', '.join(key)})")
+        for index in layout['indexes']:
+            cur.execute(_index_sql(index, table))
+        for fk in layout['foreign_keys']:
+            cur.execute(f"ALTER TABLE {table} ADD CONSTRAINT {fk['conname']} {fk['definition']}")
+
+    cur.execute(f"""
+        ALTER TABLE order_items ADD CONSTRAINT order_items_order_fkey
+            FOREIGN KEY (order_id, {PARTITION_KEY}) REFERENCES orders (id, {PARTITION_KEY})
+    """)
+    cur.execute("ANALYZE orders")
+    cur.execute("ANALYZE order_items")
+
+    print(f"Partitioned orders/order_items into {len(months)} months "
+          f"({months[0]:%Y-%m} .. {months[-1]:%Y-%m}) plus a default partition")
+    if dropped_references:
+        print(f"Dropped foreign keys into orders: {', '.join(dropped_references)}")
+    return months
+
+
+def convert_all():
+    conn = get_own_conn()
+    cur = conn.cursor()
+
+    try:
+        convert(cur)
+        conn.commit()
+        return True
+    except Exception as e:
+        conn.rollback()
+        print("Partitioning failed, nothing was changed:", e)
+        return False
+    finally:
+        cur.close()
+        conn.close()
+
+
+def print_status():
+    conn = get_own_conn()
+    cur = conn.cursor()
+
+    try:
+        for table in PARTITIONED:
+            if not is_partitioned(cur, table):
+                print(f"{table}: not partitioned")
+                continue
+            print(f"{table}:")
+            for part in partitions(cur, table):
+                print(f"  {part['name']:<28}{part['rows']:>12}  {part['bound']}")
+    finally:
+        cur.close()
+        conn.close()
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] == ['convert']:
+        sys.exit(0 if convert_all() else 1)
+    if sys.argv[1:] == ['ensure']:
+        sys.exit(0 if ensure_all() is not False else 1)
+    if sys.argv[1:] == ['status']:
+        print_status()
+        sys.exit(0)
+    sys.exit("usage: python -m Models.partitioning convert|ensure|status")
@@ -0,0 +1,70 @@
+"""
+Year/month/day filters as half-open ranges on a timestamp or date column.
+
+    order_time >= start AND order_time < end
+
+can use a btree on order_time (or (status, order_time)) and, once
+orders is partitioned by month, skips the partitions outside the range;
+the EXTRACT(...) = ... / DATE(...) = ... forms can do neither.
+"""
+from datetime import date, datetime, timedelta
+
+
+def period_range(year=None, month=None, day=None):
+    """(start, end) dates for the most specific period given, or None."""
+    if day is not None:
+        if isinstance(day, str):
+            day = datetime.strptime(day, "%Y-%m-%d").date()
+        if isinstance(day, datetime):
+            day = day.date()
+        return day, day + timedelta(days=1)
+
+    if year and month:
+        start = date(int(year), int(month), 1)
+        end = date(start.year + 1, 1, 1) if start.month == 12 else date(start.year, start.month + 1, 1)
+        return start, end
+
+    if year:
+        return date(int(year), 1, 1), date(int(year) + 1, 1, 1)
+
+    return None
+
+
+def period_filter(column, year=None, month=None, day=None):
+    """
+    Returns (sql, params) to AND into a WHERE clause.
+    With no period the condition is TRUE, so callers can always append it.
+    """
+    bounds = period_range(year, month, day)
+    if bounds is None:
+        return "TRUE", []
+    return f"{column} >= %s AND {column} < %s", list(bounds)
+
+
+def range_filter(column, start=None, end=None):
+    """(sql, params) for start <= column < end; either bound may be None."""
+    conditions, params = [], []
+    if start is not None:
+        conditions.append(f"{column} >= %s")
+        params.append(start)
+    if end is not None:
+        conditions.append(f"{column} < %s")
+        params.append(end)
+    if not conditions:
+        return "TRUE", []
+    return " AND ".join(conditions), params
+
+
+def filter_from_args(column, args):
+    """
+    (sql, params) from request args: start/end dates (YYYY-MM-DD, end
+    inclusive) win over year/month. Raises ValueError on bad input.
+    """
+    start = args.get('start')
+    end = args.get('end')
+    if start or end:
+        return range_filter(column,
+                            period_range(day=start)[0] if start else None,
+                            period_range(day=end)[1] if end else None)
+
+    return period_filter(column, year=args.get('year', type=int), month=args.get('month', type=int))
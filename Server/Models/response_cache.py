@@ -0,0 +1,192 @@
+"""
+Response cache for the read-heavy analytics endpoints.
+
+A cache key is made from the endpoint, its query args and the current
+version of every resource the view depends on (see Models/versions.py).
+A write that bumps a version therefore makes the old entries unreachable
+on every worker. The TTL bounds how long anything lives if a worker
+misses a NOTIFY.
+
+The default backend is an in-process LRU. Set CACHE_BACKEND=redis and
+CACHE_URL to share entries between workers. If redis is not installed,
+the local LRU is used instead.
+"""
+import hashlib
+import time
+from collections import OrderedDict
+from functools import wraps
+from threading import Lock
+
+from flask import request, make_response, Response
+from config import Config
+from Models import versions
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+class LocalBackend:
+    """Bounded LRU of key -> (expires_at, body) kept in this worker."""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, body = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return body
+
+    def set(self, key, body, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {"backend": "local", "entries": len(self._entries),
+                "max_entries": self.max_entries, "evictions": self.evictions}
+
+
+class RedisBackend:
+    """Entries shared by all workers; redis expires them after the TTL."""
+
+    PREFIX = 'response_cache:'
+
+    def __init__(self, url):
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        try:
+            return self._client.get(self.PREFIX + key)
+        except redis.RedisError as e:
+            print("Response cache read failed:", e)
+            return None
+
+    def set(self, key, body, ttl):
+        try:
+            self._client.setex(self.PREFIX + key, int(max(ttl, 1)), body)
+        except redis.RedisError as e:
+            print("Response cache write failed:", e)
+
+    def clear(self):
+        try:
+            for key in self._client.scan_iter(self.PREFIX + '*'):
+                self._client.delete(key)
+        except redis.RedisError as e:
+            print("Response cache clear failed:", e)
+
+    def stats(self):
+        return {"backend": "redis"}
+
+
+def _make_backend():
+    if Config.CACHE_BACKEND == 'redis':
+        if redis is not None and Config.CACHE_URL:
+            return RedisBackend(Config.CACHE_URL)
+        print("redis not available, response cache falls back to the local LRU")
+    return LocalBackend(Config.CACHE_MAX_ENTRIES)
+
+
+_backend = None
+_counters = {}  # endpoint -> {"hits": n, "misses": n}
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = _make_backend()
+    return _backend
+
+
+def set_backend(backend):
+    """Swap the backend, e.g. for a local stand-in in scripts or benchmarks."""
+    global _backend
+    _backend = backend
+
+
+def _count(endpoint, field):
+    counters = _counters.setdefault(endpoint, {"hits": 0, "misses": 0})
+    counters[field] += 1
+
+
+def is_cacheable(response):
+    """
+    200 JSON that is not an error. Some older handlers still answer errors
+    with a 200 and an {"error": ...} body; those must not be stored or tagged.
+    """
+    if response.status_code != 200 or response.mimetype != 'application/json' or response.is_streamed:
+        return False
+    if not response.get_data().lstrip().startswith(b'{'):
+        return True
+    parsed = response.get_json(silent=True)
+    return not (isinstance(parsed, dict) and 'error' in parsed)
+
+
+def cache_key(depends, vary=None):
+    """vary: optional callable for inputs that are not args or versions (e.g. today's date)."""
+    args = '&'.join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+    raw = f"{request.endpoint}|{request.path}|{args}|{versions.fingerprint(depends)}"
+    if vary is not None:
+        raw += f"|{vary()}"
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def cached(depends, ttl=None, vary=None):
+    """
+    Cache a view's JSON body until the TTL passes or one of the `depends`
+    resources gets a new version. Only is_cacheable() responses are stored.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not Config.CACHE_ENABLED:
+                return view(*args, **kwargs)
+
+            backend = get_backend()
+            key = cache_key(depends, vary)
+            body = backend.get(key)
+            if body is not None:
+                _count(request.endpoint, 'hits')
+                response = Response(body, mimetype='application/json')
+                response.headers['X-Cache'] = 'HIT'
+                return response
+
+            _count(request.endpoint, 'misses')
+            response = make_response(view(*args, **kwargs))
+            if is_cacheable(response):
+                backend.set(key, response.get_data(), ttl or Config.CACHE_TTL)
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+
+def stats():
+    hits = sum(c['hits'] for c in _counters.values())
+    misses = sum(c['misses'] for c in _counters.values())
+    return {
+        "enabled": Config.CACHE_ENABLED,
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else None,
+        "endpoints": _counters,
+        **get_backend().stats(),
+    }
@@ -0,0 +1,325 @@
+"""
+Aggregates maintained inside the order write transactions.
+
+record_orders()/unrecord_orders() are called with the ids of orders that
+were just inserted, or are about to be deleted, and fold them into the
+rollup tables in one round trip. rebuild() recomputes everything from
+orders/order_items; check() compares product_stats with a recomputation.
+
+    cd Server && python -m Models.rollups rebuild
+    cd Server && python -m Models.rollups check
+"""
+import sys
+from decimal import Decimal
+
+from config import Config
+from Models.database import get_own_conn
+from Models import schema, versions
+
+# data_versions resource bumped by every order write
+RESOURCE = 'orders'
+# bumped only when confirmed orders go away, for readers that append
+# new orders incrementally (Models/columnar.py)
+REMOVED_RESOURCE = 'orders_removed'
+
+
+def packaging_cost_expr():
+    return "COALESCE(o.packaging_cost, 0)" if schema.has_column('orders', 'packaging_cost') else "0"
+
+
+# order_time is stored without a zone; heatmap buckets are in shop-local hours
+LOCAL_HOUR_SQL = ("date_trunc('hour', (o.order_time AT TIME ZONE %(order_tz)s) "
+                  "AT TIME ZONE %(report_tz)s)")
+
+
+def _tz_params():
+    return {'order_tz': Config.ORDER_TIME_ZONE, 'report_tz': Config.REPORT_TIME_ZONE}
+
+
+def _hourly_delta_sql(sign):
+    return f"""
+        INSERT INTO sales_hourly_rollup AS r (hour, order_count, revenue)
+        SELECT {LOCAL_HOUR_SQL}, {sign} * COUNT(*), {sign} * SUM(o.total)
+        FROM orders o
+        WHERE o.id = ANY(%(order_ids)s) AND o.status = 'CONFIRMED'
+        GROUP BY 1
+        ON CONFLICT (hour) DO UPDATE SET
+            order_count = r.order_count + EXCLUDED.order_count,
+            revenue = r.revenue + EXCLUDED.revenue;
+    """
+
+
+def _daily_delta_sql(sign):
+    return f"""
+        INSERT INTO sales_daily_rollup AS r (day, order_count, revenue, packaging_cost, gross_profit)
+        SELECT DATE(o.order_time),
+               {sign} * COUNT(*),
+               {sign} * SUM(o.total),
+               {sign} * SUM({packaging_cost_expr()}),
+               {sign} * COALESCE(SUM(gp.gross_profit), 0)
+        FROM orders o
+        LEFT JOIN LATERAL (
+            SELECT SUM(oi.quantity * COALESCE(pgp.gross_profit, 0)) AS gross_profit
+            FROM order_items oi
+            LEFT JOIN product_gross_profit pgp ON pgp.product_id = oi.item_id
+            WHERE oi.order_id = o.id AND oi.order_time = o.order_time
+        ) gp ON true
+        WHERE o.id = ANY(%(order_ids)s) AND o.status = 'CONFIRMED'
+        GROUP BY DATE(o.order_time)
+        ON CONFLICT (day) DO UPDATE SET
+            order_count = r.order_count + EXCLUDED.order_count,
+            revenue = r.revenue + EXCLUDED.revenue,
+            packaging_cost = r.packaging_cost + EXCLUDED.packaging_cost,
+            gross_profit = r.gross_profit + EXCLUDED.gross_profit;
+    """
+
+
+def _item_delta_sql(sign):
+    return f"""
+        INSERT INTO item_sales_daily AS r (day, item_id, quantity, sales)
+        SELECT DATE(o.order_time), oi.item_id,
+               {sign} * SUM(oi.quantity), {sign} * SUM(oi.quantity * oi.price)
+        FROM orders o
+        JOIN order_items oi ON oi.order_id = o.id AND oi.order_time = o.order_time
+        WHERE o.id = ANY(%(order_ids)s) AND o.status = 'CONFIRMED'
+        GROUP BY 1, 2
+        ON CONFLICT (day, item_id) DO UPDATE SET
+            quantity = r.quantity + EXCLUDED.quantity,
+            sales = r.sales + EXCLUDED.sales;
+    """
+
+
+def _product_delta_sql(sign):
+    # a removed order never moves last_sold_at forward; unrecord_orders() recomputes it
+    last_sold = "GREATEST(r.last_sold_at, EXCLUDED.last_sold_at)" if sign == '+1' else "r.last_sold_at"
+    return f"""
+        INSERT INTO product_stats AS r (product_id, units_sold, revenue, gross_profit, last_sold_at)
+        SELECT oi.item_id,
+               {sign} * SUM(oi.quantity),
+               {sign} * SUM(oi.quantity * oi.price),
+               {sign} * SUM(oi.quantity) * COALESCE(MAX(pgp.gross_profit), 0),
+               MAX(o.order_time)
+        FROM orders o
+        JOIN order_items oi ON oi.order_id = o.id AND oi.order_time = o.order_time
+        LEFT JOIN product_gross_profit pgp ON pgp.product_id = oi.item_id
+        WHERE o.id = ANY(%(order_ids)s) AND o.status = 'CONFIRMED'
+        GROUP BY oi.item_id
+        ON CONFLICT (product_id) DO UPDATE SET
+            units_sold = r.units_sold + EXCLUDED.units_sold,
+            revenue = r.revenue + EXCLUDED.revenue,
+            gross_profit = r.gross_profit + EXCLUDED.gross_profit,
+            last_sold_at = {last_sold};
+    """
+
+
+def _deltas_sql(sign):
+    return (_daily_delta_sql(sign) + _hourly_delta_sql(sign) + _item_delta_sql(sign)
+            + _product_delta_sql(sign))
+
+
+def record_orders(cursor, order_ids):
+    """Add freshly written orders to the rollups (same transaction)."""
+    if not order_ids:
+        return
+    cursor.execute(_deltas_sql('+1'), {'order_ids': list(order_ids), **_tz_params()})
+
+
+def unrecord_orders(cursor, order_ids):
+    """
+    Take orders out of the rollups. Call before deleting them. Also bumps
+    REMOVED_RESOURCE; returns that version for versions.mark() after commit.
+    """
+    if not order_ids:
+        return None
+    cursor.execute(_deltas_sql('-1') + """
+        DELETE FROM sales_daily_rollup WHERE order_count <= 0;
+        DELETE FROM sales_hourly_rollup WHERE order_count <= 0;
+        DELETE FROM item_sales_daily WHERE quantity <= 0;
+        UPDATE product_stats s
+        SET last_sold_at = (
+            SELECT MAX(o.order_time)
+            FROM order_items oi
+            JOIN orders o ON o.id = oi.order_id AND o.order_time = oi.order_time
+            WHERE oi.item_id = s.product_id AND o.status = 'CONFIRMED'
+            AND o.id <> ALL(%(order_ids)s)
+        )
+        WHERE s.product_id IN (
+            SELECT oi.item_id
+            FROM orders o
+            JOIN order_items oi ON oi.order_id = o.id AND oi.order_time = o.order_time
+            WHERE o.id = ANY(%(order_ids)s)
+        );
+        DELETE FROM product_stats WHERE units_sold <= 0;
+    """, {'order_ids': list(order_ids), **_tz_params()})
+    return versions.bump(cursor, REMOVED_RESOURCE)
+
+
+def refresh_gross_profit(cursor, changes):
+    """
+    Fold per-product gross profit edits into the rollups. changes is a list
+    of (product_id, old, new) per-unit figures, old None for a new row.
+    Each day moves by quantity sold that day x (new - old), read from
+    item_sales_daily, so only the edited products' rows are touched.
+    """
+    deltas = {}
+    for product_id, old, new in changes:
+        # Decimal, so the NUMERIC totals do not pick up float rounding
+        deltas[product_id] = deltas.get(product_id, 0) + Decimal(str(new or 0)) - Decimal(str(old or 0))
+    deltas = {product_id: delta for product_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    cursor.execute("""
+        WITH changes AS (
+            SELECT * FROM unnest(%(ids)s::INT[], %(deltas)s::NUMERIC[]) AS c(product_id, delta)
+        ),
+        days AS (
+            SELECT d.day, SUM(d.quantity * c.delta) AS delta
+            FROM item_sales_daily d
+            JOIN changes c ON c.product_id = d.item_id
+            GROUP BY d.day
+        )
+        UPDATE sales_daily_rollup r
+        SET gross_profit = r.gross_profit + days.delta
+        FROM days
+        WHERE r.day = days.day;
+
+        UPDATE product_stats s
+        SET gross_profit = s.units_sold * COALESCE(pgp.gross_profit, 0)
+        FROM (SELECT unnest(%(ids)s::INT[]) AS product_id) c
+        LEFT JOIN product_gross_profit pgp ON pgp.product_id = c.product_id
+        WHERE s.product_id = c.product_id;
+    """, {'ids': list(deltas), 'deltas': list(deltas.values())})
+
+
+def rebuild(cursor):
+    rebuild_daily(cursor)
+    rebuild_hourly(cursor)
+    rebuild_item_sales(cursor)
+    rebuild_product_stats(cursor)
+
+
+def rebuild_daily(cursor):
+    cursor.execute(f"""
+        TRUNCATE sales_daily_rollup;
+        INSERT INTO sales_daily_rollup (day, order_count, revenue, packaging_cost, gross_profit)
+        SELECT DATE(o.order_time),
+               COUNT(*),
+               SUM(o.total),
+               SUM({packaging_cost_expr()}),
+               COALESCE(SUM(gp.gross_profit), 0)
+        FROM orders o
+        LEFT JOIN (
+            SELECT oi.order_id, oi.order_time, SUM(oi.quantity * COALESCE(pgp.gross_profit, 0)) AS gross_profit
+            FROM order_items oi
+            LEFT JOIN product_gross_profit pgp ON pgp.product_id = oi.item_id
+            GROUP BY oi.order_id, oi.order_time
+        ) gp ON gp.order_id = o.id AND gp.order_time = o.order_time
+        WHERE o.status = 'CONFIRMED'
+        GROUP BY DATE(o.order_time);
+    """)
+
+
+def rebuild_hourly(cursor):
+    cursor.execute(f"""
+        TRUNCATE sales_hourly_rollup;
+        INSERT INTO sales_hourly_rollup (hour, order_count, revenue)
+        SELECT {LOCAL_HOUR_SQL}, COUNT(*), SUM(o.total)
+        FROM orders o
+        WHERE o.status = 'CONFIRMED'
+        GROUP BY 1;
+    """, _tz_params())
+
+
+def rebuild_item_sales(cursor):
+    cursor.execute("""
+        TRUNCATE item_sales_daily;
+        INSERT INTO item_sales_daily (day, item_id, quantity, sales)
+        SELECT DATE(o.order_time), oi.item_id, SUM(oi.quantity), SUM(oi.quantity * oi.price)
+        FROM orders o
+        JOIN order_items oi ON oi.order_id = o.id AND oi.order_time = o.order_time
+        WHERE o.status = 'CONFIRMED'
+        GROUP BY 1, 2;
+    """)
+
+
+PRODUCT_STATS_SQL = """
+    SELECT oi.item_id AS product_id,
+           SUM(oi.quantity) AS units_sold,
+           SUM(oi.quantity * oi.price) AS revenue,
+           SUM(oi.quantity) * COALESCE(MAX(pgp.gross_profit), 0) AS gross_profit,
+           MAX(o.order_time) AS last_sold_at
+    FROM orders o
+    JOIN order_items oi ON oi.order_id = o.id AND oi.order_time = o.order_time
+    LEFT JOIN product_gross_profit pgp ON pgp.product_id = oi.item_id
+    WHERE o.status = 'CONFIRMED'
+    GROUP BY oi.item_id
+"""
+
+
+def rebuild_product_stats(cursor):
+    cursor.execute(f"""
+        TRUNCATE product_stats;
+        INSERT INTO product_stats (product_id, units_sold, revenue, gross_profit, last_sold_at)
+        {PRODUCT_STATS_SQL};
+    """)
+
+
+def check(cursor):
+    """Rows where product_stats differs from a from-scratch recomputation."""
+    cursor.execute(f"""
+        SELECT COALESCE(s.product_id, f.product_id) AS product_id,
+               s.units_sold, f.units_sold AS expected_units_sold,
+               s.revenue, f.revenue AS expected_revenue,
+               s.gross_profit, f.gross_profit AS expected_gross_profit,
+               s.last_sold_at, f.last_sold_at AS expected_last_sold_at
+        FROM product_stats s
+        FULL JOIN ({PRODUCT_STATS_SQL}) f ON f.product_id = s.product_id
+        WHERE s.units_sold IS DISTINCT FROM f.units_sold
+           OR s.revenue IS DISTINCT FROM f.revenue
+           OR s.gross_profit IS DISTINCT FROM f.gross_profit
+           OR s.last_sold_at IS DISTINCT FROM f.last_sold_at
+        ORDER BY 1
+    """)
+    return cursor.fetchall()
+
+
+def check_all():
+    conn = get_own_conn()
+    cur = conn.cursor()
+
+    try:
+        mismatches = check(cur)
+        for row in mismatches:
+            print(dict(row))
+        print(f"product_stats: {len(mismatches)} mismatched products")
+        return not mismatches
+    finally:
+        cur.close()
+        conn.close()
+
+
+def rebuild_all():
+    conn = get_own_conn()
+    cur = conn.cursor()
+
+    try:
+        rebuild(cur)
+        conn.commit()
+        print("Rollups rebuilt")
+        return True
+    except Exception as e:
+        conn.rollback()
+        print("Rollup rebuild failed:", e)
+        return False
+    finally:
+        cur.close()
+        conn.close()
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] == ['rebuild']:
+        sys.exit(0 if rebuild_all() else 1)
+    if sys.argv[1:] == ['check']:
+        sys.exit(0 if check_all() else 1)
+    sys.exit("usage: python -m Models.rollups rebuild|check")
@@ -0,0 +1,251 @@
+"""
+Periodic background jobs run inside the server process.
+
+    scheduler.register('purge_idempotency_keys', '15 * * * *', idempotency.purge_expired)
+    scheduler.start(socketio.start_background_task)
+
+Specs are five-field cron expressions (minute hour day-of-month month
+day-of-week, with *, a-b, a,b and */n) or @hourly/@daily/@weekly/@monthly.
+Times are the server's local clock.
+
+Every worker runs the same loop. Before a job runs, its worker must win
+pg_try_advisory_lock for that job and see that the slot has not already
+been run. That way each slot runs once across all workers. Jobs
+registered with leader_only=False skip the lock and run on every worker,
+for example to warm a per-process cache. Runs are
+recorded in scheduled_jobs (last start, duration, outcome), which
+GET /jobs/status reads.
+"""
+import random
+import time
+import traceback
+import zlib
+from datetime import datetime, timedelta
+
+from Models.database import get_pool
+
+# key1 of the two-key advisory locks; key2 is derived from the job name
+SCHEDULER_LOCK_ID = 72010002
+
+ALIASES = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *',
+}
+
+MAX_SLEEP = 30  # seconds; the loop re-checks due jobs at least this often
+
+
+def _parse_field(field, lo, hi):
+    values = set()
+    for part in field.split(','):
+        step = 1
+        if '/' in part:
+            part, step = part.split('/')
+            step = int(step)
+        if part == '*':
+            start, end = lo, hi
+        elif '-' in part:
+            start, end = (int(v) for v in part.split('-'))
+        else:
+            start = end = int(part)
+        if start < lo or end > hi or start > end or step < 1:
+            raise ValueError(f"cron field {field!r} out of range {lo}-{hi}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+class CronSpec:
+
+    def __init__(self, spec):
+        self.spec = spec
+        fields = ALIASES.get(spec, spec).split()
+        if len(fields) != 5:
+            raise ValueError(f"cron spec needs 5 fields: {spec!r}")
+        self.minutes = _parse_field(fields[0], 0, 59)
+        self.hours = _parse_field(fields[1], 0, 23)
+        self.days = _parse_field(fields[2], 1, 31)
+        self.months = _parse_field(fields[3], 1, 12)
+        # 0 and 7 are both Sunday; stored as Python weekday() (Monday = 0)
+        self.weekdays = frozenset((d - 1) % 7 for d in _parse_field(fields[4], 0, 7))
+        self._any_day = fields[2] == '*'
+        self._any_weekday = fields[4] == '*'
+
+    def _day_matches(self, dt):
+        day_ok = dt.day in self.days
+        weekday_ok = dt.weekday() in self.weekdays
+        # cron semantics: if both are restricted, either one may match
+        if not self._any_day and not self._any_weekday:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_after(self, dt):
+        """The first matching minute strictly after dt."""
+        t = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = t + timedelta(days=366 * 4)
+        while t < limit:
+            if t.month not in self.months or not self._day_matches(t):
+                t = t.replace(hour=0, minute=0) + timedelta(days=1)
+            elif t.hour not in self.hours:
+                t = t.replace(minute=0) + timedelta(hours=1)
+            elif t.minute not in self.minutes:
+                t += timedelta(minutes=1)
+            else:
+                return t
+        raise ValueError(f"cron spec {self.spec!r} never matches")
+
+
+class Job:
+
+    def __init__(self, name, spec, func, jitter=0, leader_only=True):
+        self.name = name
+        self.leader_only = leader_only
+        self.cron = CronSpec(spec)
+        self.func = func
+        self.jitter = jitter
+        self.lock_key = zlib.crc32(name.encode()) - 2 ** 31  # fits a signed int4
+        self.next_slot = self.cron.next_after(datetime.now())
+        self.next_run = self._with_jitter(self.next_slot)
+        self.last_local = None  # what this worker last did with the job
+
+    def _with_jitter(self, slot):
+        return slot + timedelta(seconds=random.uniform(0, self.jitter)) if self.jitter else slot
+
+    def advance(self):
+        self.next_slot = self.cron.next_after(self.next_slot)
+        self.next_run = self._with_jitter(self.next_slot)
+
+
+_jobs = {}
+_started = False
+
+
+def register(name, spec, func, jitter=0, leader_only=True):
+    """Add a job; jitter spreads its start by up to that many seconds."""
+    _jobs[name] = Job(name, spec, func, jitter, leader_only)
+
+
+def jobs():
+    return dict(_jobs)
+
+
+def _record(cur, name, **fields):
+    columns = ', '.join(fields)
+    updates = ', '.join(f"{column} = EXCLUDED.{column}" for column in fields)
+    cur.execute(f"""
+        INSERT INTO scheduled_jobs (name, {columns})
+        VALUES (%s, {', '.join(['%s'] * len(fields))})
+        ON CONFLICT (name) DO UPDATE SET {updates}
+    """, (name, *fields.values()))
+
+
+def run_job(job, slot):
+    """Run one slot of a job if this worker wins its lock and nobody ran it yet."""
+    conn = get_pool().getconn()
+    cur = conn.cursor()
+    locked = False
+
+    try:
+        if job.leader_only:
+            cur.execute("SELECT pg_try_advisory_lock(%s, %s) AS locked", (SCHEDULER_LOCK_ID, job.lock_key))
+            locked = cur.fetchone()['locked']
+            if not locked:
+                job.last_local = {"slot": slot, "outcome": "skipped: running on another worker"}
+                return
+
+            cur.execute("SELECT last_slot FROM scheduled_jobs WHERE name = %s", (job.name,))
+            row = cur.fetchone()
+            if row and row['last_slot'] and row['last_slot'] >= slot:
+                job.last_local = {"slot": slot, "outcome": "skipped: already run by another worker"}
+                return
+
+        _record(cur, job.name, last_slot=slot, last_started_at=datetime.now(), status='running')
+        conn.commit()
+
+        started = time.perf_counter()
+        try:
+            result = job.func()
+            status, error = 'ok', None
+            if result is False:
+                status = 'failed'
+        except Exception as e:
+            traceback.print_exc()
+            result, status, error = None, 'failed', f"{type(e).__name__}: {e}"
+        duration_ms = round((time.perf_counter() - started) * 1000, 1)
+
+        _record(cur, job.name, last_finished_at=datetime.now(), duration_ms=duration_ms,
+                status=status, error=error, result=None if result is None else str(result)[:500])
+        conn.commit()
+        job.last_local = {"slot": slot, "outcome": status, "duration_ms": duration_ms}
+        print(f"Job {job.name} {status} in {duration_ms} ms")
+    except Exception as e:
+        conn.rollback()
+        job.last_local = {"slot": slot, "outcome": f"error: {e}"}
+        print(f"Job {job.name} could not run:", e)
+    finally:
+        try:
+            if locked:
+                conn.rollback()
+                cur.execute("SELECT pg_advisory_unlock(%s, %s)", (SCHEDULER_LOCK_ID, job.lock_key))
+                conn.commit()
+        except Exception as e:
+            print(f"Job {job.name} unlock failed:", e)
+        cur.close()
+        conn.close()
+
+
+def run_forever(spawn):
+    """Scheduler loop; each due job runs in its own background task via spawn()."""
+    while True:
+        now = datetime.now()
+        for job in list(_jobs.values()):
+            if job.next_run <= now:
+                spawn(run_job, job, job.next_slot)
+                job.advance()
+        upcoming = min((job.next_run for job in _jobs.values()), default=now + timedelta(seconds=MAX_SLEEP))
+        time.sleep(min(MAX_SLEEP, max(0.5, (upcoming - datetime.now()).total_seconds())))
+
+
+def start(spawn):
+    """Start the loop once per process; spawn is e.g. socketio.start_background_task."""
+    global _started
+    if _started:
+        return
+    _started = True
+    spawn(run_forever, spawn)
+
+
+def status():
+    """Registered jobs with the shared run history from scheduled_jobs."""
+    history = {}
+    conn = get_pool().getconn()
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT * FROM scheduled_jobs")
+        history = {row['name']: row for row in cur.fetchall()}
+    except Exception as e:
+        print("Error reading job history:", e)
+    finally:
+        cur.close()
+        conn.close()
+
+    return [{
+        "name": job.name,
+        "spec": job.cron.spec,
+        "jitter": job.jitter,
+        "leader_only": job.leader_only,
+        "next_run": job.next_run.isoformat(timespec='seconds'),
+        "last_slot": _iso(history.get(job.name, {}).get('last_slot')),
+        "last_started_at": _iso(history.get(job.name, {}).get('last_started_at')),
+        "last_finished_at": _iso(history.get(job.name, {}).get('last_finished_at')),
+        "duration_ms": history.get(job.name, {}).get('duration_ms'),
+        "status": history.get(job.name, {}).get('status'),
+        "error": history.get(job.name, {}).get('error'),
+        "result": history.get(job.name, {}).get('result'),
+        "this_worker": {**job.last_local, "slot": _iso(job.last_local['slot'])} if job.last_local else None,
+    } for job in _jobs.values()]
+
+
+def _iso(value):
+    return value.isoformat(timespec='seconds') if value else None
@@ -0,0 +1,58 @@
+from Models.database import get_db_conn
+from Models import versions
+
+# data_versions resource bumped by POST /schema/refresh; every worker drops
+# its capabilities and re-reads them on the next has_column()
+RESOURCE = 'schema'
+
+# Optional columns the handlers branch on, exposed as "table.column" flags
+OPTIONAL_COLUMNS = [
+    ('orders', 'packaging_cost'),
+]
+
+_columns = None  # frozenset of (table, column) once introspected
+
+
+def _invalidate(version=None):
+    global _columns
+    _columns = None
+
+versions.subscribe(RESOURCE, _invalidate)
+
+
+def refresh_schema():
+    """Re-read the table/column catalogue. Call at startup and after migrations."""
+    global _columns
+
+    conn = get_db_conn()
+    if conn is None:
+        return False
+    cur = conn.cursor()
+
+    try:
+        cur.execute("""
+            SELECT table_name, column_name
+            FROM information_schema.columns
+            WHERE table_schema = current_schema()
+        """)
+        _columns = frozenset((row['table_name'], row['column_name']) for row in cur.fetchall())
+        print(f"Schema capabilities loaded: {capabilities()}")
+        return True
+    except Exception as e:
+        print("Error loading schema capabilities:", e)
+        return False
+    finally:
+        cur.close()
+        conn.close()
+
+
+def has_column(table, column):
+    if _columns is None and not refresh_schema():
+        return False
+    return (table, column) in _columns
+
+
+def capabilities():
+    if _columns is None:
+        return {}
+    return {f"{table}.{column}": (table, column) in _columns for table, column in OPTIONAL_COLUMNS}
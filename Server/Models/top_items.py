@@ -0,0 +1,78 @@
+"""
+Best-selling items over a window, read from the per-item daily counters
+in item_sales_daily (kept current by rollups.record_orders).
+
+Summing the counters over the window gives at most one row per menu
+item. heapq then picks the top K, so the full list is never sorted;
+without a K every item is returned, best first.
+"""
+import heapq
+from datetime import date, timedelta
+
+from Models.periods import period_range, range_filter
+
+WINDOWS = ('today', '7d', '30d', 'all', 'custom')
+DEFAULT_K = 10
+MAX_K = 100
+
+ITEM_TOTALS_SQL = """
+    SELECT s.item_id,
+           i.name AS product_name,
+           i.status AS product_status,
+           i.price AS product_price,
+           s.total_quantity,
+           s.total_sales
+    FROM (
+        SELECT item_id, SUM(quantity) AS total_quantity, SUM(sales) AS total_sales
+        FROM item_sales_daily
+        WHERE {period}
+        GROUP BY item_id
+    ) s
+    LEFT JOIN itemss i ON i.id = s.item_id
+"""
+
+
+def window_range(window, start=None, end=None, today=None):
+    """
+    (start, end) dates with end exclusive, or (None, None) for all time.
+    7d/30d include today. custom takes YYYY-MM-DD start/end, end inclusive.
+    Raises ValueError for an unknown window or bad dates.
+    """
+    today = today or date.today()
+    if window == 'today':
+        return today, today + timedelta(days=1)
+    if window in ('7d', '30d'):
+        return today - timedelta(days=int(window[:-1]) - 1), today + timedelta(days=1)
+    if window == 'all':
+        return None, None
+    if window == 'custom':
+        if not start and not end:
+            raise ValueError("custom window needs start and/or end")
+        return (period_range(day=start)[0] if start else None,
+                period_range(day=end)[1] if end else None)
+    raise ValueError(f"window must be one of {', '.join(WINDOWS)}")
+
+
+def totals_query(start=None, end=None):
+    """(sql, params) with one row per item sold in [start, end)."""
+    period_sql, params = range_filter('day', start, end)
+    return ITEM_TOTALS_SQL.format(period=period_sql), params
+
+
+def top_k(cursor, k=None, start=None, end=None):
+    """The k best sellers in [start, end), or all of them when k is None."""
+    sql, params = totals_query(start, end)
+    cursor.execute(sql, params)
+    rank = lambda row: (row['total_quantity'], row['total_sales'])
+    if k is None:
+        best = sorted(cursor.fetchall(), key=rank, reverse=True)
+    else:
+        best = heapq.nlargest(k, cursor.fetchall(), key=rank)
+    return [{
+        "item_id": row['item_id'],
+        "product_name": row['product_name'],
+        "product_status": row['product_status'],
+        "product_price": float(row['product_price']) if row['product_price'] is not None else None,
+        "total_quantity": int(row['total_quantity']),
+        "total_sales": float(row['total_sales']),
+    } for row in best]
@@ -0,0 +1,108 @@
+"""
+Per-resource data version counters shared by all workers.
+
+Writers call bump() inside their transaction; the new number is stored in
+data_versions and broadcast with NOTIFY on commit. Every worker runs
+listen_forever() in a background task and applies the numbers it hears,
+so caches keyed on a version are invalidated everywhere.
+"""
+import select
+import time
+
+import psycopg2
+from config import Config
+from Models.database import get_db_conn
+
+CHANNEL = 'data_versions'
+
+_versions = {}     # resource -> latest version seen by this worker
+_subscribers = {}  # resource -> [callback(version)]
+
+
+def current(resource):
+    return _versions.get(resource, 0)
+
+
+def fingerprint(resources):
+    """Stable "resource:version,..." string for cache keys and ETags."""
+    return ','.join(f"{resource}:{current(resource)}" for resource in resources)
+
+
+def subscribe(resource, callback):
+    _subscribers.setdefault(resource, []).append(callback)
+
+
+def mark(resource, version):
+    """Record a version; callbacks run only when it moves forward."""
+    if version <= _versions.get(resource, 0):
+        return
+    _versions[resource] = version
+    for callback in _subscribers.get(resource, []):
+        try:
+            callback(version)
+        except Exception as e:
+            print(f"Version callback for {resource} failed:", e)
+
+
+def bump(cursor, resource):
+    """Increment a resource's version in the caller's transaction. Returns it."""
+    cursor.execute("""
+        INSERT INTO data_versions (resource, version)
+        VALUES (%s, 1)
+        ON CONFLICT (resource) DO UPDATE
+            SET version = data_versions.version + 1, updated_at = NOW()
+        RETURNING version
+    """, (resource,))
+    version = cursor.fetchone()['version']
+    cursor.execute("SELECT pg_notify(%s, %s)", (CHANNEL, f"{resource}:{version}"))
+    return version
+
+
+def load_versions():
+    conn = get_db_conn()
+    if conn is None:
+        return False
+    cur = conn.cursor()
+
+    try:
+        cur.execute("SELECT resource, version FROM data_versions")
+        for row in cur.fetchall():
+            mark(row['resource'], row['version'])
+        return True
+    except Exception as e:
+        print("Error loading data versions:", e)
+        return False
+    finally:
+        cur.close()
+        conn.close()
+
+
+def listen_forever():
+    """Background task: apply version NOTIFYs from other workers."""
+    while True:
+        conn = None
+        try:
+            conn = psycopg2.connect(Config.DB_URL)
+            conn.autocommit = True
+            cur = conn.cursor()
+            cur.execute(f"LISTEN {CHANNEL}")
+            # catch up on anything published while we were not listening
+            load_versions()
+
+            while True:
+                if select.select([conn], [], [], 60) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    note = conn.notifies.pop(0)
+                    resource, _, version = note.payload.rpartition(':')
+                    mark(resource, int(version))
+        except Exception as e:
+            print("Data version listener error, reconnecting:", e)
+            time.sleep(5)
+        finally:
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
@@ -0,0 +1,181 @@
+"""
+Columnar snapshot (Models/columnar.py) vs the SQL aggregates.
+
+Generates a synthetic history (BENCH_LINES order lines, 5M by default)
+into temporary orders/order_items/itemss/product_gross_profit tables that
+shadow the real ones for this session only. It then times:
+
+- the full snapshot load and an incremental refresh after new orders
+- group-by-period aggregates: date_trunc SQL vs the snapshot
+- one product's monthly performance: SQL vs the snapshot
+
+and checks that both sides return the same numbers.
+
+    cd Server && DB_URL=postgres://... python benchmarks/columnar_vs_sql.py
+"""
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import psycopg2
+from psycopg2.extras import RealDictCursor
+from config import Config
+from Models.columnar import ColumnarSnapshot
+
+LINES = int(os.getenv('BENCH_LINES', 5000000))
+ITEMS = 60
+YEARS = 4
+SEED = int(os.getenv('BENCH_SEED', 7))
+GRANULARITIES = ('day', 'week', 'month', 'year')
+
+
+def synthetic(rng, n_lines, first_order_id=1):
+    """(orders, lines) as column arrays; about 2.5 lines per order."""
+    n_orders = max(1, n_lines * 2 // 5)
+    order_ids = np.arange(first_order_id, first_order_id + n_orders, dtype=np.int64)
+    start = np.datetime64('2022-01-01T00:00:00').astype(np.int64)
+    times = np.sort(rng.integers(start, start + YEARS * 365 * 86400, n_orders))
+
+    owner = np.sort(rng.integers(0, n_orders, n_lines))
+    owner[:n_orders] = np.arange(n_orders)  # every order has at least one line
+    owner.sort()
+    item_ids = rng.integers(1, ITEMS + 1, n_lines)
+    quantity = rng.integers(1, 4, n_lines)
+    price = (item_ids % 5 + 1) * 30.0
+
+    totals = np.bincount(owner, weights=quantity * price, minlength=n_orders)
+    packaging = np.round(rng.random(n_orders) * 5, 2)
+    status = np.where(rng.random(n_orders) < 0.95, 'CONFIRMED', 'PENDING')
+    orders = (order_ids, times, totals, packaging, status)
+    lines = (order_ids[owner], item_ids, quantity, price)
+    return orders, lines
+
+
+def copy_columns(cur, table, columns, arrays, formats):
+    buf = io.StringIO()
+    np.savetxt(buf, np.column_stack([a.astype(object) for a in arrays]), fmt=formats, delimiter=',')
+    buf.seek(0)
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buf)
+
+
+def load(cur, orders, lines):
+    order_ids, times, totals, packaging, status = orders
+    timestamps = times.astype('datetime64[s]').astype(str)
+    copy_columns(cur, 'orders', ['id', 'order_time', 'total', 'packaging_cost', 'status'],
+                 [order_ids, timestamps, totals, packaging, status], ['%s', '%s', '%s', '%s', '%s'])
+    copy_columns(cur, 'order_items', ['order_id', 'item_id', 'quantity', 'price'],
+                 list(lines), ['%s', '%s', '%s', '%s'])
+
+
+SQL_AGGREGATE = """
+    SELECT date_trunc(%(granularity)s, o.order_time)::date AS period,
+           COUNT(*) AS order_count,
+           SUM(o.total) AS revenue,
+           SUM(o.packaging_cost) AS packaging_cost,
+           COALESCE(SUM(gp.gross_profit), 0) AS gross_profit
+    FROM orders o
+    LEFT JOIN (
+        SELECT oi.order_id, SUM(oi.quantity * COALESCE(pgp.gross_profit, 0)) AS gross_profit
+        FROM order_items oi
+        LEFT JOIN product_gross_profit pgp ON pgp.product_id = oi.item_id
+        GROUP BY oi.order_id
+    ) gp ON gp.order_id = o.id
+    WHERE o.status = 'CONFIRMED'
+    GROUP BY 1
+    ORDER BY 1 DESC
+"""
+
+SQL_PRODUCT_MONTHLY = """
+    SELECT date_trunc('month', o.order_time)::date AS period,
+           SUM(oi.quantity) AS units_sold,
+           SUM(oi.quantity * i.price) AS revenue,
+           SUM(oi.quantity * COALESCE(pgp.gross_profit, 0)) AS gross_profit
+    FROM orders o
+    JOIN order_items oi ON o.id = oi.order_id
+    JOIN itemss i ON oi.item_id = i.id
+    LEFT JOIN product_gross_profit pgp ON i.id = pgp.product_id
+    WHERE o.status = 'CONFIRMED' AND i.id = %s
+    GROUP BY 1
+    ORDER BY 1 DESC
+"""
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def same(sql_rows, columnar_rows, metrics):
+    if [r['period'] for r in sql_rows] != [r['period'] for r in columnar_rows]:
+        return False
+    return all(np.isclose(float(a[m]), float(b[m])) for a, b in zip(sql_rows, columnar_rows) for m in metrics)
+
+
+if __name__ == '__main__':
+    if not Config.DB_URL:
+        sys.exit("DB_URL is not set")
+
+    rng = np.random.default_rng(SEED)
+    conn = psycopg2.connect(Config.DB_URL, cursor_factory=RealDictCursor)
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TEMP TABLE orders (id INT PRIMARY KEY, order_time TIMESTAMP, total NUMERIC,
+                                  packaging_cost NUMERIC, status TEXT);
+        CREATE TEMP TABLE order_items (order_id INT, item_id INT, quantity INT, price NUMERIC);
+        CREATE TEMP TABLE itemss (id INT PRIMARY KEY, price NUMERIC);
+        CREATE TEMP TABLE product_gross_profit (product_id INT PRIMARY KEY, gross_profit NUMERIC);
+    """)
+    cur.execute("INSERT INTO itemss SELECT g, (g %% 5 + 1) * 30 FROM generate_series(1, %s) g", (ITEMS,))
+    cur.execute("INSERT INTO product_gross_profit SELECT g, (g %% 7) * 4.5 FROM generate_series(1, %s) g",
+                (ITEMS,))
+
+    orders, lines = synthetic(rng, LINES)
+    _, load_ms = timed(load, cur, orders, lines)
+    cur.execute("""
+        CREATE INDEX ON order_items (order_id);
+        CREATE INDEX ON order_items (item_id);
+        CREATE INDEX ON orders (status, order_time);
+        ANALYZE orders; ANALYZE order_items;
+    """)
+    print(f"synthetic data: {len(orders[0])} orders, {LINES} lines, loaded in {load_ms / 1000:.1f}s")
+
+    snapshot = ColumnarSnapshot()
+    _, full_ms = timed(snapshot.refresh, conn)
+    stats = snapshot.stats()
+    print(f"snapshot full load: {full_ms:.0f} ms, {stats['bytes'] / 1e6:.0f} MB")
+
+    more_orders, more_lines = synthetic(rng, 2500, first_order_id=int(orders[0][-1]) + 1)
+    load(cur, more_orders, more_lines)
+    _, incremental_ms = timed(snapshot.refresh, conn)
+    print(f"snapshot incremental refresh (+{len(more_orders[0])} orders): {incremental_ms:.0f} ms")
+
+    ok = True
+    metrics = ('order_count', 'revenue', 'packaging_cost', 'gross_profit')
+    print(f"\n{'query':<22}{'sql ms':>10}{'columnar ms':>14}{'speedup':>10}")
+    for granularity in GRANULARITIES:
+        def run_sql():
+            cur.execute(SQL_AGGREGATE, {'granularity': granularity})
+            return cur.fetchall()
+        sql_rows, sql_ms = timed(run_sql)
+        col_rows, col_ms = timed(snapshot.aggregate, granularity, None, None, metrics)
+        ok &= same(sql_rows, col_rows, metrics)
+        print(f"{'by ' + granularity:<22}{sql_ms:>10.1f}{col_ms:>14.1f}{sql_ms / col_ms:>9.1f}x")
+
+    def run_product_sql():
+        cur.execute(SQL_PRODUCT_MONTHLY, (7,))
+        return cur.fetchall()
+    sql_rows, sql_ms = timed(run_product_sql)
+    col_rows, col_ms = timed(snapshot.product_periods, 7, 'month')
+    ok &= same(sql_rows, col_rows, ('units_sold', 'revenue', 'gross_profit'))
+    print(f"{'product 7 by month':<22}{sql_ms:>10.1f}{col_ms:>14.1f}{sql_ms / col_ms:>9.1f}x")
+
+    conn.rollback()
+    conn.close()
+    if not ok:
+        sys.exit("columnar results differ from SQL")
+    print("\ncolumnar results match SQL")
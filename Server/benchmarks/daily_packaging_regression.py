@@ -0,0 +1,252 @@
+"""
+Regression check for /summaries/daily-with-packaging.
+
+Loads a synthetic dataset into a scratch schema and compares the endpoint's
+grouped query against the baseline implementation, ported unchanged below:
+the per-day Python loop and finance_bp's get_packaging_cost_for_items,
+which opened its own connection per day.
+
+Two behaviour changes are expected and are reported, not failed:
+
+- revenue: the baseline added an order's total once per order line, so it
+  only agrees on days with single-line orders. The query must equal the
+  sum of order totals per day.
+- packaging: the baseline looked packaging_costs.item_id (a packaging item
+  id) up by the menu item id. Since the shared packaging engine
+  (Models/packaging.py) the unit cost of a menu item is the sum of
+  packaging_costs for its category, the rule POST /orders uses.
+
+The 'aligned' dataset gives every menu item its own category and one
+packaging row keyed on the item's id. Both rules give the same unit cost
+there, so packaging must match the baseline exactly. The 'shared' dataset
+has several items and packaging rows per category and shows how far the
+two rules drift apart on realistic data.
+
+    cd Server && DB_URL=postgres://... python benchmarks/daily_packaging_regression.py
+"""
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psycopg2
+from psycopg2.extras import RealDictCursor, execute_values
+from config import Config
+from finance_bp import DAILY_PACKAGING_SQL
+from Models.packaging import UNIT_COSTS_SQL
+
+SCHEMA = 'bench_daily_packaging'
+DAYS = int(os.getenv('BENCH_DAYS', 60))
+ORDERS_PER_DAY = int(os.getenv('BENCH_ORDERS_PER_DAY', 20))
+ITEMS = 25
+CATEGORIES = 5
+PACKAGING_ITEMS = 6
+
+
+def get_db_conn():
+    """What the baseline's get_db_conn() returned: a new connection per call."""
+    return psycopg2.connect(Config.DB_URL, cursor_factory=RealDictCursor,
+                            options=f'-c search_path={SCHEMA}')
+
+
+# ---- baseline, as it was in finance_bp before the rewrite ---- #
+
+def get_packaging_cost_for_items(items):
+    """
+    items: list of dicts, each with 'id' and 'quantity'
+    Returns: total packaging cost for this order
+    """
+    if not items:
+        return 0.0
+
+    conn = get_db_conn()
+    cur = conn.cursor()
+
+    # Collect item IDs
+    item_ids = [item['id'] for item in items]
+
+    # Get packaging costs for all items at once
+    cur.execute("""
+        SELECT pc.item_id, pc.cost, pi.name as item_name
+        FROM packaging_costs pc
+        JOIN packaging_items pi ON pc.item_id = pi.id
+        WHERE pc.item_id = ANY(%s)
+    """, (item_ids,))
+
+    rows = cur.fetchall()
+    packaging_cost_map = {row['item_id']: float(row['cost']) for row in rows}
+
+    total_packaging = 0
+    for item in items:
+        cost = packaging_cost_map.get(item['id'], 0)
+        total_packaging += cost * item.get('quantity', 1)
+
+    cur.close()
+    conn.close()
+    return total_packaging
+
+
+def daily_summary_with_packaging():
+    conn = get_db_conn()
+    cur = conn.cursor()
+
+    cur.execute("""
+        SELECT o.id, DATE(o.order_time) AS day, o.total, oi.item_id, oi.quantity
+        FROM orders o
+        JOIN order_items oi ON o.id = oi.order_id
+        WHERE o.status='CONFIRMED'
+        ORDER BY day DESC
+    """)
+
+    rows = cur.fetchall()
+    conn.close()
+
+    # Group by day
+    daily_totals = {}
+    for row in rows:
+        day = row['day']
+        daily_totals.setdefault(day, {"revenue": 0.0, "items": []})
+        daily_totals[day]["revenue"] += float(row['total'])
+        daily_totals[day]["items"].append({"id": row['item_id'], "quantity": row['quantity']})
+
+    # Calculate packaging cost per day
+    summary = []
+    for day, data in daily_totals.items():
+        packaging_cost = get_packaging_cost_for_items(data["items"])
+        net_profit = data["revenue"] - packaging_cost
+        summary.append({
+            "day": str(day),
+            "revenue": data["revenue"],
+            "packaging_tax": packaging_cost,
+            "net_profit_after_packaging": net_profit
+        })
+
+    return summary
+
+
+# ---- dataset ---- #
+
+def make_dataset(rng, aligned):
+    if aligned:
+        # item i is alone in category i, packed by packaging item i; the
+        # last item has no packaging row
+        categories = {item_id: item_id for item_id in range(1, ITEMS + 1)}
+        packaging_items = list(range(1, ITEMS))
+        costs = [(item_id, item_id, round(rng.uniform(0, 5), 2)) for item_id in packaging_items]
+    else:
+        categories = {item_id: item_id % CATEGORIES + 1 for item_id in range(1, ITEMS + 1)}
+        packaging_items = list(range(1, PACKAGING_ITEMS + 1))
+        costs = [(category_id, pkg_id, round(rng.uniform(0, 5), 2))
+                 for category_id in range(1, CATEGORIES)  # the last category is unpacked
+                 for pkg_id in rng.sample(packaging_items, rng.randint(1, 3))]
+
+    orders, lines = [], []
+    start = datetime(2024, 1, 1, 8)
+    order_id = 0
+    for day in range(DAYS):
+        for _ in range(rng.randint(0, ORDERS_PER_DAY)):
+            order_id += 1
+            status = 'CONFIRMED' if rng.random() > 0.1 else 'PENDING'
+            when = start + timedelta(days=day, minutes=rng.randint(0, 12 * 60))
+            total = 0
+            for _ in range(rng.randint(1, 4)):
+                item_id, quantity, price = rng.randint(1, ITEMS), rng.randint(1, 3), rng.choice([90, 120, 150])
+                lines.append((order_id, when, item_id, quantity, price))
+                total += quantity * price
+            orders.append((order_id, when, total, status))
+    return categories, packaging_items, costs, orders, lines
+
+
+def load(cur, categories, packaging_items, costs, orders, lines):
+    cur.execute(f"""
+        DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;
+        CREATE SCHEMA {SCHEMA};
+        SET search_path = {SCHEMA};
+        CREATE TABLE itemss (id INT PRIMARY KEY, category_id INT);
+        CREATE TABLE packaging_items (id INT PRIMARY KEY, name TEXT);
+        CREATE TABLE packaging_costs (category_id INT, item_id INT, cost NUMERIC);
+        CREATE TABLE orders (id INT PRIMARY KEY, order_time TIMESTAMP, total NUMERIC, status TEXT);
+        CREATE TABLE order_items (order_id INT, order_time TIMESTAMP, item_id INT, quantity INT, price NUMERIC);
+    """)
+    execute_values(cur, "INSERT INTO itemss (id, category_id) VALUES %s", list(categories.items()))
+    execute_values(cur, "INSERT INTO packaging_items (id, name) VALUES %s",
+                   [(pkg_id, f'packaging {pkg_id}') for pkg_id in packaging_items])
+    execute_values(cur, "INSERT INTO packaging_costs (category_id, item_id, cost) VALUES %s", costs)
+    execute_values(cur, "INSERT INTO orders (id, order_time, total, status) VALUES %s", orders)
+    execute_values(cur, "INSERT INTO order_items (order_id, order_time, item_id, quantity, price) VALUES %s", lines)
+
+
+def rewritten_summary(cur):
+    cur.execute(UNIT_COSTS_SQL)
+    unit_costs = {row['id']: float(row['unit_cost']) for row in cur.fetchall()}
+    cur.execute(DAILY_PACKAGING_SQL, {'pkg_item_ids': list(unit_costs.keys()),
+                                      'pkg_costs': list(unit_costs.values())})
+    return {str(row['day']): row for row in cur.fetchall()}
+
+
+def order_totals(cur):
+    cur.execute("""
+        SELECT DATE(order_time) AS day, SUM(total) AS revenue
+        FROM orders
+        WHERE status = 'CONFIRMED'
+        GROUP BY DATE(order_time)
+    """)
+    return {str(row['day']): float(row['revenue']) for row in cur.fetchall()}
+
+
+def run(aligned, seed=7):
+    """Compare both implementations on one dataset. Returns (stats, failures)."""
+    dataset = make_dataset(random.Random(seed), aligned)
+
+    conn = psycopg2.connect(Config.DB_URL, cursor_factory=RealDictCursor)
+    cur = conn.cursor()
+    try:
+        load(cur, *dataset)
+        conn.commit()
+
+        legacy = {row['day']: row for row in daily_summary_with_packaging()}
+        rewritten = rewritten_summary(cur)
+        totals = order_totals(cur)
+    finally:
+        conn.rollback()
+        cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        conn.commit()
+        conn.close()
+
+    failures = []
+    stats = {'orders': len(dataset[3]), 'lines': len(dataset[4]), 'days': len(rewritten),
+             'revenue_differs': 0, 'packaging_differs': 0}
+    if set(legacy) != set(rewritten):
+        failures.append(f"days differ: {sorted(set(legacy) ^ set(rewritten))}")
+    for day in sorted(set(legacy) & set(rewritten)):
+        old, new = legacy[day], rewritten[day]
+        if abs(totals[day] - float(new['revenue'])) > 1e-6:
+            failures.append(f"{day}: revenue {new['revenue']} != sum of order totals {totals[day]}")
+        if abs(old['revenue'] - float(new['revenue'])) > 1e-6:
+            stats['revenue_differs'] += 1
+        if abs(old['packaging_tax'] - float(new['packaging_cost'])) > 1e-6:
+            stats['packaging_differs'] += 1
+            if aligned:
+                failures.append(f"{day}: packaging {new['packaging_cost']} != baseline {old['packaging_tax']}")
+    return stats, failures
+
+
+if __name__ == '__main__':
+    if not Config.DB_URL:
+        sys.exit("DB_URL is not set")
+
+    seed = int(os.getenv('BENCH_SEED', 7))
+    failed = False
+    for name, aligned in (('aligned', True), ('shared', False)):
+        stats, failures = run(aligned, seed)
+        print(f"{name}: {stats['orders']} orders, {stats['lines']} lines, {stats['days']} days compared")
+        print(f"  days where the baseline revenue double-counted multi-line orders: {stats['revenue_differs']}")
+        print(f"  days where packaging differs from the baseline: {stats['packaging_differs']}")
+        for failure in failures:
+            print(f"  FAIL {failure}")
+        failed = failed or bool(failures)
+    if failed:
+        sys.exit(1)
+    print("revenue counts each order once; packaging matches the baseline where the rules agree")
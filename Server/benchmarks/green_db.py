@@ -0,0 +1,96 @@
+"""
+Concurrent request latency with green DB mode on and off.
+
+Each round starts a few slow report-style queries (pg_sleep) next to a
+stream of quick queries, and measures how long the quick ones take and
+how late an idle greenlet's 10 ms timer fires while the reports run.
+
+    cd Server && DB_URL=postgres://... python benchmarks/green_db.py
+"""
+import eventlet
+eventlet.monkey_patch()
+
+import os
+import sys
+import time
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psycopg2
+from config import Config
+from Models import database
+
+SLOW_QUERIES = int(os.getenv('BENCH_SLOW', 4))
+SLOW_SECONDS = float(os.getenv('BENCH_SLOW_SECONDS', 0.5))
+FAST_QUERIES = int(os.getenv('BENCH_FAST', 50))
+
+
+def run_query(sql, latencies=None):
+    conn = psycopg2.connect(Config.DB_URL)
+    try:
+        start = time.perf_counter()
+        cur = conn.cursor()
+        cur.execute(sql)
+        cur.fetchall()
+        if latencies is not None:
+            latencies.append(time.perf_counter() - start)
+    finally:
+        conn.close()
+
+
+def ticker(lags, stop):
+    while not stop:
+        start = time.perf_counter()
+        eventlet.sleep(0.01)
+        lags.append(time.perf_counter() - start - 0.01)
+
+
+def run_round(green):
+    if green:
+        database.enable_green_db()
+    else:
+        database.disable_green_db()
+
+    pool = eventlet.GreenPool(SLOW_QUERIES + FAST_QUERIES + 1)
+    fast, lags, stop = [], [], []
+
+    started = time.perf_counter()
+    pool.spawn(ticker, lags, stop)
+    for _ in range(SLOW_QUERIES):
+        pool.spawn(run_query, f'SELECT pg_sleep({SLOW_SECONDS})')
+    for _ in range(FAST_QUERIES):
+        pool.spawn(run_query, 'SELECT 1', fast)
+
+    while len(fast) < FAST_QUERIES:
+        eventlet.sleep(0.01)
+    stop.append(True)
+    pool.waitall()
+    elapsed = time.perf_counter() - started
+
+    def ms(values, q):
+        if not values:
+            return 0.0
+        values = sorted(values)
+        return values[min(len(values) - 1, int(q * len(values)))] * 1000
+
+    return {
+        "mode": "green" if green else "blocking",
+        "wall_s": elapsed,
+        "fast_p50_ms": ms(fast, 0.5),
+        "fast_p95_ms": ms(fast, 0.95),
+        "hub_lag_max_ms": max(lags) * 1000 if lags else 0.0,
+        "hub_lag_mean_ms": statistics.mean(lags) * 1000 if lags else 0.0,
+    }
+
+
+if __name__ == '__main__':
+    if not Config.DB_URL:
+        sys.exit("DB_URL is not set")
+
+    print(f"{SLOW_QUERIES} x pg_sleep({SLOW_SECONDS}) alongside {FAST_QUERIES} x SELECT 1")
+    print(f"{'mode':<10}{'wall s':>10}{'fast p50':>12}{'fast p95':>12}{'hub lag max':>14}{'hub lag avg':>14}")
+    for green in (False, True):
+        r = run_round(green)
+        print(f"{r['mode']:<10}{r['wall_s']:>10.2f}{r['fast_p50_ms']:>10.1f}ms{r['fast_p95_ms']:>10.1f}ms"
+              f"{r['hub_lag_max_ms']:>12.1f}ms{r['hub_lag_mean_ms']:>12.1f}ms")
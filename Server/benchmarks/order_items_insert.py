@@ -0,0 +1,64 @@
+"""
+order_items insertion: one INSERT per line vs a single execute_values.
+
+Runs against a temporary copy of order_items so nothing is written to the
+real tables.
+
+    cd Server && DB_URL=postgres://... python benchmarks/order_items_insert.py
+"""
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psycopg2
+from config import Config
+from Controllers.auth_controller import insert_order_items
+
+SIZES = (1, 10, 100)
+ORDER_TIME = datetime(2026, 1, 15, 12, 30)
+REPEAT = int(os.getenv('BENCH_REPEAT', 200))
+
+
+def insert_per_line(cursor, order_id, order_time, items):
+    for item in items:
+        cursor.execute("""
+            INSERT INTO order_items (order_id, order_time, item_id, quantity, price)
+            VALUES (%s, %s, %s, %s, %s)
+        """, (order_id, order_time, item.get('id'), item.get('quantity', 1), item.get('price', 0)))
+
+
+def timed(conn, insert, items):
+    cur = conn.cursor()
+    start = time.perf_counter()
+    for order_id in range(REPEAT):
+        insert(cur, order_id, ORDER_TIME, items)
+        conn.commit()
+    elapsed = time.perf_counter() - start
+    cur.execute("TRUNCATE order_items")
+    conn.commit()
+    cur.close()
+    return elapsed / REPEAT * 1000
+
+
+if __name__ == '__main__':
+    if not Config.DB_URL:
+        sys.exit("DB_URL is not set")
+
+    conn = psycopg2.connect(Config.DB_URL)
+    cur = conn.cursor()
+    # shadows the real table for this session only
+    cur.execute("CREATE TEMP TABLE order_items (LIKE public.order_items INCLUDING DEFAULTS)")
+    conn.commit()
+    cur.close()
+
+    print(f"{'lines':>6}{'per-line ms':>14}{'batched ms':>14}{'speedup':>10}")
+    for size in SIZES:
+        items = [{"id": i + 1, "quantity": 2, "price": 95.0} for i in range(size)]
+        loop_ms = timed(conn, insert_per_line, items)
+        batch_ms = timed(conn, insert_order_items, items)
+        print(f"{size:>6}{loop_ms:>14.2f}{batch_ms:>14.2f}{loop_ms / batch_ms:>9.1f}x")
+
+    conn.close()
@@ -5,3 +5,39 @@ load_dotenv()
 
 class Config:
     DB_URL = os.getenv('DB_URL')
+
+    # Connection pool sizing (see Models/database.py)
+    DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', 1))
+    DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', 10))
+    DB_POOL_IDLE_TIMEOUT = float(os.getenv('DB_POOL_IDLE_TIMEOUT', 300))
+    DB_POOL_CHECKOUT_TIMEOUT = float(os.getenv('DB_POOL_CHECKOUT_TIMEOUT', 10))
+    DB_POOL_PING_AFTER = float(os.getenv('DB_POOL_PING_AFTER', 30))
+
+    # Yield to other greenlets while waiting on Postgres (eventlet only)
+    DB_GREEN_MODE = os.getenv('DB_GREEN_MODE', '1') == '1'
+
+    # How long a replayed Idempotency-Key returns the original response
+    IDEMPOTENCY_TTL_HOURS = float(os.getenv('IDEMPOTENCY_TTL_HOURS', 24))
+
+    # Response cache for the analytics endpoints (see Models/response_cache.py)
+    CACHE_ENABLED = os.getenv('CACHE_ENABLED', '1') == '1'
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'local')  # local | redis
+    CACHE_URL = os.getenv('CACHE_URL')
+    CACHE_TTL = float(os.getenv('CACHE_TTL', 300))
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 512))
+
+    # order_time is stored without a zone: the zone it is written in, and
+    # the shop-local zone reports bucket by
+    ORDER_TIME_ZONE = os.getenv('ORDER_TIME_ZONE', 'UTC')
+    REPORT_TIME_ZONE = os.getenv('REPORT_TIME_ZONE', 'Asia/Manila')
+
+    # Answer period/product aggregates from in-memory NumPy columns
+    # (Models/columnar.py); needs numpy, off by default
+    ANALYTICS_COLUMNAR = os.getenv('ANALYTICS_COLUMNAR', '0') == '1'
+
+    # In-process periodic jobs (Models/scheduler.py, Models/jobs.py)
+    SCHEDULER_ENABLED = os.getenv('SCHEDULER_ENABLED', '1') == '1'
+
+    # Monthly partitions of orders/order_items kept ready ahead of time
+    # (Models/partitioning.py)
+    PARTITION_MONTHS_AHEAD = int(os.getenv('PARTITION_MONTHS_AHEAD', 3))
@@ -1,9 +1,21 @@
 from flask import Blueprint, request, jsonify, session
 from Models.database import get_db_conn
+from Models import versions, packaging, rollups, catalogue, aggregation, columnar
+from Models.periods import period_range
+from Models.response_cache import cached
+from Models.etags import etag
 from datetime import datetime
 
 finance_bp = Blueprint("finance", __name__)
 
+# data_versions resources written by this blueprint
+EQUIPMENT = 'equipment'
+GROSS_PROFIT = 'gross_profit'
+
+# what the summaries and product analysis are computed from
+SUMMARY_DEPENDS = (rollups.RESOURCE, GROSS_PROFIT, EQUIPMENT)
+ANALYSIS_DEPENDS = (rollups.RESOURCE, catalogue.RESOURCE, GROSS_PROFIT)
+
 # ---------------- EQUIPMENT ---------------- #
 @finance_bp.route("/equipment", methods=["GET"])
 def get_equipment():
@@ -29,7 +41,9 @@ def add_equipment():
         VALUES (%s, %s, %s) RETURNING *;
     """, (name, price, user_id))
     row = cur.fetchone()
+    version = versions.bump(cur, EQUIPMENT)
     conn.commit()
+    versions.mark(EQUIPMENT, version)
     cur.close()
     conn.close()
     return jsonify(row), 201
@@ -48,7 +62,9 @@ def update_equipment(id):
         WHERE id=%s RETURNING *;
     """, (name, price, id))
     row = cur.fetchone()
+    version = versions.bump(cur, EQUIPMENT)
     conn.commit()
+    versions.mark(EQUIPMENT, version)
     cur.close()
     conn.close()
     return jsonify(row)
@@ -59,7 +75,9 @@ def delete_equipment(id):
     cur = conn.cursor()
     cur.execute("DELETE FROM equipment_costs WHERE id=%s RETURNING *;", (id,))
     row = cur.fetchone()
+    version = versions.bump(cur, EQUIPMENT)
     conn.commit()
+    versions.mark(EQUIPMENT, version)
     cur.close()
     conn.close()
     return jsonify({"deleted": row})
@@ -100,6 +118,24 @@ def get_gross_profit_by_product(product_id):
     else:
         return jsonify({"error": "Product gross profit not found"}), 404
 
+# The CTE reads the figure being replaced (locking the row), so the rollups
+# can be moved by the difference instead of recomputed
+UPSERT_GROSS_PROFIT_SQL = """
+    WITH previous AS (
+        SELECT gross_profit FROM product_gross_profit
+        WHERE product_id = %(product_id)s
+        FOR UPDATE
+    )
+    INSERT INTO product_gross_profit (product_id, gross_profit, created_by)
+    VALUES (%(product_id)s, %(gross_profit)s, %(user_id)s)
+    ON CONFLICT (product_id) 
+    DO UPDATE SET 
+        gross_profit = EXCLUDED.gross_profit,
+        updated_at = NOW(),
+        created_by = EXCLUDED.created_by
+    RETURNING *, (SELECT gross_profit FROM previous) AS previous_gross_profit;
+"""
+
 @finance_bp.route("/product-gross-profit/<int:product_id>", methods=["PUT"])
 def update_product_gross_profit(product_id):
     data = request.get_json()
@@ -116,19 +152,14 @@ def update_product_gross_profit(product_id):
             return jsonify({"error": "Product not found"}), 404
 
         # Update or insert gross profit
-        cur.execute("""
-            INSERT INTO product_gross_profit (product_id, gross_profit, created_by)
-            VALUES (%s, %s, %s)
-            ON CONFLICT (product_id) 
-            DO UPDATE SET 
-                gross_profit = EXCLUDED.gross_profit,
-                updated_at = NOW(),
-                created_by = EXCLUDED.created_by
-            RETURNING *;
-        """, (product_id, gross_profit, user_id))
+        cur.execute(UPSERT_GROSS_PROFIT_SQL, {'product_id': product_id, 'gross_profit': gross_profit,
+                                              'user_id': user_id})
         
         row = cur.fetchone()
+        rollups.refresh_gross_profit(cur, [(product_id, row['previous_gross_profit'], row['gross_profit'])])
+        version = versions.bump(cur, GROSS_PROFIT)
         conn.commit()
+        versions.mark(GROSS_PROFIT, version)
         
         # Get product details for response
         cur.execute("""
@@ -163,6 +194,7 @@ def bulk_update_product_gross_profit():
     
     try:
         results = []
+        changes = []
         for update in updates:
             product_id = update.get("product_id")
             gross_profit = update.get("gross_profit")
@@ -170,21 +202,17 @@ def bulk_update_product_gross_profit():
             if product_id is None or gross_profit is None:
                 continue
 
-            cur.execute("""
-                INSERT INTO product_gross_profit (product_id, gross_profit, created_by)
-                VALUES (%s, %s, %s)
-                ON CONFLICT (product_id) 
-                DO UPDATE SET 
-                    gross_profit = EXCLUDED.gross_profit,
-                    updated_at = NOW(),
-                    created_by = EXCLUDED.created_by
-                RETURNING *;
-            """, (product_id, gross_profit, user_id))
+            cur.execute(UPSERT_GROSS_PROFIT_SQL, {'product_id': product_id, 'gross_profit': gross_profit,
+                                                  'user_id': user_id})
             
             row = cur.fetchone()
             results.append(row)
+            changes.append((product_id, row['previous_gross_profit'], row['gross_profit']))
 
+        rollups.refresh_gross_profit(cur, changes)
+        version = versions.bump(cur, GROSS_PROFIT)
         conn.commit()
+        versions.mark(GROSS_PROFIT, version)
         
         # Get updated records with product names
         product_ids = [str(update.get("product_id")) for update in updates]
@@ -224,74 +252,53 @@ def get_packaging_costs():
     conn.close()
     return jsonify(rows)
 
-def get_packaging_cost_for_items(items):
-    """
-    items: list of dicts, each with 'id' and 'quantity'
-    Returns: total packaging cost for this order
-    """
-    if not items:
-        return 0.0
-
-    conn = get_db_conn()
-    cur = conn.cursor()
-
-    # Collect item IDs
-    item_ids = [item['id'] for item in items]
-    
-    # Get packaging costs for all items at once
-    cur.execute("""
-        SELECT pc.item_id, pc.cost, pi.name as item_name
-        FROM packaging_costs pc
-        JOIN packaging_items pi ON pc.item_id = pi.id
-        WHERE pc.item_id = ANY(%s)
-    """, (item_ids,))
-    
-    rows = cur.fetchall()
-    packaging_cost_map = {row['item_id']: float(row['cost']) for row in rows}
-
-    total_packaging = 0
-    for item in items:
-        cost = packaging_cost_map.get(item['id'], 0)
-        total_packaging += cost * item.get('quantity', 1)
-
-    cur.close()
-    conn.close()
-    return total_packaging
+# Packaging is priced per order first, so each order's total is added to
+# its day exactly once however many lines it has.
+DAILY_PACKAGING_SQL = """
+    WITH order_packaging AS (
+        SELECT oi.order_id, SUM(oi.quantity * COALESCE(u.cost, 0)) AS packaging_cost
+        FROM orders o
+        JOIN order_items oi ON oi.order_id = o.id AND oi.order_time = o.order_time
+        LEFT JOIN unnest(%(pkg_item_ids)s::INT[], %(pkg_costs)s::NUMERIC[]) AS u(item_id, cost)
+            ON u.item_id = oi.item_id
+        WHERE o.status = 'CONFIRMED'
+        GROUP BY oi.order_id
+    )
+    SELECT DATE(o.order_time) AS day,
+           SUM(o.total) AS revenue,
+           SUM(op.packaging_cost) AS packaging_cost
+    FROM order_packaging op
+    JOIN orders o ON o.id = op.order_id
+    GROUP BY DATE(o.order_time)
+    ORDER BY day DESC
+"""
 
 @finance_bp.route("/summaries/daily-with-packaging", methods=["GET"])
+@etag(depends=(rollups.RESOURCE, catalogue.RESOURCE, packaging.RESOURCE))
+@cached(depends=(rollups.RESOURCE, catalogue.RESOURCE, packaging.RESOURCE))
 def daily_summary_with_packaging():
     conn = get_db_conn()
     cur = conn.cursor()
-    
-    cur.execute("""
-        SELECT o.id, DATE(o.order_time) AS day, o.total, oi.item_id, oi.quantity
-        FROM orders o
-        JOIN order_items oi ON o.id = oi.order_id
-        WHERE o.status='CONFIRMED'
-        ORDER BY day DESC
-    """)
-    
-    rows = cur.fetchall()
-    conn.close()
 
-    # Group by day
-    daily_totals = {}
-    for row in rows:
-        day = row['day']
-        daily_totals.setdefault(day, {"revenue": 0.0, "items": []})
-        daily_totals[day]["revenue"] += float(row['total'])
-        daily_totals[day]["items"].append({"id": row['item_id'], "quantity": row['quantity']})
+    # unit packaging costs come from the in-memory engine
+    pkg_item_ids, pkg_costs = packaging.cost_arrays()
+
+    try:
+        cur.execute(DAILY_PACKAGING_SQL, {'pkg_item_ids': pkg_item_ids, 'pkg_costs': pkg_costs})
+        rows = cur.fetchall()
+    finally:
+        cur.close()
+        conn.close()
 
-    # Calculate packaging cost per day
     summary = []
-    for day, data in daily_totals.items():
-        packaging_cost = get_packaging_cost_for_items(data["items"])
-        net_profit = data["revenue"] - packaging_cost
+    for row in rows:
+        revenue = float(row['revenue'])
+        packaging_cost = float(row['packaging_cost'])
         summary.append({
-            "day": str(day),
-            "revenue": data["revenue"],
+            "day": str(row['day']),
+            "revenue": revenue,
             "packaging_tax": packaging_cost,
-            "net_profit_after_packaging": net_profit
+            "net_profit_after_packaging": revenue - packaging_cost
         })
 
     return jsonify(summary)
@@ -309,7 +316,9 @@ def update_packaging_cost(id):
         WHERE id=%s RETURNING *;
     """, (cost, id))
     row = cur.fetchone()
+    version = versions.bump(cur, packaging.RESOURCE)
     conn.commit()
+    versions.mark(packaging.RESOURCE, version)
     cur.close()
     conn.close()
     return jsonify(row)
@@ -360,8 +369,10 @@ def update_packaging_costs():
                     VALUES (%s, %s, %s)
                     RETURNING *
                 """, (category_id, item_id, cost))
-        
+
+        version = versions.bump(cur, packaging.RESOURCE)
         conn.commit()
+        versions.mark(packaging.RESOURCE, version)
         return jsonify({"message": "Packaging costs updated successfully"}), 200
         
     except Exception as e:
@@ -383,268 +394,80 @@ def get_equipment_total():
     conn.close()
     return float(equipment)
 
-def get_daily_gross_profit(day):
-    """Calculate gross profit for a specific day based on product gross profits"""
-    conn = get_db_conn()
-    cur = conn.cursor()
-    
-    cur.execute("""
-        SELECT SUM(oi.quantity * COALESCE(pgp.gross_profit, 0)) as total_gross_profit
-        FROM orders o
-        JOIN order_items oi ON o.id = oi.order_id
-        LEFT JOIN product_gross_profit pgp ON oi.item_id = pgp.product_id
-        WHERE o.status = 'CONFIRMED' 
-        AND DATE(o.order_time) = %s
-    """, (day,))
-    
-    result = cur.fetchone()
-    cur.close()
-    conn.close()
-    
-    return float(result['total_gross_profit']) if result and result['total_gross_profit'] else 0.0
-
-def get_monthly_gross_profit(year, month):
-    """Calculate gross profit for a specific month based on product gross profits"""
-    conn = get_db_conn()
-    cur = conn.cursor()
-    
-    cur.execute("""
-        SELECT SUM(oi.quantity * COALESCE(pgp.gross_profit, 0)) as total_gross_profit
-        FROM orders o
-        JOIN order_items oi ON o.id = oi.order_id
-        LEFT JOIN product_gross_profit pgp ON oi.item_id = pgp.product_id
-        WHERE o.status = 'CONFIRMED' 
-        AND EXTRACT(YEAR FROM o.order_time) = %s
-        AND EXTRACT(MONTH FROM o.order_time) = %s
-    """, (year, month))
-    
-    result = cur.fetchone()
-    cur.close()
-    conn.close()
-    
-    return float(result['total_gross_profit']) if result and result['total_gross_profit'] else 0.0
+def summary_row(row, equipment):
+    revenue, packaging_cost, gross_profit = row['revenue'], row['packaging_cost'], row['gross_profit']
+    return {
+        "revenue": revenue,
+        "packaging_cost": packaging_cost,
+        "gross_profit": gross_profit,
+        "equipment_total": equipment,
+        "net_profit": revenue - (equipment + packaging_cost + gross_profit)
+    }
 
-def get_yearly_gross_profit(year):
-    """Calculate gross profit for a specific year based on product gross profits"""
-    conn = get_db_conn()
-    cur = conn.cursor()
-    
-    cur.execute("""
-        SELECT SUM(oi.quantity * COALESCE(pgp.gross_profit, 0)) as total_gross_profit
-        FROM orders o
-        JOIN order_items oi ON o.id = oi.order_id
-        LEFT JOIN product_gross_profit pgp ON oi.item_id = pgp.product_id
-        WHERE o.status = 'CONFIRMED' 
-        AND EXTRACT(YEAR FROM o.order_time) = %s
-    """, (year,))
-    
-    result = cur.fetchone()
-    cur.close()
-    conn.close()
-    
-    return float(result['total_gross_profit']) if result and result['total_gross_profit'] else 0.0
+SUMMARY_METRICS = ('revenue', 'packaging_cost', 'gross_profit')
 
 @finance_bp.route("/summaries/daily", methods=["GET"])
+@etag(depends=SUMMARY_DEPENDS)
+@cached(depends=SUMMARY_DEPENDS)
 def daily_summary():
-    conn = get_db_conn()
-    cur = conn.cursor()
-
     # Get filter parameters from request
     month = request.args.get('month', type=int)
     year = request.args.get('year', type=int)
-    
-    # Build query with filters
-    query = """
-        SELECT DATE(order_time) as day, 
-               SUM(total) AS revenue,
-               SUM(packaging_cost) AS packaging_cost
-        FROM orders
-        WHERE status='CONFIRMED'
-    """
-    params = []
-    
-    if month and year:
-        query += " AND EXTRACT(MONTH FROM order_time) = %s AND EXTRACT(YEAR FROM order_time) = %s"
-        params.extend([month, year])
-    
-    query += " GROUP BY day ORDER BY day DESC;"
-    
-    cur.execute(query, params)
-    orders = cur.fetchall()
-
-    # Calculate gross profit with SAME filters
-    gross_profit_query = """
-        SELECT DATE(o.order_time) as day,
-               SUM(oi.quantity * COALESCE(pgp.gross_profit, 0)) as gross_profit
-        FROM orders o
-        JOIN order_items oi ON o.id = oi.order_id
-        LEFT JOIN product_gross_profit pgp ON oi.item_id = pgp.product_id
-        WHERE o.status = 'CONFIRMED'
-    """
-    gross_profit_params = []
-    
-    if month and year:
-        gross_profit_query += " AND EXTRACT(MONTH FROM o.order_time) = %s AND EXTRACT(YEAR FROM o.order_time) = %s"
-        gross_profit_params.extend([month, year])
-    
-    gross_profit_query += " GROUP BY DATE(o.order_time)"
-    
-    cur.execute(gross_profit_query, gross_profit_params)
-    gross_profit_rows = cur.fetchall()
-    gross_profit_map = {r['day']: float(r['gross_profit']) for r in gross_profit_rows}
 
+    start, end = period_range(year=year, month=month) if month and year else (None, None)
+    rows = aggregation.aggregate('day', start, end, SUMMARY_METRICS)
     equipment = get_equipment_total()
 
-    summary = []
-    for r in orders:
-        day = r['day']
-        revenue = float(r['revenue'])
-        day_packaging = float(r['packaging_cost'])
-        day_gross = gross_profit_map.get(day, 0.0)
-
-        net_profit = revenue - (equipment + day_packaging + day_gross)
-
-        summary.append({
-            "day": str(day),
-            "revenue": revenue,
-            "packaging_cost": day_packaging,
-            "gross_profit": day_gross,
-            "equipment_total": equipment,
-            "net_profit": net_profit
-        })
-
-    cur.close()
-    conn.close()
-    return jsonify(summary)
+    return jsonify([{"day": str(r['period']), **summary_row(r, equipment)} for r in rows])
 
 @finance_bp.route("/summaries/monthly", methods=["GET"])
+@etag(depends=SUMMARY_DEPENDS)
+@cached(depends=SUMMARY_DEPENDS)
 def monthly_summary():
-    conn = get_db_conn()
-    cur = conn.cursor()
-
     # Get filter parameters
     year = request.args.get('year', type=int)
-    
-    query = """
-        SELECT EXTRACT(YEAR FROM order_time) AS year,
-               EXTRACT(MONTH FROM order_time) AS month,
-               SUM(total) AS revenue,
-               SUM(packaging_cost) AS packaging_cost
-        FROM orders
-        WHERE status='CONFIRMED'
-    """
-    params = []
-    
-    if year:
-        query += " AND EXTRACT(YEAR FROM order_time) = %s"
-        params.append(year)
-    
-    query += " GROUP BY year, month ORDER BY year DESC, month DESC;"
-    
-    cur.execute(query, params)
-    orders = cur.fetchall()
-
-    # Calculate gross profit with SAME filters
-    gross_profit_query = """
-        SELECT EXTRACT(YEAR FROM o.order_time) AS year,
-               EXTRACT(MONTH FROM o.order_time) AS month,
-               SUM(oi.quantity * COALESCE(pgp.gross_profit, 0)) as gross_profit
-        FROM orders o
-        JOIN order_items oi ON o.id = oi.order_id
-        LEFT JOIN product_gross_profit pgp ON oi.item_id = pgp.product_id
-        WHERE o.status = 'CONFIRMED'
-    """
-    gross_profit_params = []
-    
-    if year:
-        gross_profit_query += " AND EXTRACT(YEAR FROM o.order_time) = %s"
-        gross_profit_params.append(year)
-    
-    gross_profit_query += " GROUP BY EXTRACT(YEAR FROM o.order_time), EXTRACT(MONTH FROM o.order_time)"
-    
-    cur.execute(gross_profit_query, gross_profit_params)
-    gross_profit_rows = cur.fetchall()
-    gross_profit_map = {(int(r['year']), int(r['month'])): float(r['gross_profit']) for r in gross_profit_rows}
 
+    start, end = period_range(year=year) if year else (None, None)
+    rows = aggregation.aggregate('month', start, end, SUMMARY_METRICS)
     equipment = get_equipment_total()
 
-    summary = []
-    for r in orders:
-        year, month = int(r['year']), int(r['month'])
-        revenue = float(r['revenue'])
-        month_packaging = float(r['packaging_cost'])
-        month_gross = gross_profit_map.get((year, month), 0.0)
-
-        net_profit = revenue - (equipment + month_packaging + month_gross)
-
-        summary.append({
-            "year": year,
-            "month": month,
-            "revenue": revenue,
-            "packaging_cost": month_packaging,
-            "gross_profit": month_gross,
-            "equipment_total": equipment,
-            "net_profit": net_profit
-        })
-
-    cur.close()
-    conn.close()
-    return jsonify(summary)
+    return jsonify([{
+        "year": r['period'].year,
+        "month": r['period'].month,
+        **summary_row(r, equipment)
+    } for r in rows])
 
 @finance_bp.route("/summaries/yearly", methods=["GET"])
+@etag(depends=SUMMARY_DEPENDS)
+@cached(depends=SUMMARY_DEPENDS)
 def yearly_summary():
-    conn = get_db_conn()
-    cur = conn.cursor()
-
-    cur.execute("""
-        SELECT EXTRACT(YEAR FROM order_time) AS year,
-               SUM(total) AS revenue,
-               SUM(packaging_cost) AS packaging_cost
-        FROM orders
-        WHERE status='CONFIRMED'
-        GROUP BY year
-        ORDER BY year DESC;
-    """)
-    orders = cur.fetchall()
-
-    cur.execute("""
-        SELECT EXTRACT(YEAR FROM o.order_time) AS year,
-               SUM(oi.quantity * COALESCE(pgp.gross_profit, 0)) as gross_profit
-        FROM orders o
-        JOIN order_items oi ON o.id = oi.order_id
-        LEFT JOIN product_gross_profit pgp ON oi.item_id = pgp.product_id
-        WHERE o.status = 'CONFIRMED'
-        GROUP BY EXTRACT(YEAR FROM o.order_time)
-    """)
-    gross_profit_rows = cur.fetchall()
-    gross_profit_map = {int(r['year']): float(r['gross_profit']) for r in gross_profit_rows}
-
+    rows = aggregation.aggregate('year', metrics=SUMMARY_METRICS)
     equipment = get_equipment_total()
 
-    summary = []
-    for r in orders:
-        year = int(r['year'])
-        revenue = float(r['revenue'])
-        year_packaging = float(r['packaging_cost'])
-        year_gross = gross_profit_map.get(year, 0.0)
+    return jsonify([{"year": r['period'].year, **summary_row(r, equipment)} for r in rows])
 
-        net_profit = revenue - (equipment + year_packaging + year_gross)
+# Any granularity/range/metrics, e.g.
+# /summaries/aggregate?granularity=week&start=2025-01-01&end=2025-03-31&metrics=revenue,order_count
+@finance_bp.route("/summaries/aggregate", methods=["GET"])
+@etag(depends=SUMMARY_DEPENDS)
+@cached(depends=SUMMARY_DEPENDS)
+def aggregate_summary():
+    granularity = request.args.get('granularity', 'day')
+    metrics = tuple(filter(None, request.args.get('metrics', '').split(','))) or aggregation.METRICS
 
-        summary.append({
-            "year": year,
-            "revenue": revenue,
-            "packaging_cost": year_packaging,
-            "gross_profit": year_gross,
-            "equipment_total": equipment,
-            "net_profit": net_profit
-        })
+    try:
+        start = period_range(day=request.args['start'])[0] if request.args.get('start') else None
+        end = period_range(day=request.args['end'])[1] if request.args.get('end') else None
+        rows = aggregation.aggregate(granularity, start, end, metrics)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    cur.close()
-    conn.close()
-    return jsonify(summary) 
+    return jsonify([{**r, "period": r['period'].isoformat()} for r in rows])
 
 # ---------------- PRODUCT FINANCIAL ANALYSIS ---------------- #
 @finance_bp.route("/product-analysis", methods=["GET"])
+@etag(depends=ANALYSIS_DEPENDS)
+@cached(depends=ANALYSIS_DEPENDS)
 def get_product_analysis():
     """Get detailed financial analysis per product"""
     conn = get_db_conn()
@@ -657,14 +480,13 @@ def get_product_analysis():
             i.price as selling_price,
             COALESCE(pgp.gross_profit, 0) as gross_profit_per_unit,
             (i.price - COALESCE(pgp.gross_profit, 0)) as cost_per_unit,
-            COALESCE(SUM(oi.quantity), 0) as total_units_sold,
-            COALESCE(SUM(oi.quantity * i.price), 0) as total_revenue,
-            COALESCE(SUM(oi.quantity * pgp.gross_profit), 0) as total_gross_profit
+            COALESCE(s.units_sold, 0) as total_units_sold,
+            COALESCE(s.revenue, 0) as total_revenue,
+            COALESCE(s.gross_profit, 0) as total_gross_profit,
+            s.last_sold_at
         FROM itemss i
         LEFT JOIN product_gross_profit pgp ON i.id = pgp.product_id
-        LEFT JOIN order_items oi ON i.id = oi.item_id
-        LEFT JOIN orders o ON oi.order_id = o.id AND o.status = 'CONFIRMED'
-        GROUP BY i.id, i.name, i.price, pgp.gross_profit
+        LEFT JOIN product_stats s ON i.id = s.product_id
         ORDER BY total_gross_profit DESC;
     """)
     
@@ -673,7 +495,26 @@ def get_product_analysis():
     conn.close()
     return jsonify(rows)
 
+# one product's lines, found through order_items (item_id)
+PRODUCT_MONTHLY_SQL = """
+    SELECT 
+        EXTRACT(YEAR FROM o.order_time) as year,
+        EXTRACT(MONTH FROM o.order_time) as month,
+        SUM(oi.quantity) as units_sold,
+        SUM(oi.quantity * i.price) as revenue,
+        SUM(oi.quantity * COALESCE(pgp.gross_profit, 0)) as gross_profit
+    FROM orders o
+    JOIN order_items oi ON o.id = oi.order_id AND oi.order_time = o.order_time
+    JOIN itemss i ON oi.item_id = i.id
+    LEFT JOIN product_gross_profit pgp ON i.id = pgp.product_id
+    WHERE o.status = 'CONFIRMED' AND i.id = %s
+    GROUP BY year, month
+    ORDER BY year DESC, month DESC;
+"""
+
 @finance_bp.route("/product-analysis/<int:product_id>", methods=["GET"])
+@etag(depends=ANALYSIS_DEPENDS)
+@cached(depends=ANALYSIS_DEPENDS)
 def get_product_analysis_detail(product_id):
     """Get detailed financial analysis for a specific product over time"""
     conn = get_db_conn()
@@ -694,24 +535,27 @@ def get_product_analysis_detail(product_id):
     
     product_info = cur.fetchone()
     if not product_info:
+        cur.close()
+        conn.close()
         return jsonify({"error": "Product not found"}), 404
     
+    if columnar.available():
+        cur.close()
+        conn.close()
+        monthly_data = [{
+            "year": row['period'].year,
+            "month": row['period'].month,
+            "units_sold": row['units_sold'],
+            "revenue": row['revenue'],
+            "gross_profit": row['gross_profit']
+        } for row in columnar.snapshot().product_periods(product_id, 'month')]
+        return jsonify({
+            "product_info": product_info,
+            "monthly_performance": monthly_data
+        })
+
     # Monthly sales data
-    cur.execute("""
-        SELECT 
-            EXTRACT(YEAR FROM o.order_time) as year,
-            EXTRACT(MONTH FROM o.order_time) as month,
-            SUM(oi.quantity) as units_sold,
-            SUM(oi.quantity * i.price) as revenue,
-            SUM(oi.quantity * COALESCE(pgp.gross_profit, 0)) as gross_profit
-        FROM orders o
-        JOIN order_items oi ON o.id = oi.order_id
-        JOIN itemss i ON oi.item_id = i.id
-        LEFT JOIN product_gross_profit pgp ON i.id = pgp.product_id
-        WHERE o.status = 'CONFIRMED' AND i.id = %s
-        GROUP BY year, month
-        ORDER BY year DESC, month DESC;
-    """, (product_id,))
+    cur.execute(PRODUCT_MONTHLY_SQL, (product_id,))
     
     monthly_data = cur.fetchall()
     
@@ -722,31 +566,3 @@ def get_product_analysis_detail(product_id):
         "product_info": product_info,
         "monthly_performance": monthly_data
     })
-
-def get_filtered_gross_profit(month=None, year=None):
-    """Calculate gross profit with optional month/year filters"""
-    conn = get_db_conn()
-    cur = conn.cursor()
-    
-    query = """
-        SELECT SUM(oi.quantity * COALESCE(pgp.gross_profit, 0)) as total_gross_profit
-        FROM orders o
-        JOIN order_items oi ON o.id = oi.order_id
-        LEFT JOIN product_gross_profit pgp ON oi.item_id = pgp.product_id
-        WHERE o.status = 'CONFIRMED'
-    """
-    params = []
-    
-    if month and year:
-        query += " AND EXTRACT(MONTH FROM o.order_time) = %s AND EXTRACT(YEAR FROM o.order_time) = %s"
-        params.extend([month, year])
-    elif year:
-        query += " AND EXTRACT(YEAR FROM o.order_time) = %s"
-        params.append(year)
-    
-    cur.execute(query, params)
-    result = cur.fetchone()
-    cur.close()
-    conn.close()
-    
-    return float(result['total_gross_profit']) if result and result['total_gross_profit'] else 0.0
\ No newline at end of file
@@ -1,11 +1,17 @@
+# eventlet has to patch the stdlib before anything else imports socket/threading
+import eventlet
+eventlet.monkey_patch()
+
 import os
 from dotenv import load_dotenv
-from flask import Flask, request
+from flask import Flask, request, jsonify, session
 from flask_cors import CORS
 from flask_session import Session
 from extensions import socketio, bcrypt, connected_users
 from finance_bp import finance_bp
 from Controllers.auth_controller import update_last_activity
+from Models import database, schema, migrations, idempotency, versions, response_cache, scheduler, jobs
+from config import Config
 
 
 
@@ -25,10 +31,15 @@ app.config["SESSION_COOKIE_HTTPONLY"] = True
 app.config["SESSION_COOKIE_SAMESITE"] = "None"
 app.config["SESSION_COOKIE_SECURE"] = True
 
+# ---- Green DB mode: psycopg2 waits yield to the eventlet hub ----
+if Config.DB_GREEN_MODE:
+    database.enable_green_db()
+
 # ---- Init extensions ----
 CORS(app, supports_credentials=True)
 bcrypt.init_app(app)
 Session(app)
+database.init_app(app)
 
 # Configure Socket.IO with proper async mode
 socketio.init_app(app, 
@@ -96,7 +107,13 @@ def handle_user_offline(data):
 
 # ---- Import and register blueprints AFTER initializing extensions ----
 from Controllers.auth_controller import auth_bp
+from Controllers.bulk_orders import bulk_bp
+from Controllers.sales_export import export_bp
+from Controllers.dashboard import dashboard_bp
 app.register_blueprint(auth_bp)
+app.register_blueprint(bulk_bp)
+app.register_blueprint(export_bp)
+app.register_blueprint(dashboard_bp)
 app.register_blueprint(finance_bp)
 
 # Add health check endpoint
@@ -104,6 +121,57 @@ app.register_blueprint(finance_bp)
 def health_check():
     return jsonify({'status': 'healthy'}), 200
 
+# Response cache hit/miss counters per endpoint
+@app.route('/cache/stats')
+def cache_stats():
+    return jsonify(response_cache.stats()), 200
+
+ADMIN_ROLES = ('Admin', 'System Administrator')
+
+# Re-read optional columns after running a migration, no restart needed.
+# The version bump reaches the other workers over NOTIFY data_versions.
+@app.route('/schema/refresh', methods=['POST'])
+def refresh_schema():
+    user = session.get('user')
+    if not user or user.get('role') not in ADMIN_ROLES:
+        return jsonify({'error': 'Insufficient permissions'}), 403
+
+    conn = database.get_db_conn()
+    cursor = conn.cursor()
+    try:
+        version = versions.bump(cursor, schema.RESOURCE)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+    versions.mark(schema.RESOURCE, version)
+    if not schema.refresh_schema():
+        return jsonify({'error': 'Failed to refresh schema'}), 500
+    return jsonify({'capabilities': schema.capabilities()}), 200
+
+# Last run, duration and outcome of each periodic job
+@app.route('/jobs/status')
+def jobs_status():
+    return jsonify(scheduler.status()), 200
+
+# Apply pending migrations, then introspect the schema once at startup
+migrations.run_migrations()
+schema.refresh_schema()
+idempotency.purge_expired()
+versions.load_versions()
+
+# Cross-worker cache invalidation (LISTEN data_versions)
+socketio.start_background_task(versions.listen_forever)
+
+# Periodic jobs; every worker runs the loop, advisory locks pick who runs each slot
+if Config.SCHEDULER_ENABLED:
+    jobs.register_default_jobs(app)
+    scheduler.start(socketio.start_background_task)
+
 if __name__ == '__main__':
     print("Starting Socket.IO server...")
     socketio.run(app, 
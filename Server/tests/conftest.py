@@ -0,0 +1,76 @@
+import os
+import sys
+import uuid
+
+import pytest
+
+# tests import the app modules the same way the server does, from Server/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# the tables the migrations and reports read, as they were before any
+# migration ran
+BASELINE_SCHEMA = """
+    CREATE TABLE orders (
+        id SERIAL PRIMARY KEY,
+        order_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        total NUMERIC,
+        status TEXT
+    );
+    CREATE TABLE order_items (
+        id SERIAL PRIMARY KEY,
+        order_id INT REFERENCES orders (id),
+        item_id INT,
+        quantity INT,
+        price NUMERIC
+    );
+    CREATE TABLE itemss (
+        id SERIAL PRIMARY KEY,
+        name TEXT,
+        price NUMERIC,
+        category_id INT
+    );
+    CREATE TABLE product_gross_profit (
+        product_id INT PRIMARY KEY,
+        gross_profit NUMERIC
+    );
+"""
+
+
+@pytest.fixture
+def scratch_db(monkeypatch):
+    """
+    A throwaway schema in DB_URL's database. Pooled connections opened
+    while the test runs have it as their search_path, so the app's own
+    code reads and writes there. Yields a plain autocommit connection.
+    """
+    if not os.getenv('DB_URL'):
+        pytest.skip("needs a Postgres database in DB_URL")
+    psycopg2 = pytest.importorskip('psycopg2')
+    pytest.importorskip('flask')
+    pytest.importorskip('dotenv')
+    from psycopg2.extras import RealDictCursor
+    from Models import database, schema
+
+    name = f"test_{uuid.uuid4().hex[:12]}"
+    conn = psycopg2.connect(os.environ['DB_URL'], cursor_factory=RealDictCursor,
+                            options=f'-c search_path={name}')
+    conn.autocommit = True
+    conn.cursor().execute(f"CREATE SCHEMA {name}")
+
+    monkeypatch.setenv('PGOPTIONS', f'-c search_path={name}')
+    monkeypatch.setattr(database, '_pool', None)
+    monkeypatch.setattr(schema, '_columns', None)
+    try:
+        yield conn
+    finally:
+        if database._pool is not None:
+            database._pool.closeall()
+        conn.cursor().execute(f"DROP SCHEMA {name} CASCADE")
+        conn.close()
+
+
+@pytest.fixture
+def baseline_db(scratch_db):
+    """scratch_db holding the empty pre-migration tables."""
+    scratch_db.cursor().execute(BASELINE_SCHEMA)
+    return scratch_db
@@ -0,0 +1,34 @@
+import pytest
+
+pytest.importorskip('psycopg2')
+pytest.importorskip('flask')
+pytest.importorskip('dotenv')
+
+from Models import catalogue, versions
+
+
+@pytest.fixture
+def menu(monkeypatch):
+    monkeypatch.setattr(catalogue, '_prices', {1: 90.0, 2: 120.0})
+    monkeypatch.setattr(catalogue, '_built_version', versions.current(catalogue.RESOURCE))
+
+
+def test_lines_matching_the_menu_pass(menu):
+    assert catalogue.validate_items([{'id': 1, 'price': 90, 'quantity': 2}, {'id': '2', 'price': '120'}]) == []
+
+
+def test_price_and_quantity_problems(menu):
+    problems = catalogue.validate_items([
+        {'id': 1, 'price': 80, 'quantity': 1},
+        {'id': 2, 'price': 120, 'quantity': 0},
+        {'id': 2, 'price': 120, 'quantity': '3'},
+        {'id': 9, 'price': 10},
+    ])
+    assert [p['error'] for p in problems] == ["Price changed", "Invalid quantity", "Invalid quantity", "Unknown item"]
+
+
+def test_order_total_uses_menu_prices(menu):
+    # a price within half a cent of the menu validates, the menu price is stored
+    items = [{'id': 1, 'price': 90.004, 'quantity': 2}, {'id': 2, 'price': 120}]
+    assert catalogue.validate_items(items) == []
+    assert catalogue.order_total(items) == 300.0
@@ -0,0 +1,25 @@
+import os
+
+import pytest
+
+pytest.importorskip('psycopg2')
+pytest.importorskip('flask')
+pytest.importorskip('dotenv')
+
+if not os.getenv('DB_URL'):
+    pytest.skip("needs a Postgres database in DB_URL", allow_module_level=True)
+
+from benchmarks import daily_packaging_regression as regression
+
+
+def test_matches_baseline_where_packaging_rules_agree():
+    stats, failures = regression.run(aligned=True)
+    assert failures == []
+    assert stats['packaging_differs'] == 0
+
+
+def test_revenue_is_the_sum_of_order_totals():
+    stats, failures = regression.run(aligned=False)
+    assert failures == []
+    # the baseline added an order's total once per line
+    assert stats['revenue_differs'] > 0
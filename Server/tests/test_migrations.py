@@ -0,0 +1,58 @@
+from datetime import date, datetime
+
+import pytest
+
+pytest.importorskip('psycopg2')
+pytest.importorskip('flask')
+pytest.importorskip('dotenv')
+
+from Models import migrations
+
+
+def load_orders(cur):
+    cur.execute("""
+        INSERT INTO orders (id, order_time, total, status) VALUES
+            (1, '2025-03-01 09:15', 300, 'CONFIRMED'),
+            (2, '2025-03-01 18:40', 120, 'CONFIRMED'),
+            (3, '2025-03-02 12:00', 90, 'PENDING');
+        INSERT INTO order_items (order_id, item_id, quantity, price) VALUES
+            (1, 10, 2, 90), (1, 11, 1, 120),
+            (2, 11, 1, 120),
+            (3, 10, 1, 90);
+        INSERT INTO product_gross_profit (product_id, gross_profit) VALUES (10, 40), (11, 55);
+    """)
+
+
+def test_migrates_from_the_baseline_schema(baseline_db):
+    cur = baseline_db.cursor()
+    load_orders(cur)
+
+    assert migrations.run_migrations()
+
+    cur.execute("SELECT name FROM schema_migrations")
+    assert {row['name'] for row in cur.fetchall()} == {name for name, _ in migrations.MIGRATIONS}
+
+    cur.execute("""
+        SELECT is_nullable FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = 'order_items' AND column_name = 'order_time'
+    """)
+    assert cur.fetchone()['is_nullable'] == 'NO'
+    cur.execute("SELECT order_id, order_time FROM order_items ORDER BY id")
+    assert [(row['order_id'], row['order_time']) for row in cur.fetchall()] == [
+        (1, datetime(2025, 3, 1, 9, 15)), (1, datetime(2025, 3, 1, 9, 15)),
+        (2, datetime(2025, 3, 1, 18, 40)), (3, datetime(2025, 3, 2, 12, 0)),
+    ]
+
+    cur.execute("SELECT day, order_count, revenue, gross_profit FROM sales_daily_rollup")
+    assert [tuple(row.values()) for row in cur.fetchall()] == [(date(2025, 3, 1), 2, 420, 2 * 40 + 55 + 55)]
+    cur.execute("SELECT item_id, quantity, sales FROM item_sales_daily ORDER BY item_id")
+    assert [tuple(row.values()) for row in cur.fetchall()] == [(10, 2, 180), (11, 2, 240)]
+    cur.execute("SELECT product_id, units_sold FROM product_stats ORDER BY product_id")
+    assert [tuple(row.values()) for row in cur.fetchall()] == [(10, 2), (11, 2)]
+
+
+def test_second_run_is_a_no_op(baseline_db):
+    load_orders(baseline_db.cursor())
+
+    assert migrations.run_migrations()
+    assert migrations.run_migrations()
@@ -0,0 +1,69 @@
+from datetime import date, datetime
+
+import pytest
+
+from Models.periods import period_range, period_filter, range_filter, filter_from_args
+
+
+class Args(dict):
+    """The bit of werkzeug's MultiDict that filter_from_args uses."""
+
+    def get(self, key, default=None, type=None):
+        value = super().get(key, default)
+        if value is None or type is None:
+            return value
+        try:
+            return type(value)
+        except ValueError:
+            return default
+
+
+def test_period_range_day():
+    assert period_range(day='2025-03-31') == (date(2025, 3, 31), date(2025, 4, 1))
+    assert period_range(day=datetime(2025, 3, 31, 18, 5)) == (date(2025, 3, 31), date(2025, 4, 1))
+
+
+def test_period_range_month_rolls_over_december():
+    assert period_range(year=2024, month=2) == (date(2024, 2, 1), date(2024, 3, 1))
+    assert period_range(year=2024, month=12) == (date(2024, 12, 1), date(2025, 1, 1))
+
+
+def test_period_range_year_and_none():
+    assert period_range(year=2024) == (date(2024, 1, 1), date(2025, 1, 1))
+    assert period_range() is None
+    assert period_range(month=5) is None
+
+
+def test_period_filter_is_half_open_on_the_bare_column():
+    sql, params = period_filter('o.order_time', year=2024, month=2)
+    assert sql == "o.order_time >= %s AND o.order_time < %s"
+    assert params == [date(2024, 2, 1), date(2024, 3, 1)]
+    # no function wrapped around the column, or the index cannot be used
+    assert 'EXTRACT' not in sql and 'DATE(' not in sql
+
+
+def test_period_filter_without_period_is_true():
+    assert period_filter('order_time') == ("TRUE", [])
+
+
+def test_range_filter_open_ends():
+    assert range_filter('day', date(2025, 1, 1), None) == ("day >= %s", [date(2025, 1, 1)])
+    assert range_filter('day', None, date(2025, 2, 1)) == ("day < %s", [date(2025, 2, 1)])
+    assert range_filter('day') == ("TRUE", [])
+
+
+def test_filter_from_args_end_date_is_inclusive():
+    sql, params = filter_from_args('order_time', Args(start='2025-01-01', end='2025-01-31', year='2020'))
+    assert sql == "order_time >= %s AND order_time < %s"
+    assert params == [date(2025, 1, 1), date(2025, 2, 1)]
+
+
+def test_filter_from_args_year_month():
+    assert filter_from_args('order_time', Args(year='2025', month='7')) == \
+        ("order_time >= %s AND order_time < %s", [date(2025, 7, 1), date(2025, 8, 1)])
+    assert filter_from_args('order_time', Args()) == ("TRUE", [])
+
+
+def test_filter_from_args_rejects_bad_dates():
+    with pytest.raises(ValueError):
+        filter_from_args('order_time', Args(start='2025-13-01'))
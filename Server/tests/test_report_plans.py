@@ -0,0 +1,103 @@
+"""
+EXPLAIN checks for the report queries: the period filters have to reach
+orders through orders (status, order_time) and one product's lines
+through order_items (item_id). Runs the migrations on the baseline
+tables, so the indexes are the ones the migrations create, then loads
+five years of orders and ANALYZEs. Planner settings are left alone.
+"""
+from datetime import date
+
+import pytest
+
+pytest.importorskip('psycopg2')
+pytest.importorskip('flask')
+pytest.importorskip('dotenv')
+
+from Models import aggregation, migrations
+from Models.periods import period_filter, filter_from_args
+from finance_bp import PRODUCT_MONTHLY_SQL
+
+ORDERS = 200000
+ITEMS = 200
+
+
+class Args(dict):
+    """The bit of werkzeug's MultiDict that filter_from_args uses."""
+
+    def get(self, key, default=None, type=None):
+        value = super().get(key, default)
+        return value if value is None or type is None else type(value)
+
+
+def index_conds_on(plan, relation):
+    """
+    Index Cond of every scan that reads `relation`. A Bitmap Heap Scan
+    carries its conditions on the Bitmap Index Scans below it.
+    """
+    if plan.get('Relation Name') == relation:
+        conds, stack = [], [plan]
+        while stack:
+            node = stack.pop()
+            conds.append(node.get('Index Cond', ''))
+            if node['Node Type'] in ('Bitmap Heap Scan', 'BitmapAnd', 'BitmapOr', 'Bitmap Index Scan'):
+                stack.extend(node.get('Plans', []))
+        return [(plan['Node Type'], ' '.join(filter(None, conds)))]
+
+    found = []
+    for child in plan.get('Plans', []):
+        found.extend(index_conds_on(child, relation))
+    return found
+
+
+@pytest.fixture
+def reports_db(baseline_db):
+    assert migrations.run_migrations()
+    cur = baseline_db.cursor()
+    # one order every 13 minutes from 2021, every 20th still pending, two lines each
+    cur.execute("""
+        INSERT INTO itemss (id, name, price)
+        SELECT g, 'item ' || g, 100 FROM generate_series(1, %(items)s) g;
+        INSERT INTO product_gross_profit SELECT g, g * 1.5 FROM generate_series(1, %(items)s) g;
+        INSERT INTO orders (id, order_time, total, status)
+        SELECT g, TIMESTAMP '2021-01-01' + g * INTERVAL '13 minutes', 100,
+               CASE WHEN g %% 20 = 0 THEN 'PENDING' ELSE 'CONFIRMED' END
+        FROM generate_series(1, %(n)s) g;
+        INSERT INTO order_items (order_id, order_time, item_id, quantity, price)
+        SELECT o.id, o.order_time, (o.id * 7 + line) %% %(items)s + 1, 1, 100
+        FROM orders o, generate_series(0, 1) line;
+        ANALYZE orders; ANALYZE order_items; ANALYZE itemss; ANALYZE product_gross_profit;
+    """, {'n': ORDERS, 'items': ITEMS})
+    return cur
+
+
+def explain(cur, sql, params):
+    cur.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+    return cur.fetchone()['QUERY PLAN'][0]['Plan']
+
+
+def assert_index_cond(plan, relation, column):
+    scans = index_conds_on(plan, relation)
+    assert scans, f"{relation} is not read"
+    assert all(column in cond for _, cond in scans), f"{relation} read via {scans}"
+
+
+def test_month_filter_uses_the_order_time_index(reports_db):
+    # /daily-sales and /sales/export: status plus the periods filter
+    period_sql, params = period_filter('order_time', year=2023, month=6)
+    sql = f"SELECT id, total FROM orders WHERE status = %s AND {period_sql} ORDER BY order_time DESC, id DESC LIMIT 50"
+    assert_index_cond(explain(reports_db, sql, ['CONFIRMED', *params]), 'orders', 'order_time')
+
+
+def test_date_range_filter_uses_the_order_time_index(reports_db):
+    period_sql, params = filter_from_args('order_time', Args(start='2023-06-01', end='2023-06-14'))
+    sql = f"SELECT id, total FROM orders WHERE status = %s AND {period_sql}"
+    assert_index_cond(explain(reports_db, sql, ['CONFIRMED', *params]), 'orders', 'order_time')
+
+
+def test_hourly_aggregation_uses_the_order_time_index(reports_db):
+    sql, params = aggregation.build_query('hour', date(2023, 6, 1), date(2023, 6, 8))
+    assert_index_cond(explain(reports_db, sql, params), 'orders', 'order_time')
+
+
+def test_product_detail_uses_the_item_id_index(reports_db):
+    assert_index_cond(explain(reports_db, PRODUCT_MONTHLY_SQL, (42,)), 'order_items', 'item_id')